@@ -0,0 +1,218 @@
+"""
+Benchmark: 1000 ta bir vaqtda ulangan mijoz bilan so'rov/soniya
+Har bir mijoz so'rov yuboradi (time, date yoki echo), javobni kutadi va
+darhol keyingisini yuboradi. Mijozlar bir nechta jarayonga bo'lingan,
+har bir jarayon o'z socketlarini selectors bilan boshqaradi.
+
+--mode pipeline: ramkali protokol, har ulanishda --depth ta so'rov javob
+kutmasdan yo'lda turadi (RTT ga bog'liq emas). --batch N > 1 bo'lsa har
+ramka N ta buyruqli BATCH. So'rov/soniya buyruqlar soni bo'yicha hisoblanadi.
+
+Qo'shimcha: har so'rovda datetime.now().strftime va kesh narxi (timeit).
+
+Ishlatish:
+    python bench.py --spawn                         # serverni o'zi ishga tushiradi
+    python bench.py --clients 1000 --duration 10    # ishlab turgan serverga qarshi
+    python bench.py --spawn --mode pipeline --clients 50 --depth 64
+    python bench.py --spawn --mode pipeline --clients 50 --depth 8 --batch 32
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import time
+import timeit
+
+import protocol
+from protocol import FrameReader, PREAMBLE
+from server import HOST, PORT, clock, make_response, refresh_clock
+
+
+REQUESTS = (b"time", b"date", b"salom dunyo")
+
+
+def run_clients(host, port, count, duration, results):
+    """Bitta jarayon: `count` ta ulanish, `duration` soniya davomida so'rov-javob"""
+    sel = selectors.DefaultSelector()
+    socks = []
+    for i in range(count):
+        sock = socket.create_connection((host, port))
+        sock.setblocking(False)
+        socks.append(sock)
+    latencies = []
+    sent_at = {}
+
+    start = time.perf_counter()
+    deadline = start + duration
+    for i, sock in enumerate(socks):
+        sock.send(REQUESTS[i % len(REQUESTS)])
+        sent_at[sock] = time.perf_counter()
+        sel.register(sock, selectors.EVENT_READ, i)
+
+    done = 0
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        for key, _ in sel.select(deadline - now):
+            sock = key.fileobj
+            try:
+                data = sock.recv(1024)
+            except BlockingIOError:
+                continue
+            if not data:
+                sel.unregister(sock)
+                continue
+            now = time.perf_counter()
+            latencies.append(now - sent_at[sock])
+            done += 1
+            # Javoblar ajratgichsiz, shuning uchun har safar bitta so'rov
+            sock.send(REQUESTS[(key.data + done) % len(REQUESTS)])
+            sent_at[sock] = now
+
+    elapsed = time.perf_counter() - start
+    for sock in socks:
+        sock.close()
+    latencies.sort()
+    results.put((done, elapsed, latencies[::max(1, len(latencies) // 10000)]))
+
+
+def run_framed_clients(host, port, count, duration, results, depth, batch):
+    """Ramkali rejim: har ulanishda `depth` ta ramka yo'lda, javob kelishi bilan yangisi"""
+    sel = selectors.DefaultSelector()
+    socks = []
+    for i in range(count):
+        sock = socket.create_connection((host, port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        socks.append(sock)
+    latencies = []
+    sent_at = {}  # {id: yuborilgan vaqt}
+    ids = iter(range(1, 1 << 32))
+
+    def frame(i, now):
+        request_id = next(ids)
+        sent_at[request_id] = now
+        if batch > 1:
+            items = [REQUESTS[(i + k) % len(REQUESTS)] for k in range(batch)]
+            return protocol.encode_frame(protocol.BATCH, request_id, protocol.encode_items(items))
+        return protocol.encode_frame(protocol.REQUEST, request_id, REQUESTS[i % len(REQUESTS)])
+
+    start = time.perf_counter()
+    deadline = start + duration
+    for i, sock in enumerate(socks):
+        # Socketlar blocking: recv faqat select dan keyin, sendall kichik
+        now = time.perf_counter()
+        sock.sendall(PREAMBLE + b"".join(frame(i + k, now) for k in range(depth)))
+        sel.register(sock, selectors.EVENT_READ, (i, FrameReader()))
+
+    done = 0
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        for key, _ in sel.select(deadline - now):
+            sock = key.fileobj
+            i, reader = key.data
+            data = sock.recv(65536)
+            if not data:
+                sel.unregister(sock)
+                continue
+            now = time.perf_counter()
+            out = []
+            for kind, request_id, payload in reader.feed(data):
+                latencies.append(now - sent_at.pop(request_id))
+                done += len(protocol.decode_items(payload)) if kind == protocol.BATCH_RESPONSE else 1
+                out.append(frame(i + done, now))
+            if out:
+                sock.sendall(b"".join(out))
+
+    elapsed = time.perf_counter() - start
+    for sock in socks:
+        sock.close()
+    latencies.sort()
+    results.put((done, elapsed, latencies[::max(1, len(latencies) // 10000)]))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def clock_cost():
+    """Bitta 'time' javobining narxi: har safar strftime vs kesh"""
+    refresh_clock()
+    n = 200000
+    direct = timeit.timeit(lambda: datetime.datetime.now().strftime("%H:%M:%S").encode('utf-8'), number=n)
+    cached = timeit.timeit(lambda: make_response('time'), number=n)
+    print(f"strftime har so'rovda: {direct / n * 1e6:.2f} us, kesh: {cached / n * 1e6:.2f} us "
+          f"(kesh: {clock['time'].decode()})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time server requests/sec benchmark")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--procs", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mode", choices=("legacy", "pipeline"), default="legacy",
+                        help="legacy: so'rov-javob, pipeline: ramkali protokol")
+    parser.add_argument("--depth", type=int, default=32, help="pipeline: har ulanishda yo'ldagi ramkalar")
+    parser.add_argument("--batch", type=int, default=1, help="pipeline: har ramkadagi buyruqlar (BATCH)")
+    parser.add_argument("--spawn", action="store_true", help="server.py --quiet ni ishga tushirish")
+    args = parser.parse_args()
+
+    clock_cost()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+             "--quiet", "--host", args.host, "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+        time.sleep(0.5)
+    try:
+        results = multiprocessing.Queue()
+        per_proc = [args.clients // args.procs + (i < args.clients % args.procs) for i in range(args.procs)]
+        if args.mode == "pipeline":
+            target, extra = run_framed_clients, (args.depth, args.batch)
+        else:
+            target, extra = run_clients, ()
+        procs = [
+            multiprocessing.Process(target=target, args=(args.host, args.port, n, args.duration, results) + extra)
+            for n in per_proc if n
+        ]
+        for p in procs:
+            p.start()
+        total = 0
+        elapsed = 0.0
+        samples = []
+        for _ in procs:
+            done, seconds, latencies = results.get()
+            total += done
+            elapsed = max(elapsed, seconds)
+            samples.extend(latencies)
+        for p in procs:
+            p.join()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    samples.sort()
+    mode = args.mode if args.mode == "legacy" else f"pipeline depth={args.depth} batch={args.batch}"
+    print(f"{args.clients} mijoz ({mode}), {len(procs)} jarayon, {elapsed:.1f}s: "
+          f"{total} so'rov, {total / elapsed:,.0f} so'rov/s")
+    print(f"kechikish p50={percentile(samples, 50) * 1000:.2f} ms  "
+          f"p99={percentile(samples, 99) * 1000:.2f} ms  p99.9={percentile(samples, 99.9) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,124 @@
+"""
+Vaqt/echo server mijozi (ramkali protokol, qarang: protocol.py)
+
+TimeClient so'rovlarni javob kutmasdan yuboradi (pipelining) va javoblarni
+id bo'yicha moslashtiradi:
+
+    with TimeClient() as c:
+        ids = [c.submit(cmd) for cmd in ("time", "date", "salom")]
+        javoblar = [c.result(i) for i in ids]
+        c.batch(["time", "date"])          # bitta ramka, bitta javob
+
+Interaktiv rejimda ';' bilan ajratilgan buyruqlar bitta BATCH bo'lib ketadi:
+    Yuboriladigan xabar: time; date; salom
+"""
+
 import socket
 
+import protocol
+from protocol import FrameReader, PREAMBLE
+
 HOST = '127.0.0.1'
 PORT = 8000
+RECV_SIZE = 64 * 1024
+FLUSH_SIZE = 64 * 1024  # yig'ilgan so'rovlar shundan oshsa darhol yuboriladi
+
+
+class TimeClient:
+    """Ramkali protokol mijozi: submit/submit_batch -> id, result(id) -> javob"""
+
+    def __init__(self, host=HOST, port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = FrameReader()
+        self.outbuf = bytearray(PREAMBLE)
+        self.next_id = 1
+        self.results = {}  # {id: javob} - kelgan, lekin hali olinmagan
+
+    def _new_id(self):
+        request_id = self.next_id
+        self.next_id = self.next_id % 0xFFFFFFFF + 1
+        return request_id
+
+    def _queue(self, kind, payload):
+        request_id = self._new_id()
+        self.outbuf += protocol.encode_frame(kind, request_id, payload)
+        if len(self.outbuf) >= FLUSH_SIZE:
+            self.flush()
+        return request_id
+
+    def submit(self, command):
+        """So'rovni navbatga qo'yish (javob kutilmaydi), id qaytaradi"""
+        return self._queue(protocol.REQUEST, command.encode('utf-8'))
+
+    def submit_batch(self, commands):
+        """Bir nechta buyruqni bitta BATCH ramkasida yuborish, id qaytaradi"""
+        items = [command.encode('utf-8') for command in commands]
+        return self._queue(protocol.BATCH, protocol.encode_items(items))
+
+    def flush(self):
+        if self.outbuf:
+            self.sock.sendall(self.outbuf)
+            self.outbuf.clear()
+
+    def _read(self):
+        data = self.sock.recv(RECV_SIZE)
+        if not data:
+            raise ConnectionError("Server ulanishni yopdi")
+        for kind, request_id, payload in self.reader.feed(data):
+            if kind == protocol.RESPONSE:
+                self.results[request_id] = payload.decode('utf-8')
+            elif kind == protocol.BATCH_RESPONSE:
+                self.results[request_id] = [item.decode('utf-8') for item in protocol.decode_items(payload)]
+            else:
+                raise ValueError(f"Noma'lum ramka turi: {kind}")
+
+    def result(self, request_id):
+        """`request_id` javobini kutish; oraliqda kelgan boshqa javoblar saqlanadi"""
+        self.flush()
+        while request_id not in self.results:
+            self._read()
+        return self.results.pop(request_id)
+
+    def request(self, command):
+        return self.result(self.submit(command))
+
+    def batch(self, commands):
+        return self.result(self.submit_batch(commands))
+
+    def pipeline(self, commands):
+        """Hammasini javob kutmasdan yuborib, javoblarni shu tartibda qaytarish"""
+        ids = [self.submit(command) for command in commands]
+        return [self.result(request_id) for request_id in ids]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    with TimeClient(HOST, PORT) as client:
+        print("Serverga ulandingiz. Xabar yuboring ('exit' yozsangiz chiqasiz).")
+
+        while True:
+            message = input("Yuboriladigan xabar: ")
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.connect((HOST, PORT))
-    print("Serverga ulandingiz. Xabar yuboring ('exit' yozsangiz chiqasiz).")
+            if message.lower() == 'exit':
+                print("Ulanish yopildi.")
+                break
 
-    while True:
-        message = input("Yuboriladigan xabar: ")
+            if ';' in message:
+                commands = [part for part in message.split(';') if part.strip()]
+                for command, data in zip(commands, client.batch(commands)):
+                    print(f"Server javobi ({command.strip()}): {data}")
+            else:
+                print(f"Server javobi: {client.request(message)}")
 
-        if message.lower() == 'exit':
-            print("Ulanish yopildi.")
-            break
 
-        s.sendall(message.encode("utf-8"))
-        data = s.recv(1024).decode('utf-8')
-        print(f"Server javobi: {data}")
+if __name__ == "__main__":
+    main()
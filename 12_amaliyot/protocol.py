@@ -0,0 +1,82 @@
+"""
+Ramkali (framed) protokol: so'rovlarni javob kutmasdan ketma-ket yuborish
+Ulanish PREAMBLE bilan boshlansa server shu protokolda gaplashadi, aks
+holda eski matn rejimi (bitta recv - bitta so'rov) ishlaydi.
+
+Har bir ramka:
+    HEADER = !IBI (payload uzunligi, turi, so'rov id) | payload
+
+Turlari:
+    REQUEST        payload - bitta buyruq (time, date yoki echo matni)
+    BATCH          payload - bir nechta buyruq, har biri !H uzunlik + matn
+    RESPONSE       REQUEST javobi, o'sha id bilan
+    BATCH_RESPONSE BATCH javoblari, buyruqlar tartibida (!H uzunlik + javob)
+
+Server javoblarni so'rovlar tartibida yuboradi, lekin mijoz ularni id
+bo'yicha moslashtiradi - tartibga bog'lanmaydi.
+"""
+
+import struct
+
+PREAMBLE = b"\x00TS1"
+HEADER = struct.Struct("!IBI")
+ITEM = struct.Struct("!H")
+MAX_FRAME = 64 * 1024  # payload chegarasi (bayt)
+MAX_BATCH = 1024  # bitta BATCH dagi buyruqlar
+
+REQUEST = 1
+BATCH = 2
+RESPONSE = 3
+BATCH_RESPONSE = 4
+
+
+def encode_frame(kind, request_id, payload):
+    return HEADER.pack(len(payload), kind, request_id) + payload
+
+
+def encode_items(items):
+    """Bir nechta bytes ni bitta payload ga: har biri !H uzunlik bilan"""
+    return b"".join(ITEM.pack(len(item)) + item for item in items)
+
+
+def decode_items(payload):
+    """encode_items ning teskarisi"""
+    items = []
+    offset = 0
+    while offset < len(payload):
+        if offset + ITEM.size > len(payload):
+            raise ValueError("Batch elementi buzilgan")
+        (size,) = ITEM.unpack_from(payload, offset)
+        offset += ITEM.size
+        if offset + size > len(payload):
+            raise ValueError("Batch elementi buzilgan")
+        items.append(payload[offset:offset + size])
+        offset += size
+        if len(items) > MAX_BATCH:
+            raise ValueError("Batch juda katta")
+    return items
+
+
+class FrameReader:
+    """Bitta ulanish uchun qayta yig'ish buferi: kelgan baytlardan to'liq ramkalar"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Yangi baytlarni qo'shib, (turi, id, payload) ro'yxatini qaytarish"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= HEADER.size:
+            size, kind, request_id = HEADER.unpack_from(buffer, offset)
+            if size > MAX_FRAME:
+                raise ValueError(f"Ramka juda katta: {size} bayt")
+            end = offset + HEADER.size + size
+            if end > len(buffer):
+                break
+            frames.append((kind, request_id, bytes(buffer[offset + HEADER.size:end])))
+            offset = end
+        del buffer[:offset]
+        return frames
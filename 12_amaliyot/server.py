@@ -1,30 +1,231 @@
-import socket
+"""
+Vaqt/echo TCP server - bir vaqtda ko'p mijozga xizmat qiladi
+Bitta thread, selectors: har bir mijoz non-blocking socket, o'qishga
+tayyor bo'lganlari navbat bilan xizmat qilinadi, hech bir mijoz
+boshqalarni kutdirib qo'ymaydi. Buyruqlar o'zgarmagan:
+    time -> HH:MM:SS, date -> YYYY-MM-DD, boshqa matn -> o'zi (echo)
+
+Vaqt va sana satrlari har so'rovda strftime qilinmaydi - soniyada bir
+marta yangilanadigan keshdan olinadi.
+
+Ulanish protocol.PREAMBLE bilan boshlansa, ramkali rejim: mijoz javob
+kutmasdan ko'p so'rov (va BATCH) yuboradi, bitta recv dagi barcha to'liq
+ramkalar javoblari bitta send bilan qaytadi. Aks holda eski matn rejimi.
+
+Javoblarni o'qimay so'rov yuboraveradigan mijoz server xotirasini to'ldirmasin:
+yuborilmagan javob HIGH_WATERMARK dan oshsa undan o'qish to'xtatiladi,
+LOW_WATERMARK gacha bo'shagach qayta boshlanadi.
+
+Ishlatish:
+    python server.py            # har bir so'rov ekranga chiqariladi
+    python server.py --quiet    # benchmark uchun (qarang: bench.py)
+"""
+
+import argparse
 import datetime
+import selectors
+import socket
+import time
+
+import protocol
+from protocol import FrameReader, PREAMBLE
 
 HOST = '127.0.0.1'
 PORT = 8000
+RECV_SIZE = 1024
+FRAMED_RECV_SIZE = 64 * 1024  # ramkali rejimda bitta recv da ko'p so'rov
+BACKLOG = 1024  # standart 128 ming mijoz bir vaqtda ulanganda yetmaydi
+ACCEPT_BATCH = 64
+HIGH_WATERMARK = 256 * 1024
+LOW_WATERMARK = 64 * 1024
+
+sel = selectors.DefaultSelector()
+outbufs = {}  # {socket: yuborilmay qolgan javob (bytearray)}
+# {socket: FrameReader (ramkali) | None (matn rejimi) | bytes (PREAMBLE boshi, hali noma'lum)}
+modes = {}
+paused = set()  # javobi HIGH_WATERMARK dan oshib, o'qilmayotgan socketlar
+
+# Vaqt/sana keshi (refresh_clock yangilaydi)
+clock = {'second': None, 'time': b'', 'date': b''}
+
+
+def refresh_clock():
+    """Soniya o'zgargan bo'lsa keshni yangilash. Keyingi yangilashgacha qolgan vaqtni qaytaradi"""
+    now = time.time()
+    second = int(now)
+    if second != clock['second']:
+        moment = datetime.datetime.fromtimestamp(second)
+        clock['second'] = second
+        clock['time'] = moment.strftime("%H:%M:%S").encode('utf-8')
+        clock['date'] = moment.strftime("%Y-%m-%d").encode('utf-8')
+    return second + 1 - now
+
+
+def make_response(data):
+    """So'rovga javob (bytes)"""
+    if data == 'time':
+        return clock['time']
+    if data == 'date':
+        return clock['date']
+    return data.encode('utf-8')
+
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.bind((HOST, PORT))
-    s.listen()
-    print("Server ishga tushdi. Mijoz kutilyapti...")
+def close_client(conn):
+    sel.unregister(conn)
+    outbufs.pop(conn, None)
+    modes.pop(conn, None)
+    paused.discard(conn)
+    conn.close()
 
-    conn, _ = s.accept()
-    with conn:
-        print("Mijoz ulandi")
-        while True:
-            data = conn.recv(1024).decode('utf-8')
+
+def send_response(conn, response):
+    """Javobni yuborish; to'liq ketmasa qolgani socket yozishga tayyor bo'lganda"""
+    pending = outbufs.get(conn)
+    if pending:
+        pending += response
+    else:
+        try:
+            sent = conn.send(response)
+        except BlockingIOError:
+            sent = 0  # socket buferi to'la - hammasi navbatga
+        if sent == len(response):
+            return
+        pending = outbufs[conn] = bytearray(response[sent:])
+        sel.modify(conn, selectors.EVENT_READ | selectors.EVENT_WRITE)
+    if len(pending) >= HIGH_WATERMARK and conn not in paused:
+        # Mijoz javoblarni o'qimayapti - biz ham uning so'rovlarini o'qimaymiz
+        paused.add(conn)
+        sel.modify(conn, selectors.EVENT_WRITE)
+
+
+def detect_mode(conn, data):
+    """Birinchi baytlarga qarab rejimni aniqlash.
+    (rejim, qolgan ma'lumot) qaytaradi; rejim hali noma'lum bo'lsa bytes"""
+    data = modes[conn] + data
+    if len(data) < len(PREAMBLE) and PREAMBLE.startswith(data):
+        modes[conn] = data
+        return data, b''
+    if data.startswith(PREAMBLE):
+        modes[conn] = FrameReader()
+        return modes[conn], data[len(PREAMBLE):]
+    modes[conn] = None
+    return None, data
+
+
+def handle_frames(conn, reader, data, quiet):
+    """Ramkali rejim: barcha to'liq ramkalarga javoblar bitta send bilan"""
+    out = bytearray()
+    for kind, request_id, payload in reader.feed(data):
+        if kind == protocol.REQUEST:
+            command = payload.decode('utf-8', errors='replace').strip().lower()
+            if not quiet:
+                print(f"Mijozdan kelgan [{request_id}]: {command}")
+            out += protocol.encode_frame(protocol.RESPONSE, request_id, make_response(command))
+        elif kind == protocol.BATCH:
+            commands = [item.decode('utf-8', errors='replace').strip().lower()
+                        for item in protocol.decode_items(payload)]
+            if not quiet:
+                print(f"Mijozdan kelgan [{request_id}] batch: {commands}")
+            results = protocol.encode_items([make_response(c) for c in commands])
+            out += protocol.encode_frame(protocol.BATCH_RESPONSE, request_id, results)
+        else:
+            raise ValueError(f"Noma'lum ramka turi: {kind}")
+    if out:
+        send_response(conn, bytes(out))
+
+
+def handle_client(conn, mask, quiet):
+    try:
+        if mask & selectors.EVENT_WRITE:
+            pending = outbufs[conn]
+            sent = conn.send(pending)
+            del pending[:sent]
+            if not pending:
+                del outbufs[conn]
+                paused.discard(conn)
+                sel.modify(conn, selectors.EVENT_READ)
+            elif conn in paused and len(pending) <= LOW_WATERMARK:
+                paused.discard(conn)
+                sel.modify(conn, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+        if mask & selectors.EVENT_READ:
+            mode = modes[conn]
+            data = conn.recv(RECV_SIZE if mode is None else FRAMED_RECV_SIZE)
             if not data:
-                break
+                if not quiet:
+                    print("Mijoz uzildi")
+                close_client(conn)
+                return
+
+            if isinstance(mode, bytes):
+                mode, data = detect_mode(conn, data)
+                if not data:
+                    return
+            if mode is not None:
+                handle_frames(conn, mode, data, quiet)
+                return
+
+            data = data.decode('utf-8', errors='replace').strip().lower()
+            if not quiet:
+                print(f"Mijozdan kelgan: {data}")
+            send_response(conn, make_response(data))
+    except BlockingIOError:
+        pass
+    except ValueError as e:
+        # Buzilgan ramka - ulanishni yopish
+        if not quiet:
+            print(f"Protokol xatosi: {e}")
+        close_client(conn)
+    except OSError:
+        close_client(conn)
+
+
+def accept_clients(server, quiet):
+    for _ in range(ACCEPT_BATCH):
+        try:
+            conn, addr = server.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        sel.register(conn, selectors.EVENT_READ)
+        modes[conn] = b''
+        if not quiet:
+            print(f"Mijoz ulandi: {addr[0]}:{addr[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent time/echo server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--quiet", action="store_true", help="so'rovlarni ekranga chiqarmaslik")
+    args = parser.parse_args()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((args.host, args.port))
+        s.listen(BACKLOG)
+        s.setblocking(False)
+        sel.register(s, selectors.EVENT_READ)
+        print("Server ishga tushdi. Mijozlar kutilyapti...")
 
-            data = data.strip().lower()
+        try:
+            while True:
+                # Kesh har sikl boshida tekshiriladi; select keyingi soniya
+                # boshlanishidan ortiq kutmaydi
+                timeout = refresh_clock()
+                for key, mask in sel.select(timeout):
+                    if key.fileobj is s:
+                        accept_clients(s, args.quiet)
+                    else:
+                        handle_client(key.fileobj, mask, args.quiet)
+        except KeyboardInterrupt:
+            print("\nServer to'xtatildi.")
+        finally:
+            for key in list(sel.get_map().values()):
+                if key.fileobj is not s:
+                    key.fileobj.close()
+            sel.close()
 
-            if data == 'time':
-                response = datetime.datetime.now().strftime("%H:%M:%S")
-            elif data == 'date':
-                response = datetime.datetime.now().strftime("%Y-%m-%d")
-            else:
-                response = data
 
-            print(f"Mijozdan kelgan: {data}")
-            conn.sendall(response.encode('utf-8'))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: UDP echo server paket/soniya
+Har bir jo'natuvchi jarayon o'z socketi (o'z manba porti) bilan --window ta
+paketni yo'lga chiqaradi va har javob kelishi bilan yana bittasini yuboradi.
+Javob TIMEOUT ichida kelmasa oynadagi paketlar yo'qolgan deb hisoblanadi va
+oyna qaytadan to'ldiriladi.
+
+Turli manba portlari SO_REUSEPORT workerlariga taqsimlanadi, shuning uchun
+--senders soni --workers dan kam bo'lmasin.
+
+Ishlatish:
+    python bench.py --spawn                             # server.py --perf
+    python bench.py --spawn --workers 4 --senders 8
+    python bench.py --spawn --server-mode simple        # har paketda print
+    python bench.py --port 5005                          # ishlab turgan serverga
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from server import UDP_IP, UDP_PORT
+
+TIMEOUT = 0.2
+
+
+def run_sender(host, port, size, window, duration, results):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect((host, port))
+    sock.settimeout(TIMEOUT)
+    payload = (b"salom " * (size // 6 + 1))[:size]
+    buf = bytearray(max(size, 1) + 1)
+    received = 0
+    lost = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    for _ in range(window):
+        sock.send(payload)
+    while time.perf_counter() < deadline:
+        try:
+            sock.recv_into(buf)
+        except (socket.timeout, ConnectionRefusedError):
+            lost += window
+            for _ in range(window):
+                sock.send(payload)
+            continue
+        received += 1
+        sock.send(payload)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    results.put((received, lost, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP echo packets/sec benchmark")
+    parser.add_argument("--host", default=UDP_IP)
+    parser.add_argument("--port", type=int, default=UDP_PORT)
+    parser.add_argument("--senders", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument("--window", type=int, default=32, help="har jo'natuvchida yo'ldagi paketlar")
+    parser.add_argument("--size", type=int, default=64, help="paket hajmi (bayt)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--spawn", action="store_true", help="server.py ni o'zi ishga tushirish")
+    parser.add_argument("--server-mode", choices=("perf", "simple"), default="perf")
+    parser.add_argument("--workers", type=int, default=1, help="--spawn --server-mode perf uchun")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+                   "--host", args.host, "--port", str(args.port)]
+        if args.server_mode == "perf":
+            command += ["--perf", "--workers", str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        time.sleep(0.5)
+    try:
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=run_sender,
+                                    args=(args.host, args.port, args.size, args.window, args.duration, results))
+            for _ in range(args.senders)
+        ]
+        for p in procs:
+            p.start()
+        received = lost = 0
+        elapsed = 0.0
+        for _ in procs:
+            r, l, seconds = results.get()
+            received += r
+            lost += l
+            elapsed = max(elapsed, seconds)
+        for p in procs:
+            p.join()
+    finally:
+        if server:
+            # SIGINT: server uni workerlarga ham uzatadi (terminate yetim qoldiradi)
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+    mode = args.server_mode + (f", {args.workers} worker" if args.server_mode == "perf" else "")
+    print(f"server ({mode}), {args.senders} jo'natuvchi, oyna {args.window}, {args.size} bayt, {elapsed:.1f}s")
+    print(f"{received} javob, {received / elapsed:,.0f} paket/s, yo'qolgan ~{lost}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,36 @@
+"""
+UDP chat mijozi (Tkinter) - rudp.py ishonchli qatlami bilan
+Xabarlar tartib raqami bilan yuboriladi, server ACK qaytaradi, yo'qolganlari
+qayta yuboriladi. Tarmoq bitta fon threadda; rudp holati lock bilan himoyalangan,
+chunki Send tugmasi GUI threaddan yuboradi.
+
+GUI: kelgan satrlar navbatga (deque) qo'shiladi, widget esa FRAME_MS da bir
+marta, bitta insert bilan yangilanadi. Oynada eng ko'pi MAX_LINES satr qoladi.
+"""
+
+import collections
 import socket
 import threading
+import time
 import tkinter as tk
 from tkinter import scrolledtext
 
+import rudp
+
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
+MAX_DATAGRAM = 65535
+FRAME_MS = 16  # ~60 kadr/s
+MAX_LINES = 1000  # scrollback chegarasi
+NET_TICK = 0.5  # retransmit kutilmayotganda recvfrom timeouti
 
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 sock.bind(("0.0.0.0", 0))
 
+conn = rudp.Connection()
+conn_lock = threading.Lock()
+incoming = collections.deque()  # GUI ga chiqarilmagan satrlar (thread-safe append/popleft)
+
 root = tk.Tk()
 root.title("UDP Chat")
 
@@ -18,29 +40,62 @@ chat_log.pack(padx=10, pady=10)
 msg_entry = tk.Entry(root, width=40)
 msg_entry.pack(side=tk.LEFT, padx=(10,0), pady=(0,10))
 
-def send_message():
+def send_message(event=None):
     msg = msg_entry.get()
     if msg:
-        sock.sendto(msg.encode(), (UDP_IP, UDP_PORT))
-        update_chat(f"You: {msg}")
+        with conn_lock:
+            packets = conn.send(msg.encode(), time.monotonic())
+        for packet in packets:
+            sock.sendto(packet, (UDP_IP, UDP_PORT))
+        incoming.append(f"You: {msg}")
         msg_entry.delete(0, tk.END)
 
 send_button = tk.Button(root, text="Send", command=send_message)
 send_button.pack(side=tk.RIGHT, padx=10, pady=(0,10))
+msg_entry.bind("<Return>", send_message)
 
 def receive_messages():
     while True:
+        with conn_lock:
+            timeout = conn.next_timeout(time.monotonic())
+        sock.settimeout(NET_TICK if timeout is None else min(NET_TICK, max(timeout, 0.001)))
         try:
-            data, _ = sock.recvfrom(1024)
-            msg = data.decode()
-            root.after(0, lambda m=msg: update_chat(f"Server: {m}"))
-        except:
+            data, _ = sock.recvfrom(MAX_DATAGRAM)
+        except socket.timeout:
+            data = None
+        except OSError:
             break
 
-def update_chat(message):
-    chat_log.config(state='normal')
-    chat_log.insert(tk.END, message + "\n")
-    chat_log.config(state='disabled')
+        now = time.monotonic()
+        with conn_lock:
+            packets, delivered = [], []
+            packet = rudp.parse(data) if data is not None else None
+            if packet is not None:
+                packets, delivered = conn.on_packet(packet, now)
+            resend, failed = conn.poll(now)
+        for out in packets + resend:
+            sock.sendto(out, (UDP_IP, UDP_PORT))
+        for payload in delivered:
+            incoming.append(f"Server: {payload.decode(errors='replace')}")
+        for payload in failed:
+            incoming.append(f"Yetkazilmadi: {payload.decode(errors='replace')}")
+
+def flush_incoming():
+    """Navbatdagi hamma satrni bitta insert bilan chiqarish, ortiqchasini o'chirish"""
+    if incoming:
+        lines = []
+        while incoming:
+            lines.append(incoming.popleft())
+        lines = lines[-MAX_LINES:]
+        chat_log.config(state='normal')
+        chat_log.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(chat_log.index('end-1c').split('.')[0]) - 1 - MAX_LINES
+        if excess > 0:
+            chat_log.delete("1.0", f"{excess + 1}.0")
+        chat_log.config(state='disabled')
+        chat_log.see(tk.END)
+    root.after(FRAME_MS, flush_incoming)
 
 threading.Thread(target=receive_messages, daemon=True).start()
+root.after(FRAME_MS, flush_incoming)
 root.mainloop()
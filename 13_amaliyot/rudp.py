@@ -0,0 +1,216 @@
+"""
+Ishonchli UDP qatlami - client.py va server.py uchun umumiy format
+Har xabar tartib raqami (seq) bilan yuboriladi, qabul qiluvchi ACK
+qaytaradi, javob kelmasa qayta yuboriladi (retransmit), qabul qiluvchi
+xabarlarni seq tartibida yetkazadi.
+
+Paketlar:
+    DATA  = !BIII (DATA, sessiya, base, seq) | xabar
+        base - sender hali tasdiqlanmagan eng kichik seq (yuborish paytida)
+    ACK   = !BIIQ (ACK, sessiya, cum, sack)
+        cum  - shu seq gacha (o'zi kirmaydi) hammasi olindi
+        sack - selective ACK: bit i yoqilgan bo'lsa cum+1+i ham olingan,
+               sender faqat yo'qolganlarini qayta yuboradi
+
+Sessiya - har Sender uchun tasodifiy son. Qabul qiluvchi yangi sessiyani
+ko'rsa holatini tashlaydi va base dan boshlaydi: qayta ishga tushgan
+qabul qiluvchi eski sessiyani davom ettirayotgan senderdan ham (seq 0 dan
+emas) xabar oladi. base har paketda: birinchi paket yo'qolsa yoki kechiksa
+ham ishlaydi. Almashtirilgan sessiyalarning kechikkan paketlari e'tiborsiz
+qoldiriladi.
+
+Bu modul socket bilan ishlamaydi: metodlar yuboriladigan paketlarni
+qaytaradi, sendto ni chaqiruvchi o'zi qiladi.
+"""
+
+import collections
+import random
+import struct
+
+DATA = 1
+ACK = 2
+HEADER = struct.Struct("!BIII")
+ACK_FORMAT = struct.Struct("!BIIQ")
+SACK_BITS = 64
+WINDOW = SACK_BITS  # eng eski tasdiqlanmagan seq dan shuncha oldinga yuboriladi
+
+RTO_INITIAL = 0.2
+RTO_MIN = 0.05
+RTO_MAX = 2.0
+MAX_RETRIES = 10
+IDLE_TIMEOUT = 60.0  # server: shuncha jim turgan peer o'chiriladi
+RETIRED_SESSIONS = 8  # shuncha eski sessiya paketlari tashlanadi
+
+
+def parse(packet):
+    """(DATA, sessiya, base, seq, xabar) | (ACK, sessiya, cum, sack) | None (bizning format emas)"""
+    if len(packet) >= HEADER.size and packet[0] == DATA:
+        _, session, base, seq = HEADER.unpack_from(packet)
+        return DATA, session, base, seq, bytes(packet[HEADER.size:])
+    if len(packet) == ACK_FORMAT.size and packet[0] == ACK:
+        return ACK_FORMAT.unpack(packet)
+    return None
+
+
+class Sender:
+    """Chiquvchi xabarlar: seq berish, ACK kutish, qayta yuborish"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.session = random.getrandbits(32)
+        self.next_seq = 0
+        self.inflight = {}  # {seq: [xabar, deadline, urinishlar, birinchi yuborilgan vaqt]}
+        self.backlog = collections.deque()  # oyna to'la bo'lganda kutayotgan (seq, xabar)
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rto = RTO_INITIAL
+
+    def send(self, payload, now):
+        """Xabarni navbatga qo'yish; hozir yuboriladigan paketlar ro'yxati"""
+        self.backlog.append((self.next_seq, payload))
+        self.next_seq += 1
+        return self._fill_window(now)
+
+    def _packet(self, base, seq, payload):
+        # Sarlavha har yuborishda qayta tuziladi: base eskirmasin, aks holda
+        # qayta ishga tushgan qabul qiluvchi allaqachon tasdiqlangan seq ni kutadi
+        return HEADER.pack(DATA, self.session, base, seq) + payload
+
+    def _fill_window(self, now):
+        # Oyna seq bo'yicha: qabul qiluvchi expected + SACK_BITS dan
+        # uzoqdagilarni tashlaydi, ularni yuborish urinishni behuda yeydi
+        if not self.backlog:
+            return []
+        base = min(self.inflight) if self.inflight else self.backlog[0][0]
+        packets = []
+        while self.backlog:
+            seq, payload = self.backlog[0]
+            if seq - base >= WINDOW:
+                break
+            self.backlog.popleft()
+            self.inflight[seq] = [payload, now + self.rto, 0, now]
+            packets.append(self._packet(base, seq, payload))
+        return packets
+
+    def _sample_rtt(self, rtt):
+        # RFC 6298: SRTT/RTTVAR, faqat qayta yuborilmagan paketlardan (Karn)
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(RTO_MAX, max(RTO_MIN, self.srtt + 4 * self.rttvar))
+
+    def on_ack(self, session, cum, sack, now):
+        """ACK ni qo'llash; oyna bo'shagani uchun yuboriladigan paketlar"""
+        if session != self.session:
+            return []
+        acked = [seq for seq in self.inflight if seq < cum]
+        acked += [cum + 1 + i for i in range(SACK_BITS) if sack >> i & 1]
+        for seq in acked:
+            entry = self.inflight.pop(seq, None)
+            if entry is not None and entry[2] == 0:
+                self._sample_rtt(now - entry[3])
+        return self._fill_window(now)
+
+    def poll(self, now):
+        """Muddati o'tganlarni qayta yuborish. (paketlar, yetkazilmagan xabarlar)
+
+        Biror xabar MAX_RETRIES dan keyin ham tasdiqlanmasa, qabul qiluvchi
+        undan keyingilarni ham yetkaza olmaydi - sessiya yangidan boshlanadi
+        va yo'ldagi hamma xabar yetkazilmagan deb qaytariladi.
+        """
+        packets = []
+        base = None
+        for seq, entry in self.inflight.items():
+            if entry[1] > now:
+                continue
+            entry[2] += 1
+            if entry[2] > MAX_RETRIES:
+                failed = [payload for payload, *_ in self.inflight.values()]
+                failed += [payload for _, payload in self.backlog]
+                self.reset()
+                return [], failed
+            entry[1] = now + min(RTO_MAX, self.rto * 2 ** entry[2])
+            if base is None:
+                base = min(self.inflight)
+            packets.append(self._packet(base, seq, entry[0]))
+        return packets, []
+
+    def next_timeout(self, now):
+        """Eng yaqin retransmitgacha soniya (yo'lda hech narsa bo'lmasa None)"""
+        if not self.inflight:
+            return None
+        return max(0.0, min(entry[1] for entry in self.inflight.values()) - now)
+
+
+class Receiver:
+    """Kiruvchi xabarlar: tartiblash, takrorlarni tashlash, ACK tuzish"""
+
+    def __init__(self):
+        self.session = None
+        self.expected = 0
+        self.buffered = {}  # {seq: xabar} - oldinroq kelganlar
+        self.retired = collections.deque(maxlen=RETIRED_SESSIONS)
+
+    def on_data(self, session, base, seq, payload):
+        """Tartib bo'yicha yetkazilishi mumkin bo'lgan xabarlar ro'yxati.
+        None - almashtirilgan sessiyaning kechikkan paketi (ACK ham kerak emas)"""
+        if session != self.session:
+            if session in self.retired:
+                return None
+            if self.session is not None:
+                self.retired.append(self.session)
+            self.session = session
+            self.expected = base
+            self.buffered.clear()
+        if seq < self.expected or seq > self.expected + SACK_BITS:
+            return []  # takror yoki oynadan tashqarida - faqat ACK qaytadi
+        self.buffered[seq] = payload
+        delivered = []
+        while self.expected in self.buffered:
+            delivered.append(self.buffered.pop(self.expected))
+            self.expected += 1
+        return delivered
+
+    def ack(self):
+        sack = 0
+        for seq in self.buffered:
+            sack |= 1 << (seq - self.expected - 1)
+        return ACK_FORMAT.pack(ACK, self.session, self.expected, sack)
+
+
+class Connection:
+    """Bitta peer bilan ikki tomonlama ishonchli kanal"""
+
+    def __init__(self):
+        self.sender = Sender()
+        self.receiver = Receiver()
+        self.last_seen = None
+
+    def send(self, payload, now):
+        return self.sender.send(payload, now)
+
+    def on_packet(self, packet, now):
+        """parse() natijasini qo'llash. (yuboriladigan paketlar, yetkazilgan xabarlar)"""
+        self.last_seen = now
+        if packet[0] == DATA:
+            _, session, base, seq, payload = packet
+            delivered = self.receiver.on_data(session, base, seq, payload)
+            if delivered is None:
+                return [], []
+            return [self.receiver.ack()], delivered
+        _, session, cum, sack = packet
+        return self.sender.on_ack(session, cum, sack, now), []
+
+    def poll(self, now):
+        return self.sender.poll(now)
+
+    def next_timeout(self, now):
+        return self.sender.next_timeout(now)
+
+    def idle(self, now):
+        return not self.sender.inflight and self.last_seen is not None and now - self.last_seen > IDLE_TIMEOUT
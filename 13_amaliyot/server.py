@@ -1,16 +1,200 @@
+"""
+UDP echo server
+Oddiy rejimda har bir xabar ekranga chiqariladi (dars uchun) va mijoz
+bilan rudp.py ishonchli qatlami orqali gaplashiladi: xabarlar tartib
+raqami bilan, ACK va qayta yuborish bilan. rudp formatida bo'lmagan
+paketlar (eski mijozlar) avvalgidek xom echo qilinadi.
+--loss 0.2 - sinov uchun kiruvchi paketlarning 20% ini tashlab yuborish.
+
+--perf rejimida (rudp yo'q, xom echo):
+    - har paketda print yo'q: LOG_INTERVAL soniyada bir marta paket/soniya
+      va namuna xabar (sampled logging)
+    - echo xom baytlar bilan: decode/encode qilinmaydi
+    - qabul buferi bitta: recvfrom_into oldindan ajratilgan bytearray ga
+    - select uyg'onganda socketdagi hamma paketlar ketma-ket o'qiladi
+      (RECV_BATCH tagacha), har paket uchun select chaqirilmaydi
+    - --workers N: N ta jarayon, har biri SO_REUSEPORT bilan o'z socketi;
+      yadro paketlarni (manba ip:port bo'yicha) jarayonlarga taqsimlaydi
+
+Ishlatish:
+    python server.py                        # oddiy rejim
+    python server.py --loss 0.2             # yo'qotishli tarmoqni taqlid qilish
+    python server.py --perf --workers 4     # benchmark uchun (qarang: bench.py)
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import selectors
+import signal
 import socket
+import time
+
+import rudp
 
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5005
+MAX_DATAGRAM = 65535
+RECV_BATCH = 256  # bitta uyg'onishda o'qiladigan paketlar chegarasi
+RCVBUF = 4 * 1024 * 1024  # to'lqinli yuklamada paket yo'qolmasligi uchun
+LOG_INTERVAL = 1.0
+
+
+def make_socket(host, port, reuseport=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, RCVBUF)
+    except OSError:
+        pass
+    sock.bind((host, port))
+    return sock
+
+
+def serve_simple(sock, loss=0.0):
+    """Asl rejim: har xabar ekranga chiqadi; rudp mijozlarga ishonchli echo"""
+    peers = {}  # {addr: rudp.Connection}
+    while True:
+        now = time.monotonic()
+        timeouts = [t for t in (c.next_timeout(now) for c in peers.values()) if t is not None]
+        sock.settimeout(max(0.001, min(timeouts + [1.0])))  # 0 socketni non-blocking qiladi
+        try:
+            data, addr = sock.recvfrom(MAX_DATAGRAM)
+        except socket.timeout:
+            data = None
+        now = time.monotonic()
+
+        if data is not None and random.random() >= loss:
+            packet = rudp.parse(data)
+            if packet is None:
+                # Eski mijoz: oddiy matn, oddiy echo
+                msg = data.decode(errors='replace')
+                print(f"{addr[0]}: {msg}")
+                sock.sendto(data, addr)
+                print("Message", msg)
+            else:
+                conn = peers.get(addr)
+                if conn is None:
+                    conn = peers[addr] = rudp.Connection()
+                packets, delivered = conn.on_packet(packet, now)
+                for payload in delivered:
+                    msg = payload.decode(errors='replace')
+                    print(f"{addr[0]}: {msg}")
+                    packets += conn.send(payload, now)
+                    print("Message", msg)
+                for out in packets:
+                    sock.sendto(out, addr)
+
+        for addr, conn in list(peers.items()):
+            packets, failed = conn.poll(now)
+            for out in packets:
+                sock.sendto(out, addr)
+            if failed:
+                print(f"{addr[0]}:{addr[1]} ga {len(failed)} ta xabar yetkazilmadi")
+            if conn.idle(now):
+                del peers[addr]
+
+
+def serve_perf(sock, worker):
+    """Tez rejim: bitta bufer, xom echo, soniyada bir log satri"""
+    buf = bytearray(MAX_DATAGRAM)
+    view = memoryview(buf)
+    recv_into = sock.recvfrom_into
+    sendto = sock.sendto
+    sock.setblocking(False)
+    sel = selectors.DefaultSelector()
+    sel.register(sock, selectors.EVENT_READ)
+
+    total = 0
+    count = 0  # oxirgi log satridan beri
+    sample = None
+    last_log = time.monotonic()
+    try:
+        while True:
+            timeout = last_log + LOG_INTERVAL - time.monotonic()
+            if timeout > 0 and sel.select(timeout):
+                for _ in range(RECV_BATCH):
+                    try:
+                        size, addr = recv_into(buf)
+                    except BlockingIOError:
+                        break
+                    try:
+                        sendto(view[:size], addr)
+                    except (BlockingIOError, ConnectionRefusedError):
+                        pass  # UDP: javob tashlanadi, server to'xtamaydi
+                    count += 1
+                    if sample is None:
+                        sample = (addr, bytes(view[:min(size, 64)]))
+
+            now = time.monotonic()
+            if now - last_log >= LOG_INTERVAL:
+                if count:
+                    addr, data = sample
+                    print(f"[worker {worker}] {count / (now - last_log):,.0f} paket/s  "
+                          f"namuna {addr[0]}:{addr[1]}: {data.decode(errors='replace')!r}", flush=True)
+                total += count
+                count = 0
+                sample = None
+                last_log = now
+    except KeyboardInterrupt:
+        print(f"[worker {worker}] jami {total + count} paket", flush=True)
+    finally:
+        sel.close()
+        sock.close()
+
+
+def run_worker(host, port, worker, reuseport):
+    serve_perf(make_socket(host, port, reuseport), worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP echo server")
+    parser.add_argument("--host", default=UDP_IP)
+    parser.add_argument("--port", type=int, default=UDP_PORT)
+    parser.add_argument("--perf", action="store_true", help="tez rejim (sampled log, xom echo)")
+    parser.add_argument("--workers", type=int, default=1, help="--perf: SO_REUSEPORT jarayonlar soni")
+    parser.add_argument("--loss", type=float, default=0.0, help="oddiy rejim: tashlanadigan paketlar ulushi")
+    args = parser.parse_args()
+
+    if not args.perf:
+        sock = make_socket(args.host, args.port)
+        print("UDP working...")
+        try:
+            serve_simple(sock, args.loss)
+        except KeyboardInterrupt:
+            print("\nServer to'xtatildi.")
+        return
+
+    if args.workers == 1:
+        print(f"UDP working (perf, pid {os.getpid()})...", flush=True)
+        run_worker(args.host, args.port, 0, False)
+        return
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.bind((UDP_IP, UDP_PORT))
+    if not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("bu platformada SO_REUSEPORT yo'q, --workers 1 ishlating")
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(args.host, args.port, i, True))
+        for i in range(args.workers)
+    ]
+    for w in workers:
+        w.start()
+    print(f"UDP working (perf, {args.workers} worker, SO_REUSEPORT)...", flush=True)
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        # Terminalda SIGINT butun guruhga keladi; faqat ota jarayonga
+        # yuborilgan bo'lsa, qolgan workerlarga o'zimiz uzatamiz
+        for w in workers:
+            w.join(0.5)
+            if w.is_alive():
+                os.kill(w.pid, signal.SIGINT)
+            w.join()
+        print("Server to'xtatildi.")
 
-print("UDP working...")
 
-while True:
-    data, addr = sock.recvfrom(1024)
-    msg = data.decode()
-    print(f"{addr[0]}: {msg}")
-    sock.sendto(msg.encode(), addr)
-    print("Message", msg)
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import asyncio
+import os
 from contextlib import asynccontextmanager
 
-import uvicorn
-import uvloop
 from fastapi import FastAPI
 
-
-asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+# Only what the app itself needs is imported here: every worker and the
+# reloader import this module. uvicorn/uvloop are loaded in main() and
+# serving.py, see startup_profile.py in the repo root.
 
 
 @asynccontextmanager
@@ -17,12 +17,12 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # Shutdown logic
+    # Shutdown logic. In-flight requests are already drained by the server
+    # (see serving.TimedServer), so there is nothing left to wait for here
     print("shutting down...")
     if hasattr(app.state, "db_connection"):
         app.state.db_connection = None
         print("disconnecting...")
-    await asyncio.sleep(5)
     print("terminated")
 
 
@@ -34,8 +34,38 @@ async def home():
     return {"message": "FastAPI working."}
 
 
+# Demo endpoint for watching the shutdown drain. Dev mode turns it on; with
+# --prod it is only there if DEMO_ENDPOINTS=1 is set explicitly. An env var
+# rather than an argument: workers and the reloader import main:app without
+# running main()
+if os.environ.get("DEMO_ENDPOINTS") == "1":
+    @app.get("/slow")
+    async def slow(seconds: float = 2.0):
+        """Long request, up to 60 s"""
+        await asyncio.sleep(min(seconds, 60.0))
+        return {"message": f"slept {seconds}s"}
+
+
 def main():
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_level="info")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FastAPI server")
+    parser.add_argument("--prod", action="store_true", help="N workers, no reloader, graceful drain")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if not args.prod:
+        import uvicorn
+
+        os.environ.setdefault("DEMO_ENDPOINTS", "1")
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True, loop="uvloop", log_level="info")
+        return
+
+    from serving import serve
+
+    serve("main:app", args.host, args.port, args.workers)
 
 
 if __name__ == "__main__":
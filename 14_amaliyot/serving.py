@@ -0,0 +1,62 @@
+"""Production runner for main.py --prod, imported only when serving.
+
+Kept out of main.py so that importing the app (every worker, the reloader,
+startup_profile.py) does not pay for uvicorn and the supervisor.
+"""
+
+import os
+import time
+
+import psutil
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+DRAIN_TIMEOUT = 10  # max seconds to wait for in-flight requests on shutdown
+LAUNCHED_ENV = "SERVER_LAUNCHED"  # supervisor process start (time.time()), inherited by workers
+
+
+class TimedServer(uvicorn.Server):
+    """uvicorn.Server that reports how long startup and shutdown took.
+
+    On shutdown uvicorn stops accepting, lets in-flight requests finish and
+    returns as soon as they are done (or cancels them after
+    timeout_graceful_shutdown), then runs the lifespan shutdown.
+    """
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        launched = float(os.environ.get(LAUNCHED_ENV, time.time()))
+        print(f"[{os.getpid()}] ready {(time.time() - launched) * 1000:.0f} ms after launch", flush=True)
+
+    async def shutdown(self, sockets=None):
+        started = time.perf_counter()
+        state = self.server_state
+        print(f"[{os.getpid()}] draining {len(state.tasks)} request(s), "
+              f"{len(state.connections)} connection(s)", flush=True)
+        await super().shutdown(sockets=sockets)
+        print(f"[{os.getpid()}] shutdown took {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+
+
+def serve(app, host, port, workers):
+    """N workers, no reloader, graceful drain"""
+    # Process start, so "ready after launch" includes interpreter and imports
+    os.environ[LAUNCHED_ENV] = str(psutil.Process().create_time())
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        access_log=False,
+        log_level="warning",
+        timeout_graceful_shutdown=DRAIN_TIMEOUT,
+    )
+    server = TimedServer(config)
+    # Same as uvicorn.run(..., workers=N) but with TimedServer in every worker
+    try:
+        if workers > 1:
+            Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+        else:
+            server.run()
+    except KeyboardInterrupt:
+        pass  # uvicorn re-raises the captured Ctrl+C after a clean shutdown
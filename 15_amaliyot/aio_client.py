@@ -0,0 +1,495 @@
+"""
+Asinxron chat mijozi (asyncio)
+client.py dan farqlari:
+- fayllar fon vazifasi (task) sifatida yuklanadi, chat to'xtab qolmaydi;
+  jarayon (foiz, MB/s) vaqti-vaqti bilan chiqariladi
+- chiquvchi xabarlar navbatga yig'iladi va bitta write() bilan yuboriladi
+  (bir tick davomida yozilgan xabarlar birlashadi)
+- kelgan qatorlar ham bitta o'qishdagi barchasi birga chiqariladi
+- ulanish uzilsa eksponensial kechikish (backoff) bilan qayta ulanadi va
+  sessiya tiklanadi: o'sha ism, o'sha xonalar va joriy xona, uzilish
+  paytida yozilgan xabarlar keyin yuboriladi
+- headless rejim: skript yoki N ta xabar yuborib, JSON statistika chiqaradi
+
+Ishlatish:
+    python aio_client.py                                  # interaktiv
+    python aio_client.py --nick bot1 --script steps.txt --json
+    python aio_client.py --nick bot2 --messages 1000 --rate 200 --quiet --json
+
+Skript fayli - har qatorda chatga yuboriladigan matn yoki buyruq;
+qo'shimcha mahalliy buyruqlar: !sleep <soniya>, !wait (yuklashlarni kutish).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+from client import CHAT_PORT, DEFAULT_CODEC, FILE_PORT, HOST, file_digest
+from compression import compressor, is_codec, parse_codec
+from protocol import LineReader, MAX_LINE, RECV_SIZE, decode_line, encode_line
+
+
+DEFAULT_ROOM = "general"
+RECONNECT_MIN = 0.5  # birinchi qayta ulanishdan oldingi kutish (soniya)
+RECONNECT_MAX = 30.0
+READY_TIMEOUT = 30.0  # headless rejimda birinchi ro'yxatdan o'tishni kutish
+MAX_OUTBOX = 10000  # ulanish yo'qligida saqlanadigan xabarlar (eskilari tashlanadi)
+UPLOAD_BLOCK = 1024 * 1024
+UPLOAD_RETRIES = 3
+PROGRESS_INTERVAL = 1.0  # soniya
+
+# Server javoblari (main.py / aio_server.py)
+PROMPT = "[SERVER] Ismingizni kiriting:"
+WELCOME = "[SERVER] Xush kelibsiz, "
+NAME_TAKEN = "[SERVER] Bu ism band."
+NAME_INVALID = "[SERVER] Ism "
+CURRENT_ROOM = "[SERVER] Joriy xona: #"
+LEFT_ROOM = " dan chiqdingiz. Joriy xona: "
+
+
+def read_block(f, comp):
+    """Fayldan keyingi blok (executor threadida): (o'qilgan bayt, yuboriladigan ma'lumot)"""
+    block = f.read(UPLOAD_BLOCK)
+    if comp is None:
+        return len(block), block
+    return len(block), comp.compress(block) if block else comp.flush()
+
+
+class ChatClient:
+    """Bitta chat sessiyasi: ulanish, qayta ulanish, navbat va yuklashlar"""
+
+    def __init__(self, host=HOST, port=CHAT_PORT, file_port=FILE_PORT, nickname=None,
+                 quiet=False, interactive=True):
+        self.host = host
+        self.port = port
+        self.file_port = file_port
+        self.nickname = nickname
+        self.quiet = quiet
+        self.interactive = interactive
+        self.rooms = set()
+        self.room = None
+        self.writer = None
+        self.registered = False
+        self.outbox = deque()
+        self.wakeup = asyncio.Event()
+        self.ready = asyncio.Event()  # birinchi marta ro'yxatdan o'tildi
+        self.stopped = asyncio.Event()
+        self.uploads = {}  # {task: jarayon dict}
+        self.stats = {
+            'sent': 0, 'received': 0, 'batches': 0, 'dropped': 0,
+            'sessions': 0, 'reconnects': 0, 'uploads': [],
+        }
+
+    def output(self, text):
+        if not self.quiet:
+            print(text)
+
+    # ------------------------------------------------------------ ulanish
+
+    async def run(self):
+        """Ulanish sikli: uzilsa backoff bilan qayta ulanish"""
+        delay = RECONNECT_MIN
+        while not self.stopped.is_set():
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_LINE)
+            except OSError as e:
+                self.output(f"[client] Serverga ulanib bo'lmadi: {e}")
+            else:
+                self.writer = writer
+                if self.nickname:
+                    # Ism so'rovini kutmasdan yuboriladi (qayta ulanishda ham)
+                    writer.write(encode_line(self.nickname))
+                try:
+                    if await self.receive(reader):
+                        delay = RECONNECT_MIN
+                finally:
+                    self.writer = None
+                    self.registered = False
+                    writer.close()
+                if self.stopped.is_set():
+                    break
+                self.stats['reconnects'] += 1
+                self.output("[client] Server bilan ulanish uzildi.")
+
+            # Bir vaqtda uzilgan mijozlar bir paytda qaytib kelmasligi uchun jitter
+            wait = random.uniform(delay / 2, delay)
+            self.output(f"[client] {wait:.1f}s dan keyin qayta ulanish...")
+            try:
+                await asyncio.wait_for(self.stopped.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def receive(self, reader):
+        """Serverdan o'qish. Shu ulanishda ro'yxatdan o'tilgan bo'lsa True"""
+        lines_reader = LineReader()
+        registered = False
+        while True:
+            try:
+                data = await reader.read(RECV_SIZE)
+                lines = lines_reader.feed(data)
+            except (ConnectionError, OSError, ValueError):
+                return registered
+            if not data:
+                return registered
+            shown = []
+            for line in lines:
+                text = decode_line(line)
+                self.stats['received'] += 1
+                if self.handle_server_line(text):
+                    shown.append(text)
+            registered = registered or self.registered
+            if shown and not self.quiet:
+                sys.stdout.write("\n".join(shown) + "\n")
+
+    def handle_server_line(self, text):
+        """Sessiya holatini server javoblaridan kuzatish. Chiqarish kerak bo'lsa True"""
+        if not self.registered:
+            if text.startswith(PROMPT):
+                return self.nickname is None
+            if text.startswith(WELCOME):
+                self.on_welcome(text)
+                return self.stats['sessions'] == 1
+            if text.startswith(NAME_TAKEN) and self.interactive and not self.stats['sessions']:
+                self.nickname = None
+                return True
+            if text.startswith(NAME_TAKEN) and self.nickname:
+                # Eski ulanish serverda hali yopilmagan bo'lishi mumkin - keyinroq urinish
+                self.output(f"[client] '{self.nickname}' ismi hozircha band")
+                self.writer.close()
+                return False
+            if text.startswith(NAME_INVALID):
+                self.nickname = None
+                if not self.interactive:
+                    self.output(text)
+                    self.close()
+                return True
+
+        if text.startswith(CURRENT_ROOM):
+            self.room = text[len(CURRENT_ROOM):]
+            self.rooms.add(self.room)
+        elif text.startswith("[SERVER] #") and LEFT_ROOM in text:
+            left, _, current = text[len("[SERVER] #"):].partition(LEFT_ROOM)
+            self.rooms.discard(left)
+            self.room = current[1:] if current.startswith("#") else None
+        return True
+
+    def on_welcome(self, text):
+        """Ro'yxatdan o'tildi: birinchi marta yoki oldingi sessiyani tiklash"""
+        self.nickname = text[len(WELCOME):].partition("!")[0]
+        saved_rooms, saved_room = set(self.rooms), self.room
+        # Server yangi mijozni DEFAULT_ROOM ga qo'shadi
+        self.rooms = {DEFAULT_ROOM}
+        self.room = DEFAULT_ROOM
+        self.stats['sessions'] += 1
+        if self.stats['sessions'] > 1:
+            commands = [f"!join {room}" for room in sorted(saved_rooms - {DEFAULT_ROOM, saved_room})]
+            if saved_rooms and DEFAULT_ROOM not in saved_rooms:
+                commands.append(f"!leave {DEFAULT_ROOM}")
+            if saved_room and saved_room != DEFAULT_ROOM:
+                commands.append(f"!join {saved_room}")
+            # Navbatdagi xabarlardan oldin - ular to'g'ri xonaga tushishi uchun
+            self.writer.write(b"".join(encode_line(c) for c in commands))
+            self.output(f"[client] Sessiya tiklandi: {self.nickname}, xonalar: "
+                        + ", ".join(f"#{r}" for r in sorted(saved_rooms or {DEFAULT_ROOM})))
+        self.registered = True
+        self.ready.set()
+        self.wakeup.set()
+
+    # ------------------------------------------------------------ yuborish
+
+    def send(self, text):
+        """Xabarni navbatga qo'yish (sender taskida birlashtirib yuboriladi)"""
+        if len(self.outbox) >= MAX_OUTBOX:
+            self.outbox.popleft()
+            self.stats['dropped'] += 1
+        self.outbox.append(encode_line(text))
+        self.wakeup.set()
+
+    async def sender(self):
+        """Navbatdagi barcha xabarlarni bitta write() bilan yuborish"""
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            writer = self.writer
+            if self.outbox and self.registered and writer is not None:
+                batch = b"".join(self.outbox)
+                self.stats['sent'] += len(self.outbox)
+                self.stats['batches'] += 1
+                self.outbox.clear()
+                writer.write(batch)
+                try:
+                    await writer.drain()
+                except (ConnectionError, OSError):
+                    pass  # receive() uzilishni ko'radi
+            if self.stopped.is_set() and writer is not None and not self.outbox:
+                writer.close()
+
+    def submit(self, line):
+        """Foydalanuvchi (yoki skript) qatori"""
+        text = line.strip()
+        if not text:
+            return
+        if text.startswith("!file ") or text.startswith("!zfile "):
+            self.start_upload(text)
+        elif text == "!uploads":
+            self.print_uploads()
+        elif text == "!exit":
+            self.send("!exit")
+            self.close()
+        elif self.nickname is None:
+            # Birinchi qator - ism (server so'ragan)
+            self.nickname = text
+            if self.writer is not None:
+                self.writer.write(encode_line(text))
+        else:
+            self.send(text)
+
+    def close(self):
+        """Navbatni yuborib, qayta ulanmasdan to'xtash"""
+        self.stopped.set()
+        self.wakeup.set()
+        if not self.registered and self.writer is not None:
+            self.writer.close()
+
+    # ------------------------------------------------------------ yuklashlar
+
+    def start_upload(self, text):
+        """`!file <fayl>` yoki `!zfile [kodek] <fayl>` - fon vazifasi"""
+        command, _, rest = text.partition(" ")
+        codec = None
+        if command == "!zfile":
+            codec, _, filename = rest.partition(" ")
+            if not filename or not is_codec(codec):
+                codec, filename = DEFAULT_CODEC, rest
+        else:
+            filename = rest
+        if not os.path.exists(filename):
+            self.output(f"Xato: {filename} fayli topilmadi.")
+            return
+        progress = {
+            'name': os.path.basename(filename), 'size': os.path.getsize(filename),
+            'sent': 0, 'wire': 0, 'started': time.perf_counter(), 'ok': None,
+        }
+        task = asyncio.create_task(self.upload(filename, codec, progress))
+        self.uploads[task] = progress
+        task.add_done_callback(self.uploads.pop)
+
+    async def wait_uploads(self):
+        if self.uploads:
+            await asyncio.gather(*self.uploads, return_exceptions=True)
+
+    def print_uploads(self):
+        if not self.uploads:
+            self.output("[upload] Faol yuklashlar yo'q")
+        for progress in self.uploads.values():
+            self.output(self.progress_line(progress))
+
+    def progress_line(self, progress):
+        elapsed = time.perf_counter() - progress['started']
+        percent = 100 * progress['sent'] / progress['size'] if progress['size'] else 100
+        rate = progress['sent'] / elapsed / 1024 ** 2 if elapsed > 0 else 0
+        return (f"[upload] {progress['name']}: {percent:3.0f}% "
+                f"{progress['sent'] / 1024 ** 2:.1f}/{progress['size'] / 1024 ** 2:.1f} MB, {rate:.1f} MB/s")
+
+    async def upload(self, filename, codec, progress):
+        """Faylni yuklash; ulanish uzilsa UPLOAD_RETRIES marta qayta urinish"""
+        delay = RECONNECT_MIN
+        for attempt in range(UPLOAD_RETRIES):
+            try:
+                progress['ok'] = await self.upload_once(filename, codec, progress)
+                break
+            except (ConnectionError, OSError) as e:
+                self.output(f"[upload] {progress['name']}: {e}")
+                if attempt + 1 < UPLOAD_RETRIES:
+                    await asyncio.sleep(random.uniform(delay / 2, delay))
+                    delay = min(delay * 2, RECONNECT_MAX)
+            except ValueError as e:
+                self.output(f"[upload] {progress['name']}: {e}")
+                break
+        self.stats['uploads'].append({
+            'name': progress['name'], 'ok': bool(progress['ok']), 'bytes': progress['size'],
+            'wire': progress['wire'], 'seconds': round(time.perf_counter() - progress['started'], 3),
+        })
+        return progress['ok']
+
+    async def upload_once(self, filename, codec, progress):
+        """PUT protokoli (qarang: client.send_file). Fayl o'qish va siqish executor'da"""
+        loop = asyncio.get_running_loop()
+        if 'sha256' not in progress:
+            progress['sha256'] = await loop.run_in_executor(None, file_digest, filename)
+        digest = progress['sha256']
+        codec = parse_codec(codec) if codec else None
+        progress['sent'] = progress['wire'] = 0
+
+        reader, writer = await asyncio.open_connection(self.host, self.file_port)
+        try:
+            header = f"PUT|{progress['name']}|{progress['size']}|{HOST}:{FILE_PORT}|{digest}"
+            if codec:
+                header += f"|{codec[0]}:{codec[1]}"
+            writer.write(encode_line(header))
+            reply = await self.read_reply(reader)
+            if reply.startswith("HAVE"):
+                progress['sent'] = progress['size']
+                self.output(f"[upload] {progress['name']}: serverda bor ({digest[:12]}), qayta yuborilmadi")
+                return True
+            if reply != "READY":
+                raise ValueError(reply)
+
+            comp = compressor(*codec) if codec else None
+            next_report = time.perf_counter() + PROGRESS_INTERVAL
+            with open(filename, 'rb') as f:
+                while True:
+                    size, data = await loop.run_in_executor(None, read_block, f, comp)
+                    if data:
+                        writer.write(data)
+                        await writer.drain()
+                    progress['sent'] += size
+                    progress['wire'] += len(data)
+                    if not size:
+                        break
+                    if time.perf_counter() >= next_report:
+                        self.output(self.progress_line(progress))
+                        next_report += PROGRESS_INTERVAL
+
+            response = await self.read_reply(reader)
+            self.output(self.progress_line(progress))
+            self.output(f"[SERVER] {response}")
+            return response.startswith("SUCCESS")
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_reply(reader):
+        line = await reader.readline()
+        if not line.endswith(b"\n"):
+            raise ConnectionError("Server ulanishni yopdi")
+        return decode_line(line[:-1])
+
+
+# ---------------------------------------------------------------- rejimlar
+
+
+async def read_stdin(client):
+    """Interaktiv rejim: input() alohida threadda, qatorlar loop'ga uzatiladi"""
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+
+    def reader():
+        while True:
+            try:
+                line = input()
+            except (EOFError, KeyboardInterrupt):
+                loop.call_soon_threadsafe(lines.put_nowait, None)
+                return
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+
+    threading.Thread(target=reader, daemon=True).start()
+    while not client.stopped.is_set():
+        line = await lines.get()
+        if line is None:
+            break
+        client.submit(line)
+
+
+async def run_script(client, path):
+    """Skript qatorlarini ketma-ket bajarish (!sleep va !wait - mahalliy)"""
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        text = line.strip()
+        if text.startswith("!sleep "):
+            await asyncio.sleep(float(text[7:]))
+        elif text == "!wait":
+            await client.wait_uploads()
+        else:
+            client.submit(text)
+        if client.stopped.is_set():
+            return
+
+
+async def send_messages(client, count, rate, prefix):
+    """Benchmark: `count` ta xabarni `rate` xabar/s tezlikda (0 - imkon qadar tez)"""
+    start = time.perf_counter()
+    for i in range(count):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        while len(client.outbox) >= MAX_OUTBOX // 2:
+            await asyncio.sleep(0.001)
+        client.send(f"{prefix} {i}")
+        if not rate and i % 100 == 99:
+            await asyncio.sleep(0)
+
+
+async def amain(args):
+    headless = bool(args.script or args.messages)
+    client = ChatClient(args.host, args.port, args.file_port, args.nick,
+                        quiet=args.quiet, interactive=not headless)
+    runner = asyncio.create_task(client.run())
+    sender = asyncio.create_task(client.sender())
+    started = time.perf_counter()
+    try:
+        if headless:
+            await asyncio.wait_for(client.ready.wait(), READY_TIMEOUT)
+            if args.script:
+                await run_script(client, args.script)
+            if args.messages:
+                await send_messages(client, args.messages, args.rate, args.prefix)
+            await client.wait_uploads()
+            await asyncio.sleep(args.linger)
+        else:
+            print("Chat serverga ulanmoqda. Buyruqlar: !exit, !list, !file <fayl>, "
+                  "!zfile [kodek] <fayl>, !uploads\n")
+            await read_stdin(client)
+    except asyncio.TimeoutError:
+        print(f"Xato: {READY_TIMEOUT:.0f}s ichida serverda ro'yxatdan o'tib bo'lmadi", file=sys.stderr)
+    finally:
+        client.close()
+        try:
+            await asyncio.wait_for(runner, 5.0)
+        except asyncio.TimeoutError:
+            runner.cancel()
+        sender.cancel()
+        for task in list(client.uploads):
+            task.cancel()
+
+    if args.json:
+        client.stats['unsent'] = len(client.outbox)
+        client.stats['seconds'] = round(time.perf_counter() - started, 3)
+        print(json.dumps(client.stats))
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asynchronous chat client")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=CHAT_PORT)
+    parser.add_argument("--file-port", type=int, default=FILE_PORT)
+    parser.add_argument("--nick", default=None, help="ism (headless rejimda majburiy)")
+    parser.add_argument("--script", default=None, help="headless: qatorlari yuboriladigan fayl")
+    parser.add_argument("--messages", type=int, default=0, help="headless: shuncha xabar yuborish")
+    parser.add_argument("--rate", type=float, default=0, help="xabar/s (0 - imkon qadar tez)")
+    parser.add_argument("--prefix", default="msg", help="--messages xabarlari prefiksi")
+    parser.add_argument("--linger", type=float, default=0.5, help="oxirida javoblarni kutish (soniya)")
+    parser.add_argument("--quiet", action="store_true", help="kelgan xabarlarni chiqarmaslik")
+    parser.add_argument("--json", action="store_true", help="oxirida statistikani JSON qilib chiqarish")
+    args = parser.parse_args()
+    if (args.script or args.messages) and not args.nick:
+        parser.error("headless rejimda --nick kerak")
+
+    try:
+        asyncio.run(amain(args))
+    except KeyboardInterrupt:
+        print("\nChatdan chiqildi.")
+
+
+if __name__ == "__main__":
+    main()
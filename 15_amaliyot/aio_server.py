@@ -0,0 +1,719 @@
+"""
+asyncio backend: chat va fayl serverining asyncio/uvloop varianti
+`python main.py --backend asyncio` (yoki `--backend uvloop`) bilan ishga
+tushiriladi. Protokol va
+buyruqlar (!exit, !list, !join, !leave, !rooms, !msg, !stats, oddiy va
+bo'laklab fayl yuklash) selectors versiyasi bilan bir xil, shuning uchun
+client.py, loadgen.py va benchmarklar ikkala backendda ishlaydi.
+
+- ulanishlar asyncio.start_server streamlari orqali qabul qilinadi
+- tick davomida to'plangan xabarlar tick oxirida har bir mijozga bitta
+  write() bilan yoziladi (call_soon orqali, main.py dagi flush_pending kabi)
+- har bir mijozning alohida writer taski bor: transport buferi to'lganda
+  u drain() bilan sekin mijozni kutadi (backpressure). Navbat
+  HIGH_WATERMARK dan oshsa broadcastlar --slow-policy bo'yicha tashlanadi
+  yoki mijoz uziladi; idle-timeout taymerlari timer wheel da
+- xona tarixi va segment fayl history.py orqali
+- navbat siyosati, metrikalar, log va upload sarlavhalari main.py bilan
+  umumiy (server_core.py) - bu fayl faqat transport qismi
+- --backend uvloop bilan standart event loop o'rniga uvloop ishlatiladi
+
+Ko'p jarayonli rejim (--workers) faqat selectors backendida.
+"""
+
+import asyncio
+import hashlib
+import os
+import socket
+import time
+from collections import defaultdict, deque
+from itertools import count
+
+from blob_store import BlobStore
+from compression import StreamDecoder
+from history import HistoryStore
+from metrics import start_http_server
+from protocol import MAX_LINE, decode_line, encode_line
+from server_core import (
+    DEFAULT_ROOM, FILE_PORT, HISTORY_FLUSH, HOST, MAX_HEADER, MAX_NAME, PORT, TIMER_RESOLUTION,
+    UPLOAD_CHUNK, UPLOADS_DIR,
+    broadcast_deliveries, broadcast_encodes, bytes_sent, dropped_messages, fanout_seconds,
+    history_replays, loop_lag, message_size, queue_depth, registry, send_calls, timers,
+    total_messages, upload_bytes, partials,
+    active_partial, cancel_timers, chunk_done, chunk_offset, client_entry, close_partial, commit_blob,
+    compression_summary, configure, decompress, enqueue, hash_partial, history_replay, link_blob,
+    list_page, log_message, missing_chunks, observe_compression, open_partial, parse_init, parse_put,
+    parse_upload, pwrite_all, release_partial, resume, start_idle_timer, start_log, valid_name,
+)
+
+
+LAG_INTERVAL = 0.1  # event loop kechikishini o'lchash oralig'i (soniya)
+# start_server standart backlog=100; loop band paytida ulanish to'lqini
+# SYN qayta yuborishlariga (1s, 3s, ...) olib kelmasligi uchun kattaroq
+BACKLOG = socket.SOMAXCONN
+# Transport buferi shundan oshsa drain() kutadi (writer taskiga o'tiladi)
+WRITE_BUFFER_HIGH = 64 * 1024
+
+# Mijozlar: {id: {'id', 'addr', 'nickname', 'writer', 'rooms', 'room',
+#                 'outq': deque[bytes | memoryview], 'outbytes',
+#                 'paused', 'dropped', 'draining': bool, 'wakeup': Event,
+#                 'blocked_since', 'slow_since', 'last_active', 'idle_timer',
+#                 'slow_timer', 'task': o'qish taski (to'xtashda tugashi kutiladi)}}
+# main.py dagidan farqi: outq har tick'da transportga beriladi, shuning
+# uchun lag transport buferi to'lib drain() kutilgan paytdan hisoblanadi
+clients = {}
+client_ids = count(1)
+rooms = defaultdict(set)  # {xona: {id, ...}}
+nicknames = {}  # {nickname: id}
+
+# Shu tick davomida navbatiga yangi ma'lumot qo'shilgan mijozlar va
+# tick oxirida ularni yuboradigan call_soon handle'i
+pending_flush = set()
+flush_handle = None
+
+log_writer = None
+history = None
+store = None  # upload ombori (qarang: blob_store.py)
+
+
+def register_gauges():
+    """Scrape paytida hisoblanadigan, shu backend holatiga bog'liq gauge'lar"""
+    registry.gauge("chat_active_clients", "Ulangan mijozlar", lambda: len(clients))
+    registry.gauge("chat_rooms", "Bo'sh bo'lmagan xonalar", lambda: len(rooms))
+    registry.gauge("chat_slow_clients", "HIGH_WATERMARK dan oshgan mijozlar", lambda: sum(info['paused'] for info in list(clients.values())))
+    registry.gauge("upload_index_names", "Upload indeksidagi fayl nomlari", lambda: len(store.index) if store else 0)
+    registry.gauge("chat_history_messages", "Xonalar tarixidagi xabarlar", lambda: len(history) if history else 0)
+
+
+# ---------------------------------------------------------------- chat
+
+
+def queue_send(info, data, droppable=True):
+    """Mijoz navbatiga tayyor baytlarni qo'shish (siyosat: server_core.enqueue).
+
+    Hech narsa darhol yozilmaydi: tick oxirida flush_pending() har bir
+    mijozga to'plangan buferlarni bitta write() bilan beradi (main.py dagi
+    kabi).
+    """
+    global flush_handle
+    if info['writer'].is_closing():
+        return
+    queued = enqueue(info, data, droppable)
+    if queued is None:
+        abort_client(info)
+    elif queued and not info['draining']:
+        pending_flush.add(info['id'])
+        if flush_handle is None:
+            flush_handle = asyncio.get_running_loop().call_soon(flush_pending)
+
+
+def abort_client(info):
+    """Mijozni darhol uzish: abort() yuborilmagan buferni kutmaydi, reader
+    taski EOF olib tozalaydi (sekin mijoz yoki MAX_QUEUE oshganda)"""
+    info['writer'].transport.abort()
+
+
+def close_idle(info, data):
+    """Faolsiz mijozga oxirgi xabarni yozib ulanishni yopish"""
+    if not info['draining']:
+        info['outq'].append(data)
+        info['outbytes'] += len(data)
+        write_queue(info)
+    info['writer'].close()
+
+
+def write_queue(info):
+    """Navbatdagi buferlarni bitta write() bilan transportga berish.
+
+    uvloop writelines() har bir bufer uchun alohida yozadi, shuning uchun
+    buferlar oldin birlashtiriladi. Yozilgan baytlar sonini qaytaradi.
+    """
+    outq = info['outq']
+    queue_depth.observe(info['outbytes'])
+    data = outq[0] if len(outq) == 1 else b"".join(outq)
+    outq.clear()
+    size = info['outbytes']
+    info['outbytes'] = 0
+    info['writer'].write(data)
+    return size
+
+
+def flush_pending():
+    """Tick oxirida: har bir mijozga to'plangan xabarlarni yuborish"""
+    global flush_handle
+    flush_handle = None
+    calls = total = 0
+    for client_id in pending_flush:
+        info = clients.get(client_id)
+        if info is None or info['draining'] or not info['outq'] or info['writer'].is_closing():
+            continue
+        total += write_queue(info)
+        calls += 1
+        if info['writer'].transport.get_write_buffer_size() >= WRITE_BUFFER_HIGH:
+            # Transport buferi to'ldi - qolgani writer taskida drain() dan keyin
+            info['draining'] = True
+            info['blocked_since'] = time.monotonic()
+            info['wakeup'].set()
+        elif info['paused']:
+            # Bitta tick'da HIGH_WATERMARK dan oshgan, lekin transport hammasini oldi
+            resume(info)
+    pending_flush.clear()
+    send_calls.inc(calls)
+    bytes_sent.inc(total)
+
+
+async def client_writer(info):
+    """Mijozning writer taski: faqat transport buferi to'lganda ishlaydi.
+
+    drain() mijoz o'qiguncha kutadi (backpressure). Shu vaqt ichida
+    xabarlar outq da to'planadi va HIGH_WATERMARK dan oshsa broadcastlar
+    tashlanadi; bufer bo'shagach to'plangan navbat bitta write() bilan
+    yoziladi.
+    """
+    writer = info['writer']
+    wakeup = info['wakeup']
+    while True:
+        await wakeup.wait()
+        wakeup.clear()
+        while True:
+            await writer.drain()
+            if not info['outq']:
+                break
+            size = write_queue(info)
+            send_calls.inc()
+            bytes_sent.inc(size)
+        info['draining'] = False
+        info['blocked_since'] = None
+        if info['paused']:
+            resume(info)
+
+
+def reply_client(info, text):
+    """Mijozga shaxsiy javob (tashlab yuborilmaydi)"""
+    queue_send(info, encode_line(text), droppable=False)
+
+
+def broadcast_message(sender_id, message, exclude_sender=True, room=None, record=False):
+    """Xona a'zolariga (room=None bo'lsa barchaga) bir marta kodlangan xabar.
+    record=True bo'lsa xabar xona tarixiga ham yoziladi.
+    """
+    started = time.perf_counter()
+    targets = clients if room is None else rooms.get(room, ())
+    data = message.encode('utf-8')
+    if record and room is not None:
+        history.record(room, data)
+    delivered = 0
+    for client_id in targets:
+        if exclude_sender and client_id == sender_id:
+            continue
+        queue_send(clients[client_id], data)
+        delivered += 1
+    broadcast_encodes.inc()
+    broadcast_deliveries.inc(delivered)
+    fanout_seconds.observe(time.perf_counter() - started)
+
+
+def remove_from_room(client_id, room):
+    members = rooms.get(room)
+    if members is not None:
+        members.discard(client_id)
+        if not members:
+            del rooms[room]
+
+
+def join_room(info, room):
+    """Mijozni xonaga qo'shish va uni joriy xona qilish"""
+    info['room'] = room
+    if room in info['rooms']:
+        return
+    info['rooms'].add(room)
+    rooms[room].add(info['id'])
+    broadcast_message(info['id'], f"[SERVER] [#{room}] {info['nickname']} xonaga qo'shildi.\n", room=room)
+    replay_history(info, room)
+
+
+def replay_history(info, room):
+    """Xonaning oxirgi xabarlarini yangi a'zoga bitta bufer bilan yuborish"""
+    data = history_replay(history, room)
+    if data:
+        queue_send(info, data, droppable=False)
+        history_replays.inc()
+
+
+def flush_history():
+    """Segment faylni vaqti-vaqti bilan diskka tushirish (timer wheel orqali)"""
+    history.flush()
+    timers.schedule(HISTORY_FLUSH, flush_history)
+
+
+def leave_room(info, room):
+    """Mijozni xonadan chiqarish"""
+    info['rooms'].discard(room)
+    remove_from_room(info['id'], room)
+    if info['room'] == room:
+        info['room'] = next(iter(info['rooms']), None)
+    broadcast_message(info['id'], f"[SERVER] [#{room}] {info['nickname']} xonadan chiqdi.\n", room=room)
+
+
+def list_clients(page):
+    """!list uchun bitta sahifa"""
+    now = time.monotonic()
+    return list_page(page, len(clients), (client_entry(info, now) for info in clients.values()))
+
+
+def fanout_summary():
+    return (
+        f"Fan-out: {broadcast_encodes.value} encode -> {broadcast_deliveries.value} yetkazish, "
+        f"{send_calls.value} write, {bytes_sent.value} bayt, tashlangan: {dropped_messages.value}"
+    )
+
+
+def handle_client_command(info, command):
+    """Maxsus buyruqlar. (bajarildimi, mijoz qolsinmi) qaytaradi"""
+    parts = command.strip().split(maxsplit=2)
+    verb = parts[0].lower()
+
+    if verb == "!exit":
+        return True, False
+    elif verb == "!list":
+        page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+        queue_send(info, list_clients(page).encode('utf-8'), droppable=False)
+    elif verb == "!join":
+        room = parts[1].lstrip('#') if len(parts) > 1 else ""
+        if not valid_name(room):
+            reply_client(info, "[SERVER] Foydalanish: !join <xona>")
+        else:
+            join_room(info, room)
+            reply_client(info, f"[SERVER] Joriy xona: #{room}")
+    elif verb == "!leave":
+        room = parts[1].lstrip('#') if len(parts) > 1 else info['room']
+        if room not in info['rooms']:
+            reply_client(info, "[SERVER] Siz bu xonada emassiz.")
+        else:
+            leave_room(info, room)
+            current = f"#{info['room']}" if info['room'] else "yo'q (!join <xona>)"
+            reply_client(info, f"[SERVER] #{room} dan chiqdingiz. Joriy xona: {current}")
+    elif verb == "!stats":
+        reply_client(info, f"[SERVER] {fanout_summary()}")
+    elif verb == "!rooms":
+        lines = [
+            f"  {'*' if room == info['room'] else ' '} #{room} ({len(members)})"
+            for room, members in sorted(rooms.items())
+        ]
+        queue_send(info, ("[SERVER] Xonalar:\n" + "\n".join(lines) + "\n").encode('utf-8'), droppable=False)
+    elif verb == "!msg":
+        if len(parts) < 3:
+            reply_client(info, "[SERVER] Foydalanish: !msg <ism> <xabar>")
+        else:
+            target_id = nicknames.get(parts[1])
+            if target_id is None:
+                reply_client(info, f"[SERVER] {parts[1]} topilmadi.")
+            else:
+                queue_send(clients[target_id], f"[{info['nickname']} -> siz]: {parts[2]}\n".encode('utf-8'))
+                log_message("DIRECT", f"{info['nickname']} -> {parts[1]}: {parts[2]}", info['addr'])
+                total_messages.inc()
+    else:
+        return False, True
+    return True, True
+
+
+def handle_line(info, message):
+    """Bitta xabarni qayta ishlash. Mijoz chiqishi kerak bo'lsa False"""
+    if not message:
+        return True
+    addr = info['addr']
+
+    # Birinchi xabar - mijozning ismi
+    if info['nickname'] is None:
+        if not valid_name(message):
+            reply_client(info, f"[SERVER] Ism {MAX_NAME} belgigacha harf/raqamdan iborat bo'lsin. Ismingizni kiriting:")
+        elif message in nicknames:
+            reply_client(info, "[SERVER] Bu ism band. Boshqa ism kiriting:")
+        else:
+            info['nickname'] = message
+            nicknames[message] = info['id']
+            log_message("REGISTER", f"{addr[0]}:{addr[1]} ismi: {message}", addr)
+            reply_client(info, f"[SERVER] Xush kelibsiz, {message}! Buyruqlar: !join, !leave, !rooms, !msg, !list")
+            join_room(info, DEFAULT_ROOM)
+        return True
+
+    nickname = info['nickname']
+    message_size.observe(len(message))
+    if message.startswith('!'):
+        handled, keep = handle_client_command(info, message)
+        if handled:
+            return keep
+
+    room = info['room']
+    if room is None:
+        reply_client(info, "[SERVER] Siz hech qaysi xonada emassiz. !join <xona>")
+        return True
+
+    prefix = "" if room == DEFAULT_ROOM else f"[#{room}] "
+    log_message("MESSAGE", f"#{room} {nickname}: {message}", addr)
+    broadcast_message(info['id'], f"{prefix}[{nickname}]: {message}\n", room=room, record=True)
+    total_messages.inc()
+    return True
+
+
+async def handle_chat(reader, writer):
+    """Bitta chat ulanishi: o'qish shu taskda, yozish writer taskida"""
+    addr = writer.get_extra_info('peername')
+    info = {
+        'id': next(client_ids),
+        'addr': addr,
+        'nickname': None,
+        'writer': writer,
+        'rooms': set(),
+        'room': None,
+        'outq': deque(),
+        'outbytes': 0,
+        'paused': False,
+        'dropped': 0,
+        'draining': False,
+        'wakeup': asyncio.Event(),
+        'blocked_since': None,
+        'slow_since': None,
+        'last_active': time.monotonic(),
+        'idle_timer': None,
+        'slow_timer': None,
+        'task': asyncio.current_task(),
+    }
+    start_idle_timer(info)
+    writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+    # asyncio/uvloop TCP_NODELAY yoqadi; selectors versiyasi bilan bir xil
+    # bo'lishi uchun kernel standartiga (Nagle yoqilgan) qaytariladi
+    writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+    clients[info['id']] = info
+    writer_task = asyncio.create_task(client_writer(info))
+    log_message("CONNECT", f"Yangi mijoz ulanmoqda: {addr[0]}:{addr[1]}", addr)
+    reply_client(info, "[SERVER] Ismingizni kiriting:")
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line.endswith(b"\n"):
+                break  # EOF (yoki oxirgi to'liq bo'lmagan qator)
+            info['last_active'] = time.monotonic()
+            if not handle_line(info, decode_line(line[:-1]).strip()):
+                break
+    except (ValueError, ConnectionError) as e:
+        # ValueError - qator MAX_LINE dan uzun
+        log_message("ERROR", f"Mijozdan o'qishda xato: {e}", addr)
+    finally:
+        del clients[info['id']]
+        cancel_timers(info)
+        if info['nickname'] is not None:
+            del nicknames[info['nickname']]
+        for room in info['rooms']:
+            remove_from_room(info['id'], room)
+        writer_task.cancel()
+        writer.close()
+        nickname = info['nickname'] or 'Unknown'
+        log_message("DISCONNECT", f"Mijoz chiqdi: {nickname} ({addr[0]}:{addr[1]})", addr)
+        for room in info['rooms']:
+            broadcast_message(info['id'], f"[SERVER] [#{room}] {nickname} chatdan chiqdi.\n", exclude_sender=False, room=room)
+
+
+# ---------------------------------------------------------------- fayllar
+
+
+async def read_into_file(reader, size, write):
+    """`size` baytni streamdan o'qib, `write(data)` ga berish. O'qilgan baytlar soni"""
+    received = 0
+    while received < size:
+        data = await reader.read(min(UPLOAD_CHUNK, size - received))
+        if not data:
+            break
+        write(data)
+        received += len(data)
+        upload_bytes.inc(len(data))
+    return received
+
+
+async def read_compressed(reader, size, write, decoder, stats):
+    """Siqilgan oqimni tugaguncha o'qib, ochilgan bo'laklarni `write` ga berish.
+
+    `stats` ga 'wire' (qabul qilingan) va 'cpu' (ochish vaqti) qo'shiladi.
+    Ochilgan baytlar soni qaytariladi.
+    """
+    received = 0
+    while not decoder.eof:
+        data = await reader.read(UPLOAD_CHUNK)
+        if not data:
+            break
+        upload_bytes.inc(len(data))
+        stats['wire'] += len(data)
+        for chunk in decompress(decoder, data, stats):
+            received += len(chunk)
+            if received > size:
+                raise ValueError("Ochilgan fayl e'lon qilingan hajmdan katta")
+            write(chunk)
+    return received
+
+
+async def receive_file(reader, writer, fields, expected=None, codec=None):
+    """Oddiy upload (yoki PUT): vaqtinchalik faylga yozib, shu zahoti xeshlash.
+
+    `codec` ((nom, daraja)) berilsa fayl siqilgan oqim sifatida keladi.
+    """
+    filename, file_size, client_addr = parse_upload(fields)
+    codec_name = f"{codec[0]}:{codec[1]}" if codec else None
+    note = f", {codec_name}" if codec else ""
+    log_message("FILE_UPLOAD", f"Fayl qabul qilinmoqda: {filename} ({file_size} bytes{note})", client_addr)
+
+    started = time.perf_counter()
+    sha = hashlib.sha256()
+    path, f = store.temp_file()
+
+    def write(data):
+        f.write(data)
+        sha.update(data)
+
+    decoder = StreamDecoder(codec[0]) if codec else None
+    stats = {'wire': 0, 'cpu': 0.0}
+    try:
+        with f:
+            if decoder:
+                received = await read_compressed(reader, file_size, write, decoder, stats)
+            else:
+                received = await read_into_file(reader, file_size, write)
+    except ValueError:
+        os.remove(path)
+        raise
+    if received != file_size or (decoder and not decoder.eof):
+        os.remove(path)
+        log_message("FILE_ERROR", f"Fayl to'liq yuklanmadi: {filename}", client_addr)
+        writer.write("ERROR: Fayl to'liq yuklanmadi\n".encode('utf-8'))
+        return
+    digest = sha.hexdigest()
+    if expected and digest != expected:
+        os.remove(path)
+        log_message("FILE_ERROR", f"{filename}: fayl xeshi mos emas", client_addr)
+        writer.write("ERROR: Fayl xeshi mos emas\n".encode('utf-8'))
+        return
+    if decoder:
+        observe_compression(filename, codec_name, file_size, stats['wire'], stats['cpu'], client_addr)
+    save_blob(writer, path, digest, filename, file_size, client_addr, started)
+
+
+def save_blob(writer, temp_path, digest, name, size, client_addr, started):
+    """Qabul qilingan faylni blob omboriga o'tkazish va javob yozish"""
+    filepath = commit_blob(store, temp_path, digest, name, size, client_addr, started)
+    writer.write(f"SUCCESS: Fayl saqlandi: {filepath}\n".encode('utf-8'))
+
+
+def reply_have(writer, filename, size, digest, client_addr):
+    """Mazmun serverda bor: nomni mavjud blobga bog'lab, HAVE javobi"""
+    link_blob(store, filename, size, digest, client_addr)
+    writer.write(encode_line(f"HAVE|{digest}"))
+
+
+async def receive_chunk(reader, writer, upload_id, fields):
+    """`CHUNK|id|index|length|sha256` + ma'lumot -> OK|index yoki BAD|index"""
+    index_str, length_str, digest = fields
+    index = int(index_str)
+    length = int(length_str)
+    partial = active_partial(upload_id)
+    position = chunk_offset(partial, index, length)
+    sha = hashlib.sha256()
+
+    def write(data):
+        nonlocal position
+        # Bo'lak kelayotganda boshqa oqim COMMIT qilgan bo'lishi mumkin
+        active_partial(upload_id)
+        pwrite_all(partial['fd'], memoryview(data), position)
+        position += len(data)
+        sha.update(data)
+
+    if await read_into_file(reader, length, write) != length:
+        raise ConnectionError("Bo'lak to'liq kelmadi")
+    if sha.hexdigest() != digest.lower():
+        log_message("FILE_ERROR", f"{partial['name']}: {index}-bo'lak xeshi mos emas", partial['client_addr'])
+        writer.write(encode_line(f"BAD|{index}"))
+        return
+    chunk_done(active_partial(upload_id), index)
+    writer.write(encode_line(f"OK|{index}"))
+
+
+async def commit_partial(writer, upload_id):
+    """Barcha bo'laklar kelgan bo'lsa faylni xeshlab blob omboriga o'tkazish. Ulanish yopilsa True"""
+    missing = missing_chunks(active_partial(upload_id))
+    if missing:
+        writer.write(encode_line("MISSING|" + ",".join(map(str, missing))))
+        return False
+
+    partial = close_partial(upload_id)
+    # fsync va to'liq fayl xeshi threadda - katta fayl event loop'ni to'xtatmaydi.
+    # Ulanishning havolasi (handle_upload finally) fd ni shu vaqtgacha ochiq tutadi
+    digest = await asyncio.get_running_loop().run_in_executor(None, hash_partial, partial)
+    if partial['sha256'] and digest != partial['sha256']:
+        os.remove(partial['path'])
+        os.remove(partial['journal'].name)
+        log_message("FILE_ERROR", f"{partial['name']}: fayl xeshi mos emas", partial['client_addr'])
+        writer.write("ERROR: Fayl xeshi mos emas\n".encode('utf-8'))
+        return True
+    save_blob(writer, partial['path'], digest, partial['name'], partial['size'], partial['client_addr'], partial['started'])
+    os.remove(partial['journal'].name)
+    return True
+
+
+async def handle_upload(reader, writer):
+    """Fayl porti ulanishi (sarlavha qatorlari: main.handle_upload_command)"""
+    addr = writer.get_extra_info('peername')
+    log_message("FILE_CONNECT", f"Fayl yuborish ulanishi: {addr[0]}:{addr[1]}", addr)
+    upload_id = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line.endswith(b"\n"):
+                break
+            text = line[:-1].decode('utf-8', errors='ignore').strip()
+            fields = text.split('|')
+            command = fields[0]
+
+            if command == "PUT" and len(fields) >= 5 and upload_id is None:
+                put_fields, digest, codec = parse_put(text)
+                filename, size, client_addr = put_fields
+                if store.has(digest):
+                    reply_have(writer, filename, int(size), digest, client_addr)
+                else:
+                    writer.write(encode_line("READY"))
+                    await receive_file(reader, writer, put_fields, digest, codec)
+                break
+            elif command == "INIT" and len(fields) in (6, 7) and upload_id is None:
+                uid, filename, size, chunk_size, client_addr, digest = parse_init(fields)
+                if digest is not None and store.has(digest):
+                    reply_have(writer, filename, size, digest, client_addr)
+                    break
+                partial = open_partial(uid, filename, size, chunk_size, client_addr, digest)
+                upload_id = uid
+                writer.write(encode_line("OK|" + ",".join(map(str, sorted(partial['done'])))))
+            elif command == "CHUNK" and len(fields) == 5:
+                if fields[1] != upload_id:
+                    raise ValueError("Avval INIT yuborilishi kerak")
+                await receive_chunk(reader, writer, upload_id, fields[2:])
+            elif command == "COMMIT" and len(fields) == 2:
+                if fields[1] != upload_id:
+                    raise ValueError("Avval INIT yuborilishi kerak")
+                if await commit_partial(writer, upload_id):
+                    break
+            else:
+                # Oddiy rejim (fayl nomida '|' bo'lishi mumkin)
+                fields = text.rsplit('|', 2)
+                if len(fields) != 3 or upload_id is not None:
+                    raise ValueError("Invalid file header")
+                await receive_file(reader, writer, fields)
+                break
+            await writer.drain()
+    except ValueError as e:
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: {e}", addr)
+        writer.write(f"ERROR: {e}\n".encode('utf-8'))
+    except KeyError as e:
+        # Ulanish holati buzilgan - faqat shu ulanish yopiladi
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: noma'lum holat {e}", addr)
+        writer.write("ERROR: Upload holati topilmadi\n".encode('utf-8'))
+    except (OSError, ConnectionError) as e:
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: {e}", addr)
+    finally:
+        if upload_id is not None:
+            release_partial(upload_id)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+# ---------------------------------------------------------------- ishga tushirish
+
+
+async def measure_loop_lag():
+    """Uyg'onish kechikishi = event loop qancha band bo'lgani"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+async def run_timers():
+    """Timer wheel ni har TIMER_RESOLUTION da aylantirish"""
+    while True:
+        await asyncio.sleep(TIMER_RESOLUTION)
+        timers.advance()
+
+
+async def run(args):
+    chat_server = await asyncio.start_server(handle_chat, HOST, PORT, limit=MAX_LINE, backlog=BACKLOG)
+    file_server = await asyncio.start_server(handle_upload, HOST, FILE_PORT, limit=MAX_HEADER, backlog=BACKLOG)
+    lag_task = asyncio.create_task(measure_loop_lag())
+    timer_task = asyncio.create_task(run_timers())
+
+    loop_name = args.backend
+    log_message("START", f"Chat server {HOST}:{PORT} da ishga tushdi ({loop_name})")
+    log_message("START", f"Fayl server {HOST}:{FILE_PORT} da ishga tushdi ({loop_name})")
+    if history.loaded:
+        log_message("START", f"Tarix tiklandi: {history.loaded} ta xabar ({args.history_dir})")
+    if history.file is not None:
+        timers.schedule(HISTORY_FLUSH, flush_history)
+    print(f"Chat server {HOST}:{PORT} da ishlayapti ({loop_name})...")
+    print(f"Fayl server {HOST}:{FILE_PORT} da ishlayapti...")
+
+    metrics_server = None
+    if args.metrics_port:
+        try:
+            metrics_server = start_http_server(registry, HOST, args.metrics_port)
+            print(f"Metrikalar: http://{HOST}:{args.metrics_port}/metrics\n")
+        except OSError as e:
+            log_message("ERROR", f"Metrikalar porti {args.metrics_port} band: {e}")
+
+    try:
+        await asyncio.gather(chat_server.serve_forever(), file_server.serve_forever())
+    finally:
+        # `async with server` emas: Python 3.12 da wait_closed() barcha ochiq
+        # ulanishlar yopilishini kutadi va mijozlar ulangan bo'lsa to'xtash osilib qoladi
+        chat_server.close()
+        file_server.close()
+        lag_task.cancel()
+        timer_task.cancel()
+        handlers = [info['task'] for info in clients.values()]
+        for info in list(clients.values()):
+            info['writer'].write(b"[SERVER] Server yopilmoqda...\n")
+            info['writer'].close()
+        # Mijoz tasklari EOF ni ko'rib o'zi tugasin (asyncio.run ularni bekor qilmasin)
+        if handlers:
+            await asyncio.wait(handlers, timeout=1.0)
+        if metrics_server:
+            metrics_server.shutdown()
+
+
+def serve(args):
+    """asyncio backendni ishga tushirish (main.py --backend asyncio|uvloop)"""
+    global log_writer, history, store
+    configure(args, abort_client, close_idle)
+    registry.labels['backend'] = 'asyncio'
+    register_gauges()
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    log_writer = start_log(args.log_queue, args.log_policy)
+    history = HistoryStore(args.history_dir)
+    store = BlobStore(UPLOADS_DIR)
+
+    try:
+        if args.backend == "uvloop":
+            import uvloop
+            uvloop.run(run(args))
+        else:
+            asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\nServer to'xtatilmoqda...")
+    finally:
+        for upload_id in list(partials):
+            partials[upload_id]['refs'] = 0
+            release_partial(upload_id)
+        history.close()
+        store.close()
+        log_message("SHUTDOWN", "Server to'xtatildi")
+        print(fanout_summary())
+        print(compression_summary(), end="")
+        log_writer.close()
@@ -0,0 +1,68 @@
+"""
+Benchmark: selectors, asyncio va uvloop backendlarini bir xil yuklama ostida
+solishtirish. Har bir backend uchun loadgen.py --spawn bir xil parametrlar
+bilan ishga tushiriladi, hisobotlar saqlanadi va oxirida selectors
+natijasi bilan solishtiriladi (uvloop o'rnatilmagan bo'lsa o'tkaziladi).
+
+Ishlatish:
+    python bench_backends.py
+    python bench_backends.py --clients 2000 --rate 0.2 --duration 20 --upload-rate 2
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from loadgen import compare_reports
+
+
+BACKENDS = ("selectors", "asyncio", "uvloop")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="selectors vs asyncio vs uvloop benchmark")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--procs", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=0.2)
+    parser.add_argument("--rooms", type=int, default=1)
+    parser.add_argument("--list-rate", type=float, default=1.0)
+    parser.add_argument("--upload-rate", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output-dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    loadgen = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadgen.py")
+    reports = {}
+    for backend in BACKENDS:
+        if backend == "uvloop" and importlib.util.find_spec("uvloop") is None:
+            print("\nuvloop o'rnatilmagan - o'tkazib yuborildi")
+            continue
+        output = os.path.join(args.output_dir, f"loadgen-{backend}.json")
+        print(f"\n##### backend: {backend} #####")
+        subprocess.run([
+            sys.executable, loadgen, "--spawn",
+            "--server-args", f"--backend {backend}",
+            "--label", backend,
+            "--clients", str(args.clients),
+            "--procs", str(args.procs),
+            "--rate", str(args.rate),
+            "--rooms", str(args.rooms),
+            "--list-rate", str(args.list_rate),
+            "--upload-rate", str(args.upload_rate),
+            "--duration", str(args.duration),
+            "--output", output,
+        ], check=True)
+        with open(output, encoding="utf-8") as f:
+            reports[backend] = json.load(f)
+
+    for backend in BACKENDS[1:]:
+        if backend in reports:
+            compare_reports(reports["selectors"], reports[backend])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: chat (5000) va fayl (5001) portlarida accept-to-first-byte kechikishi
+Aralash yuklama ostida:
+- fon chat mijozlari doimiy xabar yuboradi
+- fon uploaderlar fayl portiga doimiy fayl yuboradi
+- o'lchov mijozlari har ikkala portga qayta-qayta ulanib, birinchi bayt
+  kelguncha bo'lgan vaqtni o'lchaydi (p50/p99/max)
+
+Ishlatish:
+    python bench_latency.py --spawn          # serverni o'zi ishga tushiradi
+    python bench_latency.py --duration 20    # ishlab turgan serverga qarshi
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+HOST = "127.0.0.1"
+CHAT_PORT = 5000
+FILE_PORT = 5001
+
+
+def percentile(values, p):
+    """Tartiblangan ro'yxatdan p-persentil"""
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def chat_noise(stop, rate, index):
+    """Fon chat mijozi: sekundiga `rate` ta xabar yuboradi, kelganini o'qib tashlaydi"""
+    try:
+        sock = socket.create_connection((HOST, CHAT_PORT))
+        sock.sendall(f"noise{index}\n".encode('utf-8'))
+    except OSError:
+        return
+    sock.settimeout(0.01)
+    interval = 1.0 / rate if rate else 0.1
+    i = 0
+    try:
+        while not stop.is_set():
+            sock.sendall(f"noise {i}\n".encode('utf-8'))
+            i += 1
+            deadline = time.perf_counter() + interval
+            while time.perf_counter() < deadline:
+                try:
+                    if not sock.recv(65536):
+                        return
+                except socket.timeout:
+                    pass
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def upload_noise(stop, size):
+    """Fon uploader: fayl portiga `size` baytli fayllarni ketma-ket yuboradi"""
+    payload = b"x" * size
+    while not stop.is_set():
+        try:
+            with socket.create_connection((HOST, FILE_PORT)) as sock:
+                sock.sendall(f"noise.bin|{size}|{HOST}:{FILE_PORT}\n".encode('utf-8'))
+                sock.sendall(payload)
+                sock.recv(1024)
+        except OSError:
+            time.sleep(0.05)
+
+
+def probe_chat():
+    """Chat portiga ulanib, birinchi bayt (ism so'rovi) kelguncha vaqt"""
+    start = time.perf_counter()
+    with socket.create_connection((HOST, CHAT_PORT)) as sock:
+        sock.settimeout(10)
+        sock.recv(1)
+        return time.perf_counter() - start
+
+
+def probe_file():
+    """Fayl portiga kichik fayl yuborib, javobning birinchi bayti kelguncha vaqt"""
+    start = time.perf_counter()
+    with socket.create_connection((HOST, FILE_PORT)) as sock:
+        sock.settimeout(10)
+        sock.sendall(f"probe.txt|4|{HOST}:{FILE_PORT}\n".encode('utf-8'))
+        sock.sendall(b"ping")
+        sock.recv(1)
+        return time.perf_counter() - start
+
+
+def run_probes(probe, results, stop, interval):
+    while not stop.is_set():
+        try:
+            results.append(probe())
+        except OSError:
+            results.append(None)
+        time.sleep(interval)
+
+
+def report(name, samples):
+    ok = sorted(s for s in samples if s is not None)
+    errors = len(samples) - len(ok)
+    print(
+        f"{name:<10} n={len(ok):<6} xato={errors:<4} "
+        f"p50={percentile(ok, 50) * 1000:8.2f}ms "
+        f"p99={percentile(ok, 99) * 1000:8.2f}ms "
+        f"max={(ok[-1] if ok else 0) * 1000:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accept-to-first-byte benchmark")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--chatters", type=int, default=50, help="fon chat mijozlari soni")
+    parser.add_argument("--rate", type=float, default=20.0, help="har bir chat mijozi uchun xabar/s")
+    parser.add_argument("--uploaders", type=int, default=4, help="fon uploaderlar soni")
+    parser.add_argument("--upload-size", type=int, default=256 * 1024)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--spawn", action="store_true", help="main.py ni vaqtinchalik papkada ishga tushirish")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        workdir = tempfile.mkdtemp(prefix="chat-bench-")
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        time.sleep(1.0)
+
+    stop = threading.Event()
+    threads = []
+    try:
+        for i in range(args.chatters):
+            threads.append(threading.Thread(target=chat_noise, args=(stop, args.rate, i), daemon=True))
+        for _ in range(args.uploaders):
+            threads.append(threading.Thread(target=upload_noise, args=(stop, args.upload_size), daemon=True))
+
+        chat_samples, file_samples = [], []
+        threads.append(threading.Thread(
+            target=run_probes, args=(probe_chat, chat_samples, stop, args.probe_interval), daemon=True))
+        threads.append(threading.Thread(
+            target=run_probes, args=(probe_file, file_samples, stop, args.probe_interval), daemon=True))
+
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join(timeout=2)
+
+        print(f"\n=== accept-to-first-byte ({args.chatters} chat, {args.uploaders} upload, {args.duration:.0f}s) ===")
+        report("chat", chat_samples)
+        report("fayl", file_samples)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: FILE_PORT orqali katta fayl yuklash tezligi (standart 1 GB)
+Uch usul solishtiriladi:
+- sendfile - client.send_file (socket.sendfile, kernel ichida nusxalash)
+- chunked  - client.send_file_chunked (bir nechta parallel ulanish, sha256 tekshiruvi)
+- legacy   - eski usul: 4 KB bo'laklarda read() + sendall()
+
+Ishlatish:
+    python bench_upload.py --spawn                 # serverni o'zi ishga tushiradi
+    python bench_upload.py --size 256M --repeat 3  # ishlab turgan serverga qarshi
+    python bench_upload.py --spawn --mode sendfile --compress zlib:6 --payload text
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from client import HOST, FILE_PORT, send_file, send_file_chunked
+
+
+def parse_size(text):
+    """'1G', '256M', '4096' ko'rinishidagi hajmni baytga aylantirish"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def text_block(size):
+    """Log fayliga o'xshash siqiladigan matn"""
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"[2024-01-01 12:{i // 60 % 60:02d}:{i % 60:02d}] [MESSAGE] [127.0.0.1:{40000 + i % 997}] user{i % 37}: xabar {os.urandom(4).hex()}\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines).encode("utf-8")[:size]
+
+
+def make_test_file(path, size, payload="random"):
+    """Test fayl yaratish (takrorlanuvchi 1 MB naqsh: tasodifiy yoki matn)"""
+    block = os.urandom(1024 * 1024) if payload == "random" else text_block(1024 * 1024)
+    with open(path, "wb") as f:
+        left = size
+        while left > 0:
+            n = min(left, len(block))
+            f.write(block[:n])
+            left -= n
+
+
+def send_file_legacy(filename, host=HOST, port=FILE_PORT):
+    """Eski usul: 4 KB bo'laklar bilan sendall"""
+    with socket.create_connection((host, port)) as sock:
+        file_size = os.path.getsize(filename)
+        sock.sendall(f"{os.path.basename(filename)}|{file_size}|{HOST}:{FILE_PORT}\n".encode("utf-8"))
+        with open(filename, "rb") as f:
+            while True:
+                chunk = f.read(4096)
+                if not chunk:
+                    break
+                sock.sendall(chunk)
+        return sock.recv(1024).decode("utf-8").startswith("SUCCESS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload throughput benchmark")
+    parser.add_argument("--size", default="1G", help="fayl hajmi (masalan 1G, 256M)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--mode", choices=("sendfile", "chunked", "legacy", "all"), default="all")
+    parser.add_argument("--spawn", action="store_true", help="main.py ni vaqtinchalik papkada ishga tushirish")
+    parser.add_argument("--compress", default=None, help="sendfile rejimida siqish, masalan zlib:6 yoki lzma:1")
+    parser.add_argument("--payload", choices=("random", "text"), default="random",
+                        help="random - siqilmaydi (eng yomon holat), text - log fayliga o'xshash")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    workdir = tempfile.mkdtemp(prefix="upload-bench-")
+    test_file = os.path.join(workdir, "payload.bin")
+    server = None
+    try:
+        print(f"Test fayl yaratilmoqda: {size / 1024 ** 2:.0f} MB...")
+        make_test_file(test_file, size, args.payload)
+
+        if args.spawn:
+            server_dir = os.path.join(workdir, "server")
+            os.makedirs(server_dir)
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")],
+                cwd=server_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            time.sleep(1.0)
+
+        modes = ["sendfile", "chunked", "legacy"] if args.mode == "all" else [args.mode]
+        senders = {
+            "sendfile": lambda path: send_file(path, compress=args.compress),
+            "chunked": send_file_chunked,
+            "legacy": send_file_legacy,
+        }
+        for mode in modes:
+            for i in range(args.repeat):
+                # Server bir xil mazmunni qayta qabul qilmaydi (HAVE) - har
+                # urinishda fayl boshini o'zgartirib, haqiqiy yuklash o'lchanadi
+                fd = os.open(test_file, os.O_WRONLY)
+                os.pwrite(fd, os.urandom(16), 0)
+                os.close(fd)
+                start = time.perf_counter()
+                ok = senders[mode](test_file)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{mode:<9} #{i + 1}: {elapsed:7.2f}s  "
+                    f"{size / elapsed / 1024 ** 2:8.1f} MB/s  {'OK' if ok else 'XATO'}"
+                )
+                if server:
+                    # Server diskini to'ldirmaslik uchun saqlangan fayllarni o'chirish
+                    shutil.rmtree(os.path.join(workdir, "server", "uploads", "blobs"), ignore_errors=True)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
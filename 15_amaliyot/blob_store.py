@@ -0,0 +1,117 @@
+"""
+Kontent bo'yicha manzillanadigan (content-addressed) upload ombori
+Har bir fayl mazmuni sha256 xeshi ostida faqat bir marta saqlanadi:
+
+    uploads/blobs/ab/abcdef...   - fayl mazmuni (xesh boshidagi 2 belgi - papka)
+    uploads/.tmp/                - qabul qilinayotgan fayllar
+    uploads/index.jsonl          - nom -> xesh indeksi (faqat oxiriga yoziladi)
+
+Bir xil faylni qayta yuklash disk joyini egallamaydi, bir xil nomli
+fayllar esa bir-birini ustidan yozmaydi - indeksda nomning oxirgi
+xeshi turadi, oldingi bloblar saqlanib qoladi.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+INDEX_FILE = "index.jsonl"
+HASH_BLOCK = 8 * 1024 * 1024  # to'liq faylni xeshlashda bitta o'qish
+
+
+def umask_mode():
+    """open() yaratadigan fayl huquqlari (0666 & ~umask). umask ni o'qishning
+    yagona yo'li uni o'zgartirish, shuning uchun import paytida bir marta"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = umask_mode()  # mkstemp 0600 beradi, bloblar esa oddiy fayllardek
+
+
+def valid_digest(digest):
+    """sha256 hex ko'rinishi: 64 ta kichik hex belgi"""
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+def hash_file(path):
+    """Faylning sha256 xeshi (bo'laklab o'qiladi; fon threadda chaqirish mumkin)"""
+    digest = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            block = f.read(HASH_BLOCK)
+            if not block:
+                return digest.hexdigest()
+            digest.update(block)
+
+
+class BlobStore:
+    """Bloblar papkasi va nom -> xesh indeksi"""
+
+    def __init__(self, root):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, ".tmp")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        # {nom: {'sha256', 'size', 'time', 'addr'}}
+        self.index = {}
+        index_path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # yarim yozilgan oxirgi qator
+                    self.index[entry.pop("name")] = entry
+        self.index_file = open(index_path, "a", encoding="utf-8")
+
+    def path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def size(self, digest):
+        """Saqlangan blob hajmi (bayt) yoki None"""
+        try:
+            return os.path.getsize(self.path(digest))
+        except OSError:
+            return None
+
+    def temp_file(self):
+        """Qabul qilish uchun yangi vaqtinchalik fayl: (yo'l, unbuffered fayl)"""
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        os.fchmod(fd, FILE_MODE)
+        return path, os.fdopen(fd, "wb", buffering=0)
+
+    def commit(self, temp_path, digest, name, size, client_addr=None):
+        """Qabul qilingan faylni blob sifatida saqlash va nomni indeksga yozish.
+
+        Shu xeshli blob allaqachon bo'lsa vaqtinchalik fayl o'chiriladi.
+        (blob yo'li, takroriymi) qaytaradi.
+        """
+        path = self.path(digest)
+        duplicate = os.path.exists(path)
+        if duplicate:
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        self.link(name, digest, size, client_addr)
+        return path, duplicate
+
+    def link(self, name, digest, size, client_addr=None):
+        """Nomni mavjud blobga bog'lash (mijoz ma'lumotni yubormagan holat)"""
+        entry = {'sha256': digest, 'size': size, 'time': int(time.time()), 'addr': client_addr}
+        self.index[name] = entry
+        self.index_file.write(json.dumps({'name': name, **entry}, ensure_ascii=False) + "\n")
+        self.index_file.flush()
+
+    def close(self):
+        self.index_file.close()
@@ -0,0 +1,151 @@
+"""
+Workerlar orasidagi xabar shinasi (broadcast bus)
+Har bir worker jarayon `bus_dir/worker-{i}.sock` manzilida Unix datagram
+socketiga ega. Hodisalar (broadcast, join, leave, ...) JSON ko'rinishida bir
+marta kodlanib, qolgan workerlarga sendto() bilan yuboriladi.
+
+Datagram socketlar xabar chegarasini saqlaydi, shuning uchun qo'shimcha
+framing kerak emas. Worker hech qachon bloklanmaydi:
+  - qabul qiluvchining navbati to'lgan bo'lsa faqat droppable hodisalar
+    (chat broadcastlari) tashlab yuboriladi (dropped hisoblagichi);
+  - boshqaruv hodisalari (join, leave, room_join, ...) shu peer uchun
+    navbatga qo'yiladi va flush() da (har tick) tartib bilan qayta
+    yuboriladi - aks holda boshqa workerlardagi ro'yxat buziladi;
+  - socketi yo'q yoki hech kim tinglamayotgan peer "o'lgan" hisoblanadi:
+    flush() uni qaytaradi (uning mijozlari unutiladi), navbati tashlanadi.
+    Peer qayta ishga tushib `hello` yuborgach yana tirik hisoblanadi.
+"""
+
+import collections
+import json
+import os
+import socket
+
+
+MAX_DATAGRAM = 256 * 1024
+RECV_BATCH = 64  # bitta tayyorlikda o'qiladigan maksimal datagrammalar
+
+
+def worker_address(bus_dir, worker_id):
+    """Worker bus socketining manzili"""
+    return os.path.join(bus_dir, f"worker-{worker_id}.sock")
+
+
+class Bus:
+    """Bitta worker uchun bus ulanishi"""
+
+    def __init__(self, bus_dir, worker_id, workers):
+        self.worker_id = worker_id
+        self.peers = {
+            i: worker_address(bus_dir, i) for i in range(workers) if i != worker_id
+        }
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        path = worker_address(bus_dir, worker_id)
+        if os.path.exists(path):
+            os.remove(path)
+        self.sock.bind(path)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.setblocking(False)
+        self.pending = {i: collections.deque() for i in self.peers}  # yetkazilmagan boshqaruv hodisalari
+        self.down = set()  # o'lgan (yoki hali ishga tushmagan) peerlar
+        self.lost = []  # flush() qaytaradigan yangi o'lgan peerlar
+        self.sent = 0
+        self.dropped = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _try_send(self, data, worker_id):
+        """Bitta datagramma. Yuborilsa True, navbat to'la bo'lsa False"""
+        try:
+            self.sock.sendto(data, self.peers[worker_id])
+        except BlockingIOError:
+            return False
+        except (FileNotFoundError, ConnectionRefusedError):
+            # Qabul qiluvchi o'lgan yoki hali ishga tushmagan
+            self._mark_down(worker_id)
+            return False
+        self.sent += 1
+        return True
+
+    def _mark_down(self, worker_id):
+        if worker_id not in self.down:
+            self.down.add(worker_id)
+            self.lost.append(worker_id)
+        self.dropped += len(self.pending[worker_id])
+        self.pending[worker_id].clear()
+
+    def _send(self, data, worker_id, droppable):
+        if worker_id in self.down:
+            # Qayta ishga tushgan peer `hello` da barcha mijozlarni so'raydi
+            self.dropped += 1
+            return
+        pending = self.pending[worker_id]
+        if droppable:
+            if not self._try_send(data, worker_id):
+                self.dropped += 1
+        elif pending or not self._try_send(data, worker_id):
+            # Tartib saqlanadi: oldingilari yetkazilmaguncha yangisi ham navbatda
+            if worker_id not in self.down:
+                pending.append(data)
+
+    def publish(self, event, droppable=False):
+        """Hodisani barcha boshqa workerlarga yuborish.
+
+        droppable=True (chat broadcast) - peer navbati to'la bo'lsa
+        tashlanadi; boshqaruv hodisalari esa yetkazilguncha navbatda turadi.
+        """
+        event["w"] = self.worker_id
+        data = json.dumps(event, ensure_ascii=False).encode("utf-8")
+        for worker_id in self.peers:
+            self._send(data, worker_id, droppable)
+
+    def send_to(self, worker_id, event):
+        """Hodisani bitta workerga yuborish (yetkazilguncha navbatda turadi)"""
+        if worker_id not in self.peers:
+            return
+        event["w"] = self.worker_id
+        self._send(json.dumps(event, ensure_ascii=False).encode("utf-8"), worker_id, False)
+
+    def flush(self):
+        """Navbatdagi boshqaruv hodisalarini qayta yuborish (har tick).
+
+        Oxirgi chaqiruvdan beri o'lgan deb topilgan peerlar ro'yxatini
+        qaytaradi - chaqiruvchi ularning mijozlarini unutadi.
+        """
+        for worker_id, pending in self.pending.items():
+            while pending and self._try_send(pending[0], worker_id):
+                pending.popleft()
+        lost, self.lost = self.lost, []
+        return lost
+
+    def backlog(self):
+        """Yetkazilmagan boshqaruv hodisalari soni"""
+        return sum(len(pending) for pending in self.pending.values())
+
+    def receive(self):
+        """Kelgan hodisalarni o'qish (ko'pi bilan RECV_BATCH ta)"""
+        events = []
+        for _ in range(RECV_BATCH):
+            try:
+                data = self.sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                break
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            if event.get("t") == "hello":
+                # Peer (qayta) ishga tushdi - unga yana yuborish mumkin
+                worker_id = event.get("w")
+                self.down.discard(worker_id)
+                if worker_id in self.lost:
+                    self.lost.remove(worker_id)
+            events.append(event)
+        return events
+
+    def close(self):
+        path = self.sock.getsockname()
+        self.sock.close()
+        if path and os.path.exists(path):
+            os.remove(path)
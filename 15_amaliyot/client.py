@@ -2,60 +2,258 @@
 Chat Client - Server bilan aloqa qilish uchun mijoz dasturi
 """
 
+import hashlib
+import queue
 import socket
 import threading
 import sys
 import os
+import time
+
+from compression import compressor, is_codec, parse_codec
+from protocol import LineReader, decode_line, encode_line
 
 
 HOST = "127.0.0.1"
 CHAT_PORT = 5000
 FILE_PORT = 5001
 
+# Bo'laklab (parallel) yuklash sozlamalari
+CHUNKED_THRESHOLD = 64 * 1024 * 1024  # shu hajmdan katta fayllar bo'laklab yuboriladi
+CHUNK_SIZE = 8 * 1024 * 1024
+STREAMS = 4
+RETRIES = 3
+
+# Siqib yuborish (!zfile): faylni shu hajmdagi bloklarda o'qib siqish
+COMPRESS_BLOCK = 256 * 1024
+DEFAULT_CODEC = "zlib:6"
+
 
 def receive_messages(sock):
-    """Serverdan xabarlarni qabul qilish"""
+    """Serverdan xabarlarni qabul qilish (har bir to'liq qator alohida)"""
+    reader = LineReader()
     while True:
         try:
-            data = sock.recv(4096)
-            if not data:
+            lines = reader.read_from(sock)
+            if lines is None:
                 print("\nServer bilan ulanish uzildi.")
                 break
-            print(data.decode('utf-8'), end='')
-        except (ConnectionError, OSError):
+            for line in lines:
+                print(decode_line(line))
+        except (ConnectionError, OSError, ValueError):
             print("\nServer bilan ulanish uzildi.")
             break
 
 
-def send_file(filename, host=HOST, port=FILE_PORT):
-    """Fayl yuborish"""
+def file_digest(filename):
+    """Faylning sha256 xeshi (server shu mazmunni bilsa ma'lumot yuborilmaydi)"""
+    with open(filename, 'rb') as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def send_file(filename, host=HOST, port=FILE_PORT, compress=None):
+    """Fayl yuborish.
+    
+    Avval faqat xesh yuboriladi (PUT): server bu mazmunni bilsa HAVE
+    qaytaradi va fayl umuman yuborilmaydi. Aks holda READY dan keyin
+    socket.sendfile (Linux'da kernel ichida nusxalanadi).
+    
+    `compress` ('zlib:6', 'lzma:9', ...) berilsa fayl oqim sifatida
+    siqib yuboriladi (qarang: compression.py).
+    """
     if not os.path.exists(filename):
         print(f"Xato: {filename} fayli topilmadi.")
         return False
     
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((host, port))
-        
-        file_size = os.path.getsize(filename)
-        header = f"{filename}|{file_size}|{HOST}:{FILE_PORT}"
-        sock.sendall(header.encode('utf-8'))
-        
-        with open(filename, 'rb') as f:
-            while True:
-                chunk = f.read(4096)
-                if not chunk:
-                    break
-                sock.sendall(chunk)
+        codec = parse_codec(compress) if compress else None
+        with socket.create_connection((host, port)) as sock:
+            file_size = os.path.getsize(filename)
+            digest = file_digest(filename)
+            reader = LineReader()
+            header = f"PUT|{os.path.basename(filename)}|{file_size}|{HOST}:{FILE_PORT}|{digest}"
+            if codec:
+                header += f"|{codec[0]}:{codec[1]}"
+            sock.sendall(encode_line(header))
+            reply = read_reply(sock, reader)
+            if reply.startswith("HAVE"):
+                print(f"[SERVER] Fayl serverda bor ({digest[:12]}), qayta yuborilmadi")
+                return True
+            if reply != "READY":
+                print(f"[SERVER] {reply}")
+                return False
+            
+            if codec:
+                send_compressed(sock, filename, file_size, codec)
+            else:
+                with open(filename, 'rb') as f:
+                    sock.sendfile(f)
+            
+            response = read_reply(sock, reader)
+            print(f"[SERVER] {response}")
+            return response.startswith("SUCCESS")
         
-        response = sock.recv(1024).decode('utf-8')
-        print(f"[SERVER] {response}")
+    except Exception as e:
+        print(f"Fayl yuborishda xato: {e}")
+        return False
+
+
+def send_compressed(sock, filename, file_size, codec):
+    """Faylni bloklab o'qib, siqib yuborish; nisbat va siqish CPU vaqtini chiqarish"""
+    comp = compressor(*codec)
+    sent = 0
+    cpu = 0.0
+    with open(filename, 'rb') as f:
+        while True:
+            block = f.read(COMPRESS_BLOCK)
+            cpu_start = time.process_time()
+            data = comp.compress(block) if block else comp.flush()
+            cpu += time.process_time() - cpu_start
+            if data:
+                sock.sendall(data)
+                sent += len(data)
+            if not block:
+                break
+    ratio = file_size / sent if sent else 0
+    print(f"Siqildi ({codec[0]}:{codec[1]}): {file_size} -> {sent} bayt ({ratio:.2f}x), CPU {cpu * 1000:.1f} ms")
+
+
+def read_reply(sock, reader):
+    """Fayl serveridan bitta qatorli javobni o'qish"""
+    while True:
+        lines = reader.read_from(sock)
+        if lines is None:
+            raise ConnectionError("Server ulanishni yopdi")
+        if lines:
+            return decode_line(lines[0])
+
+
+def upload_id_for(filename):
+    """Fayl uchun barqaror upload id (qayta urinishda shu id bilan davom etiladi)"""
+    st = os.stat(filename)
+    key = f"{os.path.abspath(filename)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def open_chunk_stream(host, port, upload_id, filename, size, chunk_size, digest):
+    """Bo'laklab yuklash uchun ulanish ochib, tasdiqlangan bo'laklarni olish.
+    
+    Server bu mazmunni allaqachon saqlagan bo'lsa (HAVE) None qaytaradi.
+    """
+    sock = socket.create_connection((host, port))
+    reader = LineReader()
+    sock.sendall(encode_line(
+        f"INIT|{upload_id}|{os.path.basename(filename)}|{size}|{chunk_size}|{HOST}:{FILE_PORT}|{digest}"
+    ))
+    reply = read_reply(sock, reader)
+    status, _, done = reply.partition('|')
+    if status == "HAVE":
+        sock.close()
+        return None
+    if status != "OK":
         sock.close()
-        return True
+        raise ConnectionError(reply)
+    return sock, reader, {int(i) for i in done.split(',') if i}
+
+
+def chunk_worker(host, port, upload_id, filename, fd, size, chunk_size, file_hash, todo, confirmed):
+    """Navbatdagi bo'laklarni bitta ulanish orqali ketma-ket yuborish"""
+    try:
+        stream = open_chunk_stream(host, port, upload_id, filename, size, chunk_size, file_hash)
+    except (ConnectionError, OSError):
+        return
+    if stream is None:
+        return
+    sock, reader, _ = stream
+    
+    with sock:
+        while True:
+            try:
+                index = todo.get_nowait()
+            except queue.Empty:
+                return
+            offset = index * chunk_size
+            data = os.pread(fd, min(chunk_size, size - offset), offset)
+            digest = hashlib.sha256(data).hexdigest()
+            try:
+                sock.sendall(encode_line(f"CHUNK|{upload_id}|{index}|{len(data)}|{digest}"))
+                sock.sendall(data)
+                reply = read_reply(sock, reader)
+            except (ConnectionError, OSError, ValueError):
+                # Bo'lak keyingi urinishda qayta yuboriladi
+                return
+            if reply == f"OK|{index}":
+                confirmed.add(index)
+            elif not reply.startswith("BAD|"):
+                print(f"[SERVER] {reply}")
+                return
+
+
+def send_file_chunked(filename, host=HOST, port=FILE_PORT, streams=STREAMS, chunk_size=CHUNK_SIZE):
+    """Faylni bo'laklarga bo'lib, bir nechta parallel ulanish orqali yuborish.
+    
+    Har bir bo'lak sha256 bilan tekshiriladi. Ulanish uzilsa yoki dastur
+    qayta ishga tushirilsa, server tasdiqlagan bo'laklar qayta yuborilmaydi.
+    Butun fayl xeshi INIT da yuboriladi - server bu mazmunni bilsa hech
+    qanday bo'lak yuborilmaydi.
+    """
+    if not os.path.exists(filename):
+        print(f"Xato: {filename} fayli topilmadi.")
+        return False
+    
+    size = os.path.getsize(filename)
+    upload_id = upload_id_for(filename)
+    digest = file_digest(filename)
+    chunks = max(1, -(-size // chunk_size))
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        for attempt in range(RETRIES):
+            try:
+                stream = open_chunk_stream(host, port, upload_id, filename, size, chunk_size, digest)
+            except (ConnectionError, OSError) as e:
+                print(f"Fayl yuborishda xato: {e}")
+                continue
+            if stream is None:
+                print(f"[SERVER] Fayl serverda bor ({digest[:12]}), qayta yuborilmadi")
+                return True
+            control, reader, done = stream
+            
+            with control:
+                missing = [i for i in range(chunks) if i not in done]
+                if done:
+                    print(f"Davom ettirilmoqda: {len(done)}/{chunks} bo'lak serverda bor")
+                
+                todo = queue.Queue()
+                for index in missing:
+                    todo.put(index)
+                confirmed = set()
+                workers = [
+                    threading.Thread(
+                        target=chunk_worker,
+                        args=(host, port, upload_id, filename, fd, size, chunk_size, digest, todo, confirmed),
+                        daemon=True,
+                    )
+                    for _ in range(min(streams, len(missing)))
+                ]
+                for w in workers:
+                    w.start()
+                for w in workers:
+                    w.join()
+                print(f"{len(done) + len(confirmed)}/{chunks} bo'lak yuborildi")
+                
+                control.sendall(encode_line(f"COMMIT|{upload_id}"))
+                response = read_reply(control, reader)
+                if response.startswith("SUCCESS"):
+                    print(f"[SERVER] {response}")
+                    return True
         
-    except Exception as e:
+        print("Xato: fayl to'liq yuborilmadi, keyinroq qayta urinib ko'ring (davom ettiriladi).")
+        return False
+    except (ConnectionError, OSError) as e:
         print(f"Fayl yuborishda xato: {e}")
         return False
+    finally:
+        os.close(fd)
 
 
 def main():
@@ -69,19 +267,28 @@ def main():
         receive_thread.start()
         
         print("Chat serverga ulandi. Xabarlarni yuborishingiz mumkin.")
-        print("Buyruqlar: !exit - chiqish, !list - mijozlar ro'yxati, !file <fayl> - fayl yuborish\n")
+        print("Buyruqlar: !exit - chiqish, !list - mijozlar ro'yxati, !file <fayl> - fayl yuborish,")
+        print(f"          !zfile [zlib|lzma[:daraja]] <fayl> - siqib yuborish (standart {DEFAULT_CODEC})\n")
         
         while True:
             message = input()
             
             if message.strip() == "!exit":
-                sock.sendall("!exit".encode('utf-8'))
+                sock.sendall(encode_line("!exit"))
                 break
             elif message.strip().startswith("!file "):
                 filename = message.strip()[6:]
-                send_file(filename)
+                if os.path.exists(filename) and os.path.getsize(filename) >= CHUNKED_THRESHOLD:
+                    send_file_chunked(filename)
+                else:
+                    send_file(filename)
+            elif message.strip().startswith("!zfile "):
+                codec, _, filename = message.strip()[7:].partition(" ")
+                if not filename or not is_codec(codec):
+                    codec, filename = DEFAULT_CODEC, message.strip()[7:]
+                send_file(filename, compress=codec)
             else:
-                sock.sendall(message.encode('utf-8'))
+                sock.sendall(encode_line(message))
         
         sock.close()
         print("Chatdan chiqildi.")
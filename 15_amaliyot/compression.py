@@ -0,0 +1,106 @@
+"""
+Fayl yuklashda oqimli siqish (zlib yoki lzma)
+Mijoz PUT sarlavhasida kodek va darajani aytadi:
+
+    PUT|filename|size|addr|sha256|zlib:6
+
+`size` va `sha256` siqilmagan fayl uchun. Siqilgan oqim o'zi tugashini
+bildiradi (zlib/xz oxiri), shuning uchun uning uzunligi oldindan kerak
+emas. Server bo'laklarni kelishi bilan ochib diskka yozadi - butun fayl
+hech qachon xotirada turmaydi, bitta chaqiruv natijasi ham OUTPUT_CHUNK
+bilan cheklangan (kichik "bomba" oqim xotirani to'ldira olmaydi).
+"""
+
+import lzma
+import os
+import zlib
+
+
+CODECS = {"zlib": (0, 9), "lzma": (0, 9)}  # kodek: (min, max) daraja
+DEFAULT_LEVEL = 6
+OUTPUT_CHUNK = 1024 * 1024  # bitta decompress chaqiruvi qaytaradigan maksimal bayt
+MAX_EXTENSION = 10  # metrikalar yorlig'i uchun fayl kengaytmasi uzunligi
+
+
+def parse_codec(text):
+    """'zlib', 'zlib:6', 'lzma:9' -> (kodek, daraja). Noto'g'ri bo'lsa ValueError"""
+    name, _, level = text.strip().lower().partition(":")
+    if name not in CODECS:
+        raise ValueError(f"Noma'lum kodek: {name}")
+    level = int(level) if level else DEFAULT_LEVEL
+    low, high = CODECS[name]
+    if not low <= level <= high:
+        raise ValueError(f"{name} darajasi {low}..{high} oralig'ida bo'lishi kerak")
+    return name, level
+
+
+def is_codec(text):
+    """!zfile buyrug'ining birinchi so'zi kodekmi (aks holda u fayl nomi)"""
+    try:
+        parse_codec(text)
+    except ValueError:
+        return False
+    return True
+
+
+def compressor(name, level=DEFAULT_LEVEL):
+    """compress()/flush() interfeysli siquvchi"""
+    if name == "zlib":
+        return zlib.compressobj(level)
+    return lzma.LZMACompressor(preset=level)
+
+
+class StreamDecoder:
+    """Siqilgan oqimni bo'laklab ochish.
+
+    feed(data) ochilgan bo'laklarni (har biri OUTPUT_CHUNK dan oshmaydi)
+    ketma-ket beradi. Oqim tugagach `eof` True bo'ladi; undan keyin
+    kelgan baytlar protokol xatosi.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        if name == "zlib":
+            self.obj = zlib.decompressobj()
+        else:
+            self.obj = lzma.LZMADecompressor()
+        self.eof = False
+
+    def feed(self, data):
+        if self.eof:
+            if data:
+                raise ValueError("Siqilgan oqimdan keyin ortiqcha ma'lumot")
+            return
+        obj = self.obj
+        try:
+            if self.name == "zlib":
+                while True:
+                    out = obj.decompress(data, OUTPUT_CHUNK)
+                    if out:
+                        yield out
+                    data = obj.unconsumed_tail
+                    # To'la bo'lak chiqsa kirish tugagan bo'lsa ham davomi bo'lishi mumkin
+                    if obj.eof or (not data and len(out) < OUTPUT_CHUNK):
+                        break
+            else:
+                out = obj.decompress(data, OUTPUT_CHUNK)
+                while True:
+                    if out:
+                        yield out
+                    if obj.eof or obj.needs_input:
+                        break
+                    out = obj.decompress(b"", OUTPUT_CHUNK)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Siqilgan oqim buzilgan: {e}")
+        if obj.eof:
+            self.eof = True
+            if obj.unused_data:
+                raise ValueError("Siqilgan oqimdan keyin ortiqcha ma'lumot")
+
+
+def file_type(filename):
+    """Statistika uchun fayl turi: kengaytma ('.log') yoki 'other'"""
+    ext = os.path.splitext(filename)[1].lower()
+    if 1 < len(ext) <= MAX_EXTENSION + 1 and ext[1:].isalnum() and ext.isascii():
+        return ext
+    return "other"
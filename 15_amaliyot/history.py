@@ -0,0 +1,221 @@
+"""
+Xonalar tarixi: oxirgi xabarlarning ixcham halqa buferi (ring)
+Har bir xona uchun oldindan ajratilgan bitta bytearray va ikkita offset
+massivi (array) - xabar uchun alohida obyekt yoki dict yaratilmaydi.
+Xabarlar baytlar halqasiga ketma-ket yoziladi, shuning uchun oxirgi N ta
+xabar halqada bitta (chegaradan o'tsa ikkita) uzluksiz bo'lak bo'ladi va
+qayta yuborish uchun bitta nusxa olish kifoya.
+
+Ixtiyoriy segment fayl (HistoryStore(directory=...)) tarixni server qayta
+ishga tushganda tiklaydi. Fayl faqat oxiriga yoziladi:
+
+    MAGIC | yozuv | yozuv | ...
+    yozuv = <BI (xona uzunligi, xabar uzunligi) | xona | xabar
+
+Segment SEGMENT_SIZE dan oshganda yangisi ochiladi va boshiga barcha
+ringlarning joriy holati yoziladi, eskisi o'chiriladi - ishga tushishda
+faqat oxirgi segment o'qiladi, server.log qayta skanerlanmaydi.
+"""
+
+import os
+import struct
+from array import array
+from collections import OrderedDict
+
+
+HISTORY_MESSAGES = 256  # bitta xonada saqlanadigan xabarlar soni
+HISTORY_BYTES = 64 * 1024  # bitta xona ringi hajmi (bayt)
+HISTORY_ROOMS = 128  # tarixi saqlanadigan xonalar (eng kam ishlatilgani chiqariladi)
+SEGMENT_SIZE = 8 * 1024 * 1024
+MAGIC = b"CHH1"
+RECORD = struct.Struct("<BI")
+
+
+class HistoryRing:
+    """Bitta xonaning oxirgi xabarlari (FIFO, sig'imi xabar va bayt bo'yicha)"""
+
+    def __init__(self, max_messages=HISTORY_MESSAGES, max_bytes=HISTORY_BYTES):
+        self.buffer = bytearray(max_bytes)
+        self.starts = array("I", bytes(4 * max_messages))
+        self.lengths = array("I", bytes(4 * max_messages))
+        self.first = 0  # eng eski xabar indeksi
+        self.count = 0
+        self.used = 0  # band baytlar
+        self.pos = 0  # keyingi yozish joyi
+
+    def __len__(self):
+        return self.count
+
+    def append(self, data):
+        """Xabarni qo'shish; joy bo'lmasa eng eskilari chiqarib yuboriladi"""
+        size = len(data)
+        capacity = len(self.buffer)
+        if size > capacity:
+            return
+        slots = len(self.starts)
+        while self.count and (self.count == slots or self.used + size > capacity):
+            self.used -= self.lengths[self.first]
+            self.first = (self.first + 1) % slots
+            self.count -= 1
+
+        index = (self.first + self.count) % slots
+        self.starts[index] = self.pos
+        self.lengths[index] = size
+        self.count += 1
+        self.used += size
+        # Halqa chegarasidan o'tsa ikki bo'lakka yoziladi
+        head = min(size, capacity - self.pos)
+        self.buffer[self.pos:self.pos + head] = data[:head]
+        if head < size:
+            self.buffer[:size - head] = data[head:]
+        self.pos = (self.pos + size) % capacity
+
+    def last(self, n):
+        """Oxirgi n ta xabar bitta bytes sifatida"""
+        n = min(n, self.count)
+        if n == 0:
+            return b""
+        start = self.starts[(self.first + self.count - n) % len(self.starts)]
+        if start < self.pos:
+            return bytes(self.buffer[start:self.pos])
+        return bytes(self.buffer[start:]) + bytes(self.buffer[:self.pos])
+
+    def messages(self):
+        """Barcha xabarlar eskisidan boshlab (segment snapshoti uchun)"""
+        capacity = len(self.buffer)
+        for i in range(self.count):
+            index = (self.first + i) % len(self.starts)
+            start, size = self.starts[index], self.lengths[index]
+            if start + size <= capacity:
+                yield bytes(self.buffer[start:start + size])
+            else:
+                yield bytes(self.buffer[start:]) + bytes(self.buffer[:start + size - capacity])
+
+
+class HistoryStore:
+    """Xonalar bo'yicha ringlar va ixtiyoriy append-only segment fayl"""
+
+    def __init__(self, directory=None, max_messages=HISTORY_MESSAGES, max_bytes=HISTORY_BYTES,
+                 max_rooms=HISTORY_ROOMS, segment_size=SEGMENT_SIZE, writable=True):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_rooms = max_rooms
+        self.segment_size = segment_size
+        self.rings = OrderedDict()  # {xona: HistoryRing}, oxirgisi - eng yangi
+        self.directory = directory
+        self.file = None
+        self.index = 0
+        self.appended = 0
+        self.loaded = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+            if writable:
+                self._open_segment()
+
+    def __len__(self):
+        return sum(len(ring) for ring in self.rings.values())
+
+    def _ring(self, room):
+        ring = self.rings.get(room)
+        if ring is None:
+            ring = self.rings[room] = HistoryRing(self.max_messages, self.max_bytes)
+            if len(self.rings) > self.max_rooms:
+                self.rings.popitem(last=False)
+        else:
+            self.rings.move_to_end(room)
+        return ring
+
+    def record(self, room, data):
+        """Xona tarixiga xabar qo'shish (segment fayl bo'lsa unga ham)"""
+        self._ring(room).append(data)
+        if self.file is not None:
+            self._write(room, data)
+            if self.appended >= self.segment_size:
+                self._rotate()
+
+    def replay(self, room, n):
+        """Xonaning oxirgi n ta xabari (bitta bytes) yoki b"" """
+        ring = self.rings.get(room)
+        return ring.last(n) if ring is not None else b""
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # ------------------------------------------------------------ segmentlar
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"{index:06d}.seg")
+
+    def _segments(self):
+        return sorted(
+            int(name[:-4]) for name in os.listdir(self.directory)
+            if name.endswith(".seg") and name[:-4].isdigit()
+        )
+
+    def _load(self):
+        """Oxirgi segmentni o'qish; yarim yozilgan oxirgi yozuv kesib tashlanadi"""
+        segments = self._segments()
+        if not segments:
+            return
+        self.index = segments[-1]
+        path = self._path(self.index)
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            return
+        view = memoryview(data)
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(data):
+            room_len, size = RECORD.unpack_from(data, offset)
+            end = offset + RECORD.size + room_len + size
+            if end > len(data):
+                break
+            room_start = offset + RECORD.size
+            room = bytes(view[room_start:room_start + room_len]).decode("utf-8")
+            self._ring(room).append(view[room_start + room_len:end])
+            self.loaded += 1
+            offset = end
+        if offset < len(data):
+            os.truncate(path, offset)
+
+    def _open_segment(self):
+        path = self._path(self.index) if self.index else None
+        if path is not None and os.path.exists(path) and os.path.getsize(path) >= len(MAGIC):
+            self.file = open(path, "ab")
+            self.appended = self.file.tell()
+        else:
+            self._rotate()
+
+    def _write(self, room, data):
+        room_bytes = room.encode("utf-8")
+        self.file.write(RECORD.pack(len(room_bytes), len(data)))
+        self.file.write(room_bytes)
+        self.file.write(data)
+        self.appended += RECORD.size + len(room_bytes) + len(data)
+
+    def _rotate(self):
+        """Yangi segment: joriy ringlar snapshoti, keyin eski segmentlarni o'chirish"""
+        self.close()
+        self.index += 1
+        path = self._path(self.index)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            self.file = f
+            f.write(MAGIC)
+            for room, ring in self.rings.items():
+                for data in ring.messages():
+                    self._write(room, data)
+        # Snapshot to'liq yozilgandan keyingina ko'rinadi
+        os.replace(tmp_path, path)
+        self.file = open(path, "ab")
+        self.appended = 0
+        for index in self._segments():
+            if index < self.index:
+                os.remove(self._path(index))
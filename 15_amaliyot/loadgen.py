@@ -0,0 +1,534 @@
+"""
+Chat server uchun yuklama generatori va kechikish benchmarki
+Bitta jarayonda minglab simulyatsiya qilingan mijozlar (selectors asosida):
+- ulanish va ism bilan ro'yxatdan o'tish (ulanish tezligi o'lchanadi)
+- berilgan tezlikda xabar yuborish; xabar ichida yuborilgan vaqt bor,
+  qabul qiluvchi end-to-end kechikishni hisoblaydi (p50/p99/p999)
+- !list so'rovlari va FILE_PORT ga fayl yuklash
+- server RSS (psutil, workerlar bilan birga)
+
+Natija JSON hisobot sifatida saqlanadi va oldingi hisobot bilan
+solishtirilishi mumkin (--compare).
+
+Ishlatish:
+    python loadgen.py --spawn --clients 1000 --rate 0.2 --duration 20 --output report.json
+    python loadgen.py --spawn --server-args "--workers 4" --procs 4 --clients 4000
+    python loadgen.py --clients 500 --compare old.json   # ishlab turgan serverga qarshi
+"""
+
+import argparse
+import errno
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import random
+import selectors
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import psutil
+
+from protocol import LineReader, RECV_SIZE, encode_line
+
+
+HOST = "127.0.0.1"
+CHAT_PORT = 5000
+FILE_PORT = 5001
+
+LG_MARK = b": LG "
+WELCOME = b"[SERVER] Xush kelibsiz"
+LIST_HEADER = b"[SERVER] Ulangan mijozlar"
+
+
+class LatencyHistogram:
+    """Logarifmik bucketli histogram (~2% aniqlik), jarayonlar orasida birlashtiriladi"""
+
+    BASE = 1.02
+    LOG_BASE = math.log(BASE)
+
+    def __init__(self, counts=None):
+        self.counts = defaultdict(int)
+        self.total = 0
+        self.max = 0
+        if counts:
+            self.merge(counts)
+
+    def record(self, micros):
+        bucket = int(math.log(micros) / self.LOG_BASE) if micros >= 1 else 0
+        self.counts[bucket] += 1
+        self.total += 1
+        if micros > self.max:
+            self.max = micros
+
+    def merge(self, data):
+        for bucket, count in data["counts"].items():
+            self.counts[int(bucket)] += count
+            self.total += count
+        self.max = max(self.max, data["max"])
+
+    def percentile(self, p):
+        """Mikrosekundda p-persentil (bucket yuqori chegarasi)"""
+        if not self.total:
+            return 0.0
+        target = p / 100 * self.total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self.BASE ** (bucket + 1), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {"counts": dict(self.counts), "max": self.max}
+
+    def summary_ms(self):
+        return {
+            "count": self.total,
+            "p50": round(self.percentile(50) / 1000, 3),
+            "p99": round(self.percentile(99) / 1000, 3),
+            "p999": round(self.percentile(99.9) / 1000, 3),
+            "max": round(self.max / 1000, 3),
+        }
+
+
+class SimClient:
+    """Bitta simulyatsiya qilingan chat mijozi"""
+
+    __slots__ = ("sock", "nick", "room", "reader", "outbuf", "connect_ns", "registered", "writing", "closed")
+
+    def __init__(self, sock, nick, room, scratch):
+        self.sock = sock
+        self.nick = nick
+        self.room = room
+        self.reader = LineReader(scratch)
+        self.outbuf = bytearray()
+        self.connect_ns = time.monotonic_ns()
+        self.registered = False
+        self.writing = True  # ulanish tugashini EVENT_WRITE orqali kutamiz
+        self.closed = False
+
+
+def run_sim(cfg, proc_index):
+    """Bitta jarayondagi simulyatsiya; natija lug'at ko'rinishida qaytadi"""
+    sel = selectors.DefaultSelector()
+    scratch = bytearray(RECV_SIZE)
+    latency = LatencyHistogram()
+    setup = LatencyHistogram()
+    counters = defaultdict(int)
+    clients = []
+    rng = random.Random(proc_index)
+    padding = "x" * max(0, cfg["msg_size"] - 32)
+
+    def send(client, data):
+        if client.closed:
+            return
+        if client.outbuf:
+            client.outbuf += data
+            return
+        try:
+            sent = client.sock.send(data)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            counters["send_errors"] += 1
+            return
+        if sent < len(data):
+            client.outbuf += data[sent:]
+            client.writing = True
+            sel.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+
+    def on_line(client, line):
+        idx = line.find(LG_MARK)
+        if idx != -1:
+            end = line.find(b" ", idx + len(LG_MARK))
+            sent_ns = int(line[idx + len(LG_MARK):end if end != -1 else None])
+            latency.record((time.monotonic_ns() - sent_ns) / 1000)
+            counters["received"] += 1
+        elif not client.registered and line.startswith(WELCOME):
+            client.registered = True
+            setup.record((time.monotonic_ns() - client.connect_ns) / 1000)
+            counters["registered"] += 1
+            if client.room:
+                send(client, encode_line(f"!join {client.room}"))
+        elif line.startswith(LIST_HEADER):
+            counters["list_replies"] += 1
+
+    def on_event(client, mask):
+        if mask & selectors.EVENT_WRITE:
+            if client.writing and not client.outbuf:
+                err = client.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    counters["connect_errors"] += 1
+                    close(client)
+                    return
+            if client.outbuf:
+                try:
+                    sent = client.sock.send(client.outbuf)
+                    del client.outbuf[:sent]
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    close(client)
+                    return
+            if not client.outbuf:
+                client.writing = False
+                sel.modify(client.sock, selectors.EVENT_READ, client)
+        if mask & selectors.EVENT_READ:
+            try:
+                lines = client.reader.read_from(client.sock)
+            except BlockingIOError:
+                return
+            except (OSError, ValueError):
+                lines = None
+            if lines is None:
+                counters["disconnected"] += 1
+                close(client)
+                return
+            for line in lines:
+                on_line(client, line)
+
+    def close(client):
+        try:
+            sel.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        client.closed = True
+
+    def poll(until_ns):
+        timeout = max(0.0, (until_ns - time.monotonic_ns()) / 1e9)
+        for key, mask in sel.select(timeout=min(timeout, 0.05)):
+            on_event(key.data, mask)
+
+    # 1. Ulanish bosqichi: connect_rate tezlikda ulanish va ro'yxatdan o'tish
+    count = cfg["clients"]
+    interval_ns = int(1e9 / cfg["connect_rate"])
+    ramp_start = time.monotonic_ns()
+    next_connect = ramp_start
+    for i in range(count):
+        while time.monotonic_ns() < next_connect:
+            poll(next_connect)
+        next_connect += interval_ns
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        counters["connect_attempts"] += 1
+        rc = sock.connect_ex((cfg["host"], cfg["port"]))
+        if rc not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            counters["connect_errors"] += 1
+            sock.close()
+            continue
+        room = f"lg{i % cfg['rooms']}" if cfg["rooms"] > 1 else None
+        client = SimClient(sock, f"lg{proc_index}x{i}", room, scratch)
+        clients.append(client)
+        sel.register(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+        client.outbuf += encode_line(client.nick)
+
+    deadline = time.monotonic_ns() + int(cfg["connect_timeout"] * 1e9)
+    while time.monotonic_ns() < deadline and (
+        counters["registered"] < sum(1 for c in clients if not c.closed)
+    ):
+        poll(deadline)
+    ramp_seconds = (time.monotonic_ns() - ramp_start) / 1e9
+
+    # 2. Barqaror bosqich: xabarlar va !list so'rovlari
+    latency = LatencyHistogram()  # ro'yxatdan o'tish paytidagi shovqinni hisobga olmaslik
+    counters["received"] = 0
+    now = time.monotonic_ns()
+    schedule = []
+    if cfg["rate"] > 0:
+        msg_interval = int(1e9 / cfg["rate"])
+        for idx in range(len(clients)):
+            heapq.heappush(schedule, (now + rng.randrange(msg_interval), idx, "msg"))
+    if cfg["list_rate"] > 0:
+        heapq.heappush(schedule, (now, -1, "list"))
+
+    steady_start = now
+    cpu_start = time.process_time()
+    steady_end = now + int(cfg["duration"] * 1e9)
+    while time.monotonic_ns() < steady_end:
+        now = time.monotonic_ns()
+        while schedule and schedule[0][0] <= now:
+            when, idx, kind = heapq.heappop(schedule)
+            if kind == "msg":
+                if not clients[idx].closed:
+                    send(clients[idx], f"LG {time.monotonic_ns()} {padding}\n".encode("utf-8"))
+                    counters["sent"] += 1
+                    heapq.heappush(schedule, (when + msg_interval, idx, kind))
+            else:
+                send(rng.choice(clients), b"!list\n")
+                counters["list_sent"] += 1
+                heapq.heappush(schedule, (when + int(1e9 / cfg["list_rate"]), idx, kind))
+        poll(min(schedule[0][0] if schedule else steady_end, steady_end))
+    steady_seconds = (time.monotonic_ns() - steady_start) / 1e9
+    cpu_seconds = time.process_time() - cpu_start
+
+    # 3. Yo'ldagi xabarlarni kutish va yopish
+    drain_end = time.monotonic_ns() + int(cfg["drain"] * 1e9)
+    while time.monotonic_ns() < drain_end:
+        poll(drain_end)
+    for client in clients:
+        if not client.closed:
+            close(client)
+    sel.close()
+
+    return {
+        "counters": dict(counters),
+        "latency": latency.to_dict(),
+        "setup": setup.to_dict(),
+        "ramp_seconds": ramp_seconds,
+        "steady_seconds": steady_seconds,
+        "cpu_seconds": cpu_seconds,
+    }
+
+
+def upload_loop(cfg, stop, results):
+    """Fon thread: FILE_PORT ga upload_rate tezlikda fayl yuklash"""
+    payload = os.urandom(cfg["upload_size"])
+    interval = 1.0 / cfg["upload_rate"]
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with socket.create_connection((cfg["host"], cfg["file_port"]), timeout=30) as sock:
+                sock.sendall(f"loadgen.bin|{len(payload)}|{HOST}:{FILE_PORT}\n".encode("utf-8"))
+                sock.sendall(payload)
+                ok = sock.recv(1024).startswith(b"SUCCESS")
+        except OSError:
+            ok = False
+        elapsed = time.perf_counter() - start
+        results["ok" if ok else "failed"] += 1
+        results["seconds"] += elapsed
+        stop.wait(max(0.0, interval - elapsed))
+
+
+def rss_sampler(pid, stop, samples):
+    """Server (va uning workerlari) RSS ni har soniyada o'lchash"""
+    try:
+        proc = psutil.Process(pid)
+    except psutil.Error:
+        return
+    while not stop.is_set():
+        try:
+            rss = proc.memory_info().rss
+            rss += sum(child.memory_info().rss for child in proc.children(recursive=True))
+            samples.append(rss)
+        except psutil.Error:
+            return
+        stop.wait(1.0)
+
+
+def find_server_pid(port):
+    """Berilgan portni tinglayotgan jarayonni topish"""
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.laddr and conn.laddr.port == port and conn.status == psutil.CONN_LISTEN and conn.pid:
+                proc = psutil.Process(conn.pid)
+                # Ko'p jarayonli rejimda (fork qilingan workerlar) ota jarayonni olish
+                parent = proc.parent()
+                if parent and parent.cmdline() == proc.cmdline():
+                    return parent.pid
+                return conn.pid
+    except (psutil.Error, PermissionError):
+        pass
+    return None
+
+
+def build_report(cfg, results, uploads, rss_samples, server_pid, label):
+    """Jarayonlar natijalarini bitta hisobotga birlashtirish"""
+    counters = defaultdict(int)
+    latency = LatencyHistogram()
+    setup = LatencyHistogram()
+    for r in results:
+        for key, value in r["counters"].items():
+            counters[key] += value
+        latency.merge(r["latency"])
+        setup.merge(r["setup"])
+    ramp = max(r["ramp_seconds"] for r in results)
+    steady = max(r["steady_seconds"] for r in results)
+    # Generator jarayoni CPU ga to'yingan bo'lsa kechikish generatorning o'zidan bo'ladi
+    loadgen_cpu = max(r["cpu_seconds"] for r in results) / steady if steady else 0.0
+
+    return {
+        "label": label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": cfg,
+        "connections": {
+            "attempted": counters["connect_attempts"],
+            "registered": counters["registered"],
+            "errors": counters["connect_errors"],
+            "disconnected": counters["disconnected"],
+            "setup_per_sec": round(counters["registered"] / ramp, 1) if ramp else 0.0,
+            "setup_latency_ms": setup.summary_ms(),
+        },
+        "messages": {
+            "sent": counters["sent"],
+            "delivered": counters["received"],
+            "sent_per_sec": round(counters["sent"] / steady, 1) if steady else 0.0,
+            "delivered_per_sec": round(counters["received"] / steady, 1) if steady else 0.0,
+            "send_errors": counters["send_errors"],
+        },
+        "loadgen_cpu_max": round(loadgen_cpu, 2),
+        "latency_ms": latency.summary_ms(),
+        "latency_histogram_us": latency.to_dict(),
+        "list": {"sent": counters["list_sent"], "replies": counters["list_replies"]},
+        "uploads": {
+            "ok": uploads["ok"],
+            "failed": uploads["failed"],
+            "mb_per_sec": round(
+                uploads["ok"] * cfg["upload_size"] / uploads["seconds"] / 1024 ** 2, 1
+            ) if uploads["seconds"] else 0.0,
+        },
+        "server": {
+            "pid": server_pid,
+            "rss_max_mb": round(max(rss_samples) / 1024 ** 2, 1) if rss_samples else None,
+            "rss_end_mb": round(rss_samples[-1] / 1024 ** 2, 1) if rss_samples else None,
+        },
+    }
+
+
+# Solishtirishda ko'rsatiladigan ko'rsatkichlar: (yo'l, kattaroq yaxshimi)
+COMPARE_KEYS = [
+    (("messages", "delivered_per_sec"), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p99"), False),
+    (("latency_ms", "p999"), False),
+    (("connections", "setup_per_sec"), True),
+    (("uploads", "mb_per_sec"), True),
+    (("server", "rss_max_mb"), False),
+]
+
+
+def compare_reports(old, new):
+    """Ikki hisobotni solishtirib, o'zgarishlarni chiqarish"""
+    print(f"\n=== {old.get('label') or 'eski'} -> {new.get('label') or 'yangi'} ===")
+    for path, higher_is_better in COMPARE_KEYS:
+        a, b = old, new
+        for key in path:
+            a = (a or {}).get(key)
+            b = (b or {}).get(key)
+        if not a or b is None:
+            continue
+        change = (b - a) / a * 100
+        worse = change < 0 if higher_is_better else change > 0
+        mark = "REGRESSIYA" if worse and abs(change) > 5 else ""
+        print(f"{'.'.join(path):<32} {a:>10} -> {b:>10}  {change:+6.1f}%  {mark}")
+
+
+def print_report(report):
+    c, m, l = report["connections"], report["messages"], report["latency_ms"]
+    print("\n=== LOADGEN HISOBOT ===")
+    print(f"Ulanishlar: {c['registered']}/{c['attempted']} ({c['errors']} xato), "
+          f"{c['setup_per_sec']} ulanish/s, setup p99={c['setup_latency_ms']['p99']}ms")
+    print(f"Xabarlar: {m['sent']} yuborildi ({m['sent_per_sec']}/s), "
+          f"{m['delivered']} yetkazildi ({m['delivered_per_sec']}/s)")
+    if report["loadgen_cpu_max"] > 0.9:
+        print(f"OGOHLANTIRISH: generator CPU {report['loadgen_cpu_max']:.0%} - --procs ni oshiring")
+    print(f"Kechikish: p50={l['p50']}ms p99={l['p99']}ms p999={l['p999']}ms max={l['max']}ms")
+    print(f"!list: {report['list']['sent']} so'rov, {report['list']['replies']} javob")
+    u = report["uploads"]
+    print(f"Uploadlar: {u['ok']} OK, {u['failed']} xato, {u['mb_per_sec']} MB/s")
+    s = report["server"]
+    print(f"Server RSS: max={s['rss_max_mb']} MB, oxiri={s['rss_end_mb']} MB (pid {s['pid']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="15_amaliyot chat server load generator")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=CHAT_PORT)
+    parser.add_argument("--file-port", type=int, default=FILE_PORT)
+    parser.add_argument("--clients", type=int, default=500, help="jami simulyatsiya mijozlari")
+    parser.add_argument("--procs", type=int, default=1, help="yuklama generatori jarayonlari")
+    parser.add_argument("--connect-rate", type=float, default=500.0, help="ulanish/s (har bir jarayon uchun)")
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    parser.add_argument("--rate", type=float, default=0.5, help="har bir mijoz uchun xabar/s")
+    parser.add_argument("--msg-size", type=int, default=64, help="xabar hajmi (bayt)")
+    parser.add_argument("--rooms", type=int, default=1, help="mijozlar shuncha xonaga taqsimlanadi")
+    parser.add_argument("--list-rate", type=float, default=0.0, help="!list so'rovlari/s (har bir jarayon)")
+    parser.add_argument("--upload-rate", type=float, default=0.0, help="fayl yuklash/s")
+    parser.add_argument("--upload-size", type=int, default=1024 * 1024)
+    parser.add_argument("--duration", type=float, default=10.0, help="barqaror bosqich (soniya)")
+    parser.add_argument("--drain", type=float, default=1.0, help="yakunda yo'ldagi xabarlarni kutish")
+    parser.add_argument("--server-pid", type=int, help="RSS o'lchash uchun server PID")
+    parser.add_argument("--spawn", action="store_true", help="main.py ni vaqtinchalik papkada ishga tushirish")
+    parser.add_argument("--server-args", default="", help="--spawn bilan main.py ga uzatiladigan argumentlar")
+    parser.add_argument("--label", default="", help="hisobotdagi versiya nomi")
+    parser.add_argument("--output", help="JSON hisobot fayli")
+    parser.add_argument("--compare", help="solishtirish uchun oldingi JSON hisobot")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        workdir = tempfile.mkdtemp(prefix="loadgen-")
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")]
+            + shlex.split(args.server_args),
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        time.sleep(1.0)
+    server_pid = server.pid if server else (args.server_pid or find_server_pid(args.port))
+
+    per_proc = args.clients // args.procs
+    cfg = {
+        "host": args.host,
+        "port": args.port,
+        "file_port": args.file_port,
+        "clients": per_proc,
+        "procs": args.procs,
+        "connect_rate": args.connect_rate,
+        "connect_timeout": args.connect_timeout,
+        "rate": args.rate,
+        "msg_size": args.msg_size,
+        "rooms": args.rooms,
+        "list_rate": args.list_rate,
+        "upload_rate": args.upload_rate,
+        "upload_size": args.upload_size,
+        "duration": args.duration,
+        "drain": args.drain,
+        "server_args": args.server_args,
+    }
+
+    stop = threading.Event()
+    rss_samples = []
+    uploads = {"ok": 0, "failed": 0, "seconds": 0.0}
+    helpers = []
+    if server_pid:
+        helpers.append(threading.Thread(target=rss_sampler, args=(server_pid, stop, rss_samples), daemon=True))
+    if args.upload_rate > 0:
+        helpers.append(threading.Thread(target=upload_loop, args=(cfg, stop, uploads), daemon=True))
+    for t in helpers:
+        t.start()
+
+    try:
+        if args.procs > 1:
+            with multiprocessing.Pool(args.procs) as pool:
+                results = pool.starmap(run_sim, [(cfg, i) for i in range(args.procs)])
+        else:
+            results = [run_sim(cfg, 0)]
+    finally:
+        stop.set()
+        for t in helpers:
+            t.join(timeout=35)
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = build_report(cfg, results, uploads, rss_samples, server_pid, args.label)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHisobot saqlandi: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Asinxron log yozuvchi
+Fayl bir marta ochiladi, yozuvlar cheklangan navbat orqali fon threadga
+uzatiladi va u yerda paketlab yoziladi. Event loop threadi faqat navbatga
+qo'yadi, fayl syscall'lari bilan band bo'lmaydi.
+
+Navbat to'lganda ikki xil siyosat bor:
+- "drop"  - yangi yozuv tashlab yuboriladi (dropped hisoblagichi oshadi)
+- "block" - yozuvchi navbatda joy bo'shaguncha kutadi
+"""
+
+import queue
+import threading
+import time
+
+
+POLICIES = ("drop", "block")
+
+
+class LogWriter:
+    """Fon threadda paketlab yozuvchi log sink"""
+
+    _STOP = object()
+
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=0.5, policy="drop"):
+        if policy not in POLICIES:
+            raise ValueError(f"Noma'lum siyosat: {policy} (mumkin: {', '.join(POLICIES)})")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, line):
+        """Yozuvni navbatga qo'yish"""
+        if self.policy == "block":
+            self.queue.put(line)
+            return
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def depth(self):
+        """Navbatdagi yozilmagan yozuvlar soni"""
+        return self.queue.qsize()
+
+    def close(self, timeout=5.0):
+        """Qolgan yozuvlarni yozib, threadni to'xtatish"""
+        self.queue.put(self._STOP)
+        self.thread.join(timeout)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            pending = 0
+            last_flush = time.monotonic()
+            while True:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                batch = []
+                stop = item is self._STOP
+                if item is not None and not stop:
+                    batch.append(item)
+                    # Navbatda turgan boshqa yozuvlarni ham bitta paketga yig'ish
+                    while len(batch) < self.batch_size:
+                        try:
+                            item = self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is self._STOP:
+                            stop = True
+                            break
+                        batch.append(item)
+
+                if batch:
+                    f.writelines(batch)
+                    pending += len(batch)
+                    self.written += len(batch)
+
+                now = time.monotonic()
+                if pending and (stop or pending >= self.batch_size or now - last_flush >= self.flush_interval):
+                    f.flush()
+                    pending = 0
+                if pending == 0:
+                    last_flush = now
+                if stop:
+                    return
@@ -10,63 +10,275 @@ Birlashtirilgan topshiriqlar:
 - Logging (6)
 """
 
+import argparse
+import hashlib
+import itertools
+import queue
 import selectors
+import shutil
+import signal
 import socket
-import threading
+import sys
+import tempfile
 import time
 import os
-from datetime import datetime
-from collections import defaultdict
-
-# Global o'zgaruvchilar
-HOST = "127.0.0.1"
-PORT = 5000
-FILE_PORT = 5001
-LOG_FILE = "server.log"
-UPLOADS_DIR = "uploads"
-STATS_INTERVAL = 10  # soniya
-
-# Statistikalar
-stats = {
-    'total_messages': 0,
-    'total_files': 0,
-    'active_clients': 0,
-    'start_time': time.time()
-}
-
-# Mijozlar ro'yxati: {socket: {'addr': addr, 'nickname': nickname}}
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+
+import server_core
+from blob_store import BlobStore
+from bus import Bus
+from compression import StreamDecoder
+from history import HistoryStore
+from log_writer import POLICIES
+from metrics import start_http_server
+from protocol import LineReader, RECV_SIZE, decode_line, encode_line
+from server_core import (
+    DEFAULT_ROOM, FILE_PORT, HISTORY_FLUSH, HOST, MAX_HEADER, MAX_NAME, PORT, SLOW_POLICIES,
+    UPLOAD_CHUNK, UPLOADS_DIR,
+    broadcast_deliveries, broadcast_encodes, bytes_sent, dropped_messages, fanout_seconds,
+    history_replays, loop_lag, message_size, queue_depth, registry, send_calls, sent_buffers,
+    start_time, timers, total_files, total_messages, upload_bytes,
+    active_partial, cancel_timers, chunk_done, chunk_offset, client_entry, close_partial, commit_blob,
+    compression_summary, configure, decompress, enqueue, hash_partial, history_replay, link_blob,
+    list_page, log_message, missing_chunks, observe_compression, open_partial, parse_init, parse_put,
+    parse_upload, pwrite_all, release_partial, resume, start_idle_timer, start_log, valid_name,
+)
+
+# Global o'zgaruvchilar (umumiylari va navbat siyosati: server_core.py)
+SELECT_TIMEOUT = 1.0  # soniya - yagona event loop uchun
+ACCEPT_BATCH = 64  # bitta tayyorlikda qabul qilinadigan maksimal ulanishlar
+# Xona tarixi (qarang: history.py): HISTORY_DIR berilsa tarix segment
+# faylga ham yoziladi va har HISTORY_FLUSH soniyada diskka tushiriladi
+HISTORY_DIR = None
+# sendmsg() ga bir marta beriladigan maksimal buferlar soni
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+# Log yozuvchi navbati va siyosati (drop yoki block)
+LOG_QUEUE_SIZE = 10000
+LOG_POLICY = "drop"
+# Fayl yuklash: bitta tayyorlikda nechta recv_into qilinadi (katta upload
+# boshqa ulanishlarni kutdirib qo'ymasligi uchun)
+UPLOAD_READS_PER_EVENT = 8
+# Metrikalar endpointi: http://HOST:METRICS_PORT/metrics (worker N uchun +N)
+METRICS_PORT = 5002
+
+# Mijozlar ro'yxati:
+# {socket: {'id': int, 'addr': addr, 'nickname': nickname, 'reader': LineReader,
+#           'rooms': set, 'room': joriy xona,
+#           'outq': deque[bytes | memoryview] (memoryview - tashlab bo'lmaydigan),
+#           'outbytes': int, 'paused': bool, 'dropped': int,
+#           'blocked_since': navbat tick oxirida bo'shamay qolgan payt (monotonic) yoki None,
+#           'slow_since': HIGH_WATERMARK dan oshgan payt yoki None,
+#           'last_active': oxirgi o'qish (monotonic), 'idle_timer': Timer,
+#           'slow_timer': Timer, 'sock': socket}}
 clients = {}
+client_ids = itertools.count(1)
+
+# Shu tick davomida navbatiga yangi ma'lumot qo'shilgan mijozlar.
+# Tick oxirida har biriga bitta sendmsg() bilan yuboriladi.
+pending_flush = set()
+
+# Indekslar: xabar faqat haqiqiy qabul qiluvchilarga boradi
+rooms = defaultdict(set)  # {xona: {socket, ...}}
+nicknames = {}  # {nickname: socket}
+
+# Ko'p jarayonli rejim (--workers N): shu jarayon raqami, workerlar orasidagi
+# bus va boshqa workerlardagi mijozlar:
+# {(worker, id): {'nickname': str, 'addr': str, 'rooms': set}}
+worker_id = 0
+bus = None
+remote_clients = {}
+remote_nicknames = {}  # {nickname: (worker, id)}
+remote_room_counts = defaultdict(int)  # {xona: boshqa workerlardagi a'zolar soni}
+
+# Fon log yozuvchisi va xonalar tarixi (serve() da yaratiladi)
+log_writer = None
+history = None
+
+# Fayl yuklash ulanishlari (state machine):
+# {socket: {'addr': addr, 'state': 'header'|'body'|'chunk'|'commit', 'header': bytearray,
+#           'file': file, 'path': vaqtinchalik fayl, 'name': str, 'size': int,
+#           'received': int, 'client_addr': str, 'partial': upload_id, 'started': float,
+#           'hash': sha256, 'expected': mijoz aytgan xesh yoki None}}
+uploads = {}
 
-# Selectorlar
+# Upload ombori (qarang: blob_store.py) - fayl porti ochilgan workerda yaratiladi
+store = None
+
+# COMMIT da to'liq fayl xeshi fon threadda hisoblanadi (katta fayl event
+# loop'ni to'xtatmasligi uchun). Natija hash_done navbatiga tushadi,
+# wakeup_send socketiga yozilgan bayt esa selector'ni uyg'otadi.
+hash_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hash")
+hash_done = queue.SimpleQueue()
+wakeup_send = None
+
+# Barcha mijozlar uchun umumiy recv_into buferi (server bitta threadda o'qiydi)
+recv_buffer = bytearray(RECV_SIZE)
+
+# Fayl yuklash uchun oldindan ajratilgan bufer
+upload_buffer = bytearray(UPLOAD_CHUNK)
+upload_view = memoryview(upload_buffer)
+
+# Yagona selector: chat va fayl portlari bitta event loop'da
 sel = selectors.DefaultSelector()
-file_sel = selectors.DefaultSelector()
 
 # Uploads papkasini yaratish
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 
-def log_message(message_type, message, client_addr=None):
-    """Xabarlarni server.log fayliga yozish"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    addr_str = f" [{client_addr}]" if client_addr else ""
-    log_entry = f"[{timestamp}]{addr_str} [{message_type}] {message}\n"
+def register_gauges():
+    """Scrape paytida hisoblanadigan, shu backend holatiga bog'liq gauge'lar"""
+    registry.gauge("chat_active_clients", "Shu workerdagi mijozlar", lambda: len(clients))
+    registry.gauge("chat_remote_clients", "Boshqa workerlardagi mijozlar", lambda: len(remote_clients))
+    registry.gauge("chat_rooms", "Shu workerdagi bo'sh bo'lmagan xonalar", lambda: len(rooms))
+    registry.gauge("chat_slow_clients", "HIGH_WATERMARK dan oshgan mijozlar", lambda: sum(info['paused'] for info in list(clients.values())))
+    registry.gauge("upload_index_names", "Upload indeksidagi fayl nomlari", lambda: len(store.index) if store else 0)
+    registry.gauge("chat_history_messages", "Xonalar tarixidagi xabarlar", lambda: len(history) if history else 0)
+    registry.gauge("upload_active", "Ochiq upload ulanishlari", lambda: len(uploads))
+    registry.gauge("bus_sent", "Bus orqali yuborilgan hodisalar", lambda: bus.sent if bus else 0)
+    registry.gauge("bus_dropped", "Bus da tashlangan hodisalar", lambda: bus.dropped if bus else 0)
+    registry.gauge("bus_pending", "Bus da yetkazilishini kutayotgan boshqaruv hodisalari", lambda: bus.backlog() if bus else 0)
+
+
+def update_interest(sock, info):
+    """Chiquvchi navbat bo'sh bo'lmasa EVENT_WRITE ni ham kuzatish"""
+    events = selectors.EVENT_READ
+    if info['outq']:
+        events |= selectors.EVENT_WRITE
+    if sel.get_key(sock).events != events:
+        sel.modify(sock, events, handle_client_io)
+
+
+def queue_send(sock, data, droppable=True):
+    """Mijoz navbatiga tayyor baytlarni qo'shish (siyosat: server_core.enqueue).
+    
+    Hech narsa darhol yuborilmaydi: bitta tick ichida to'plangan barcha
+    buferlar tick oxirida flush_pending() da bitta sendmsg() bilan
+    yuboriladi. Mijoz uzilgan (yoki navbati to'lib uzilishi kerak) bo'lsa
+    False qaytaradi.
+    """
+    info = clients.get(sock)
+    if info is None:
+        return False
+    queued = enqueue(info, data, droppable)
+    if queued is None:
+        return False
+    if queued:
+        pending_flush.add(sock)
+    return True
+
+
+def disconnect_slow(info):
+    """disconnect siyosati: SLOW_TIMEOUT dan keyin ham sekin mijozni uzish"""
+    handle_client_disconnect(info['sock'])
+
+
+def close_idle(info, data):
+    """Faolsiz mijozga oxirgi xabarni yuborib uzish"""
+    sock = info['sock']
+    queue_send(sock, data, droppable=False)
+    drain_client(sock, info)
+    if sock in clients:
+        handle_client_disconnect(sock)
+
+
+def drain_client(sock, info):
+    """Navbatdagi buferlarni vectored write (sendmsg) bilan yuborish"""
+    outq = info['outq']
+    queue_depth.observe(info['outbytes'])
+    while outq:
+        batch = list(islice(outq, IOV_MAX))
+        try:
+            sent = sock.sendmsg(batch)
+        except BlockingIOError:
+            break
+        except (ConnectionError, OSError):
+            handle_client_disconnect(sock)
+            return
+        send_calls.inc()
+        bytes_sent.inc(sent)
+        info['outbytes'] -= sent
+        
+        # To'liq yuborilgan buferlarni olib tashlash, qisman yuborilganini kesish
+        done = 0
+        while sent:
+            head = outq[0]
+            if sent >= len(head):
+                sent -= len(head)
+                outq.popleft()
+                done += 1
+            else:
+                # Qisman yuborilgan bufer memoryview - drop_oldest uni tashlamaydi
+                outq[0] = memoryview(head)[sent:]
+                sent = 0
+        sent_buffers.inc(done)
+        if outq and len(batch) < IOV_MAX:
+            # Kernel buferi to'ldi - qolgani EVENT_WRITE da
+            break
     
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(log_entry)
+    # Lag: kernel buferi to'lib, navbat birinchi marta bo'shamay qolgan paytdan
+    if not outq:
+        info['blocked_since'] = None
+    elif info['blocked_since'] is None:
+        info['blocked_since'] = time.monotonic()
+    if info['paused']:
+        resume(info)
+    update_interest(sock, info)
+
+
+def flush_client(sock):
+    """EVENT_WRITE kelganda chiquvchi navbatni bo'shatish"""
+    pending_flush.discard(sock)
+    drain_client(sock, clients[sock])
+
+
+def flush_pending():
+    """Tick oxirida: har bir mijozga to'plangan xabarlarni bitta syscall bilan yuborish"""
+    while pending_flush:
+        sock = pending_flush.pop()
+        info = clients.get(sock)
+        # EVENT_WRITE kutayotgan mijoz socket yozishga tayyor bo'lganda yuboriladi
+        if info is not None and not (sel.get_key(sock).events & selectors.EVENT_WRITE):
+            drain_client(sock, info)
+
+
+def broadcast_message(sender_sock, message, exclude_sender=True, room=None, record=False):
+    """Xona a'zolariga (room=None bo'lsa barcha mijozlarga) xabar yuborish.
     
-    print(f"[{timestamp}]{addr_str} {message}")
+    record=True bo'lsa xabar xona tarixiga ham yoziladi. Ko'p jarayonli
+    rejimda xabar bus orqali boshqa workerlarga ham boradi va har bir
+    worker uni o'z tarixiga yozadi.
+    """
+    deliver_local(sender_sock, message, exclude_sender, room, record)
+    if bus is not None:
+        bus.publish({'t': 'broadcast', 'text': message, 'room': room, 'record': record}, droppable=True)
 
 
-def broadcast_message(sender_sock, message, exclude_sender=True):
-    """Barcha mijozlarga xabar yuborish"""
+def deliver_local(sender_sock, message, exclude_sender=True, room=None, record=False):
+    """Shu jarayondagi qabul qiluvchilarga xabar yuborish.
+    
+    Xabar bir marta kodlanadi va bitta o'zgarmas bytes obyekti barcha
+    qabul qiluvchilar navbatiga (va tarix ringiga) qo'yiladi.
+    """
+    started = time.perf_counter()
+    targets = clients if room is None else rooms.get(room, ())
+    data = message.encode('utf-8')
+    if record and room is not None:
+        history.record(room, data)
     disconnected = []
-    for sock, client_info in clients.items():
+    delivered = 0
+    for sock in targets:
         if exclude_sender and sock == sender_sock:
             continue
-        try:
-            sock.sendall(message.encode('utf-8'))
-        except (ConnectionError, OSError):
+        if not queue_send(sock, data):
             disconnected.append(sock)
+        else:
+            delivered += 1
+    # Hisoblagichlar har bir qabul qiluvchida emas, broadcast oxirida bir marta
+    broadcast_encodes.inc()
+    broadcast_deliveries.inc(delivered)
+    fanout_seconds.observe(time.perf_counter() - started)
     
     # Uzilgan ulanishlarni tozalash
     for sock in disconnected:
@@ -78,235 +290,958 @@ def handle_client_disconnect(sock):
     if sock in clients:
         client_info = clients[sock]
         addr = client_info['addr']
-        nickname = client_info.get('nickname', 'Unknown')
-        
-        log_message("DISCONNECT", f"Mijoz chiqdi: {nickname} ({addr[0]}:{addr[1]})", addr)
-        broadcast_message(sock, f"[SERVER] {nickname} chatdan chiqdi.\n", exclude_sender=False)
+        nickname = client_info['nickname'] or 'Unknown'
         
+        # Avval ro'yxatdan o'chiramiz, aks holda broadcast yopilayotgan
+        # socketga yozishga urinib, qayta shu funksiyani chaqiradi
         sel.unregister(sock)
         sock.close()
         del clients[sock]
-        stats['active_clients'] = len(clients)
+        pending_flush.discard(sock)
+        cancel_timers(client_info)
+        if client_info['nickname'] is not None:
+            del nicknames[client_info['nickname']]
+        for room in client_info['rooms']:
+            remove_from_room(sock, room)
+        
+        log_message("DISCONNECT", f"Mijoz chiqdi: {nickname} ({addr[0]}:{addr[1]})", addr)
+        if bus is not None and client_info['nickname'] is not None:
+            bus.publish({'t': 'leave', 'id': client_info['id']})
+        for room in client_info['rooms']:
+            # Har xona o'z nomi bilan bitta xabar oladi: bir nechta umumiy xonadagi
+            # a'zo bir xil umumiy xabarni takror olmaydi, tarix ham xona bo'yicha
+            broadcast_message(sock, f"[SERVER] [#{room}] {nickname} chatdan chiqdi.\n", exclude_sender=False, room=room)
+
+
+def remove_from_room(sock, room):
+    """Mijozni xona indeksidan olib tashlash (bo'sh xona o'chiriladi)"""
+    members = rooms.get(room)
+    if members is not None:
+        members.discard(sock)
+        if not members:
+            del rooms[room]
+
+
+def reply_client(sock, text):
+    """Mijozga shaxsiy javob (tashlab yuborilmaydi)"""
+    if not queue_send(sock, encode_line(text), droppable=False):
+        handle_client_disconnect(sock)
+
+
+def join_room(sock, client_info, room):
+    """Mijozni xonaga qo'shish va uni joriy xona qilish"""
+    client_info['room'] = room
+    if room in client_info['rooms']:
+        return
+    client_info['rooms'].add(room)
+    rooms[room].add(sock)
+    if bus is not None:
+        bus.publish({'t': 'room_join', 'id': client_info['id'], 'room': room})
+    broadcast_message(sock, f"[SERVER] [#{room}] {client_info['nickname']} xonaga qo'shildi.\n", room=room)
+    replay_history(sock, room)
+
+
+def replay_history(sock, room):
+    """Xonaning oxirgi xabarlarini yangi a'zoga bitta bufer bilan yuborish"""
+    data = history_replay(history, room)
+    if not data:
+        return
+    if not queue_send(sock, data, droppable=False):
+        handle_client_disconnect(sock)
+        return
+    history_replays.inc()
+
+
+def flush_history():
+    """Segment faylni vaqti-vaqti bilan diskka tushirish (timer wheel orqali)"""
+    history.flush()
+    timers.schedule(HISTORY_FLUSH, flush_history)
+
+
+def leave_room(sock, client_info, room):
+    """Mijozni xonadan chiqarish"""
+    client_info['rooms'].discard(room)
+    remove_from_room(sock, room)
+    if client_info['room'] == room:
+        client_info['room'] = next(iter(client_info['rooms']), None)
+    if bus is not None:
+        bus.publish({'t': 'room_leave', 'id': client_info['id'], 'room': room})
+    broadcast_message(sock, f"[SERVER] [#{room}] {client_info['nickname']} xonadan chiqdi.\n", room=room)
+
+
+def list_clients(page):
+    """!list uchun bitta sahifa: avval shu workerdagi, keyin boshqa workerlardagi mijozlar"""
+    now = time.monotonic()
+    local = (client_entry(info, now) for info in clients.values())
+    remote = (
+        f"  - {info['nickname']} ({info['addr']}) [worker {w}]"
+        for (w, _), info in remote_clients.items()
+    )
+    return list_page(page, len(clients) + len(remote_clients), chain(local, remote))
+
+
+def room_counts():
+    """Xonalar va a'zolar soni (barcha workerlar bo'yicha)"""
+    counts = defaultdict(int, remote_room_counts)
+    for room, members in rooms.items():
+        counts[room] += len(members)
+    return counts
+
+
+def send_direct(sock, client_info, target, text):
+    """!msg - nickname indeksi orqali shaxsiy xabar"""
+    message = f"[{client_info['nickname']} -> siz]: {text}\n"
+    target_sock = nicknames.get(target)
+    if target_sock is not None:
+        if not queue_send(target_sock, message.encode('utf-8')):
+            handle_client_disconnect(target_sock)
+    elif bus is not None and target in remote_nicknames:
+        w, _ = remote_nicknames[target]
+        bus.send_to(w, {'t': 'direct', 'nickname': target, 'text': message})
+    else:
+        reply_client(sock, f"[SERVER] {target} topilmadi.")
+        return
+    log_message("DIRECT", f"{client_info['nickname']} -> {target}: {text}", client_info['addr'])
+    total_messages.inc()
 
 
 def handle_client_command(sock, command, client_info):
     """Maxsus buyruqlarni boshqarish"""
-    command = command.strip().lower()
+    parts = command.strip().split(maxsplit=2)
+    verb = parts[0].lower()
     
-    if command == "!exit":
+    if verb == "!exit":
         handle_client_disconnect(sock)
         return True
-    elif command == "!list":
-        client_list = []
-        for s, info in clients.items():
-            nickname = info.get('nickname', 'Unknown')
-            addr = info['addr']
-            client_list.append(f"  - {nickname} ({addr[0]}:{addr[1]})")
-        
-        response = "[SERVER] Ulangan mijozlar:\n" + "\n".join(client_list) + "\n"
-        try:
-            sock.sendall(response.encode('utf-8'))
-        except (ConnectionError, OSError):
+    elif verb == "!list":
+        page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+        if not queue_send(sock, list_clients(page).encode('utf-8'), droppable=False):
             handle_client_disconnect(sock)
-            return True
+        return True
+    elif verb == "!join":
+        room = parts[1].lstrip('#') if len(parts) > 1 else ""
+        if not valid_name(room):
+            reply_client(sock, "[SERVER] Foydalanish: !join <xona>")
+        else:
+            join_room(sock, client_info, room)
+            reply_client(sock, f"[SERVER] Joriy xona: #{room}")
+        return True
+    elif verb == "!leave":
+        room = parts[1].lstrip('#') if len(parts) > 1 else client_info['room']
+        if room not in client_info['rooms']:
+            reply_client(sock, "[SERVER] Siz bu xonada emassiz.")
+        else:
+            leave_room(sock, client_info, room)
+            current = f"#{client_info['room']}" if client_info['room'] else "yo'q (!join <xona>)"
+            reply_client(sock, f"[SERVER] #{room} dan chiqdingiz. Joriy xona: {current}")
+        return True
+    elif verb == "!stats":
+        reply_client(sock, f"[SERVER] {fanout_summary()}")
+        return True
+    elif verb == "!rooms":
+        lines = [
+            f"  {'*' if room == client_info['room'] else ' '} #{room} ({count})"
+            for room, count in sorted(room_counts().items()) if count > 0
+        ]
+        response = "[SERVER] Xonalar:\n" + "\n".join(lines) + "\n"
+        if not queue_send(sock, response.encode('utf-8'), droppable=False):
+            handle_client_disconnect(sock)
+        return True
+    elif verb == "!msg":
+        if len(parts) < 3:
+            reply_client(sock, "[SERVER] Foydalanish: !msg <ism> <xabar>")
+        else:
+            send_direct(sock, client_info, parts[1], parts[2])
         return True
     
     return False
 
 
+def handle_client_io(sock, mask):
+    """Chat mijozi socketidagi hodisalar"""
+    if mask & selectors.EVENT_WRITE:
+        flush_client(sock)
+    if mask & selectors.EVENT_READ and sock in clients:
+        read_client(sock)
+
+
 def read_client(sock):
-    """Mijozdan xabar o'qish"""
+    """Mijozdan kelgan to'liq xabarlarni o'qish"""
+    client_info = clients[sock]
     try:
-        data = sock.recv(4096)
-        if not data:
-            handle_client_disconnect(sock)
+        lines = client_info['reader'].read_from(sock)
+    except BlockingIOError:
+        return
+    except (ConnectionError, OSError, ValueError) as e:
+        log_message("ERROR", f"Mijozdan o'qishda xato: {e}", client_info['addr'])
+        handle_client_disconnect(sock)
+        return
+    
+    if lines is None:
+        handle_client_disconnect(sock)
+        return
+    client_info['last_active'] = time.monotonic()
+    
+    for line in lines:
+        # !exit yoki yozishdagi xato mijozni o'chirgan bo'lishi mumkin
+        if sock not in clients:
+            return
+        handle_line(sock, client_info, decode_line(line).strip())
+
+
+def handle_line(sock, client_info, message):
+    """Bitta xabarni qayta ishlash"""
+    if not message:
+        return
+    addr = client_info['addr']
+    
+    # Birinchi xabar - mijozning ismi
+    if client_info['nickname'] is None:
+        nickname = message
+        if not valid_name(nickname):
+            reply_client(sock, f"[SERVER] Ism {MAX_NAME} belgigacha harf/raqamdan iborat bo'lsin. Ismingizni kiriting:")
+            return
+        if nickname in nicknames or nickname in remote_nicknames:
+            reply_client(sock, "[SERVER] Bu ism band. Boshqa ism kiriting:")
+            return
+        client_info['nickname'] = nickname
+        nicknames[nickname] = sock
+        log_message("REGISTER", f"{addr[0]}:{addr[1]} ismi: {nickname}", addr)
+        if bus is not None:
+            bus.publish(client_announcement(client_info))
+        reply_client(sock, f"[SERVER] Xush kelibsiz, {nickname}! Buyruqlar: !join, !leave, !rooms, !msg, !list")
+        join_room(sock, client_info, DEFAULT_ROOM)
+        return
+    
+    nickname = client_info['nickname']
+    message_size.observe(len(message))
+    
+    # Maxsus buyruqlarni tekshirish
+    if message.startswith('!'):
+        if handle_client_command(sock, message, client_info):
+            return
+    
+    room = client_info['room']
+    if room is None:
+        reply_client(sock, "[SERVER] Siz hech qaysi xonada emassiz. !join <xona>")
+        return
+    
+    # Oddiy xabar - faqat joriy xona a'zolariga
+    prefix = "" if room == DEFAULT_ROOM else f"[#{room}] "
+    formatted_message = f"{prefix}[{nickname}]: {message}\n"
+    log_message("MESSAGE", f"#{room} {nickname}: {message}", addr)
+    broadcast_message(sock, formatted_message, room=room, record=True)
+    total_messages.inc()
+
+
+def accept_client(sock, mask):
+    """Yangi mijozlarni qabul qilish (bir tayyorlikda ACCEPT_BATCH tagacha)"""
+    for _ in range(ACCEPT_BATCH):
+        try:
+            conn, addr = sock.accept()
+        except BlockingIOError:
+            return
+        except (OSError, ConnectionError) as e:
+            log_message("ERROR", f"Yangi mijozni qabul qilishda xato: {e}")
             return
         
-        message = data.decode('utf-8', errors='ignore').strip()
-        client_info = clients[sock]
-        addr = client_info['addr']
-        nickname = client_info.get('nickname', f"Client-{addr[1]}")
-        
-        # Maxsus buyruqlarni tekshirish
-        if message.startswith('!'):
-            if handle_client_command(sock, message, client_info):
-                return
-        
-        # Oddiy xabar
-        formatted_message = f"[{nickname}]: {message}\n"
-        log_message("MESSAGE", f"{nickname}: {message}", addr)
-        broadcast_message(sock, formatted_message)
-        stats['total_messages'] += 1
-        
-    except (ConnectionError, OSError, UnicodeDecodeError) as e:
-        handle_client_disconnect(sock)
+        try:
+            conn.setblocking(False)
+            
+            # Mijozni ro'yxatga qo'shish
+            clients[conn] = {
+                'id': next(client_ids),
+                'addr': addr,
+                'nickname': None,
+                'reader': LineReader(recv_buffer),
+                'rooms': set(),
+                'room': None,
+                'outq': deque(),
+                'outbytes': 0,
+                'paused': False,
+                'dropped': 0,
+                'blocked_since': None,
+                'slow_since': None,
+                'last_active': time.monotonic(),
+                'idle_timer': None,
+                'slow_timer': None,
+                'sock': conn,
+            }
+            start_idle_timer(clients[conn])
+            sel.register(conn, selectors.EVENT_READ, handle_client_io)
+            
+            # Nickname so'rash - birinchi xabar ism sifatida qabul qilinadi,
+            # boshqalarga esa ism kiritilgach xabar beriladi
+            queue_send(conn, encode_line("[SERVER] Ismingizni kiriting:"), droppable=False)
+            log_message("CONNECT", f"Yangi mijoz ulanmoqda: {addr[0]}:{addr[1]}", addr)
+            
+        except (OSError, ConnectionError) as e:
+            log_message("ERROR", f"Yangi mijozni qabul qilishda xato: {e}")
+            if conn in clients:
+                handle_client_disconnect(conn)
+            else:
+                conn.close()
+
+
+def close_upload(sock, response=None):
+    """Upload ulanishini yopish (kerak bo'lsa oxirgi javob bilan)"""
+    upload = uploads.pop(sock, None)
+    if upload and upload.get('partial'):
+        release_partial(upload['partial'])
+    if response:
+        try:
+            sock.send(response.encode('utf-8'))
+        except OSError:
+            pass
+    sel.unregister(sock)
+    sock.close()
+
+
+def abort_upload(sock, upload, response=None):
+    """Yarim yozilgan faylni o'chirib, ulanishni yopish.
+    
+    Bo'laklab yuklashda tasdiqlangan bo'laklar saqlanib qoladi, shuning
+    uchun mijoz keyin davom ettira oladi.
+    """
+    if upload.get('file'):
+        upload['file'].close()
+        upload['file'] = None
+        os.remove(upload['path'])
+    close_upload(sock, response)
+
+
+def send_reply(sock, text):
+    """Ochiq qoladigan upload ulanishiga bir qatorli javob"""
+    sock.send(encode_line(text))
+
 
+def write_all(f, view):
+    """Unbuffered faylga memoryview ni to'liq yozish"""
+    while view:
+        written = f.write(view)
+        view = view[written:]
 
-def accept_client(sock):
-    """Yangi mijozni qabul qilish"""
+
+def start_upload(sock, upload, fields, digest=None, codec=None):
+    """Oddiy upload: `filename|size|addr` (yoki PUT) sarlavhasidan keyin butun fayl.
+    
+    Ma'lumot vaqtinchalik faylga yoziladi va shu zahoti xeshlanadi,
+    oxirida blob omboriga o'tkaziladi. PUT da mijoz aytgan `digest`
+    hisoblangan xesh bilan solishtiriladi. `codec` ((nom, daraja)) berilsa
+    fayl siqilgan oqim sifatida keladi va kelishi bilan ochiladi.
+    """
+    filename, file_size, client_addr = parse_upload(fields)
+    path, f = store.temp_file()
+    
+    upload.update({
+        'state': 'body',
+        'file': f,
+        'path': path,
+        'name': filename,
+        'size': file_size,
+        'received': 0,
+        'client_addr': client_addr,
+        'started': time.perf_counter(),
+        'hash': hashlib.sha256(),
+        'expected': digest,
+    })
+    note = ""
+    if codec is not None:
+        upload.update({
+            'state': 'zbody',
+            'decoder': StreamDecoder(codec[0]),
+            'codec': f"{codec[0]}:{codec[1]}",
+            'wire': 0,
+            'cpu': 0.0,
+        })
+        note = f", {upload['codec']}"
+    log_message("FILE_UPLOAD", f"Fayl qabul qilinmoqda: {filename} ({file_size} bytes{note})", client_addr)
+
+
+def finish_upload(sock, upload):
+    """Upload tugaganda (yoki ulanish uzilganda) natijani yuborish"""
+    upload['file'].close()
+    upload['file'] = None
+    
+    decoder = upload.get('decoder')
+    if upload['received'] != upload['size'] or (decoder and not decoder.eof):
+        os.remove(upload['path'])
+        log_message("FILE_ERROR", f"Fayl to'liq yuklanmadi: {upload['name']}", upload['client_addr'])
+        close_upload(sock, "ERROR: Fayl to'liq yuklanmadi\n")
+        return
+    
+    digest = upload['hash'].hexdigest()
+    if upload['expected'] and digest != upload['expected']:
+        os.remove(upload['path'])
+        log_message("FILE_ERROR", f"{upload['name']}: fayl xeshi mos emas", upload['client_addr'])
+        close_upload(sock, "ERROR: Fayl xeshi mos emas\n")
+        return
+    if decoder:
+        observe_compression(upload['name'], upload['codec'], upload['size'], upload['wire'], upload['cpu'], upload['client_addr'])
+    save_blob(sock, upload['path'], digest, upload['name'], upload['size'], upload['client_addr'], upload['started'])
+
+
+def save_blob(sock, temp_path, digest, name, size, client_addr, started):
+    """Qabul qilingan faylni blob omboriga o'tkazish va javob yuborish.
+    
+    Mijoz ulanishi yopilgan bo'lsa (sock=None) fayl baribir saqlanadi.
+    """
+    filepath = commit_blob(store, temp_path, digest, name, size, client_addr, started)
+    if sock is not None:
+        close_upload(sock, f"SUCCESS: Fayl saqlandi: {filepath}\n")
+
+
+def reply_have(sock, filename, size, digest, client_addr):
+    """Mazmun serverda bor: nomni mavjud blobga bog'lab, HAVE javobi bilan yopish"""
+    link_blob(store, filename, size, digest, client_addr)
+    close_upload(sock, f"HAVE|{digest}\n")
+
+
+def start_chunk(sock, upload, fields):
+    """`CHUNK|upload_id|index|length|sha256` - bitta bo'lakni qabul qilish"""
+    upload_id, index_str, length_str, digest = fields
+    if upload.get('partial') != upload_id:
+        raise ValueError("Avval INIT yuborilishi kerak")
+    partial = active_partial(upload_id)
+    
+    index = int(index_str)
+    length = int(length_str)
+    offset = chunk_offset(partial, index, length)
+    
+    upload.update({
+        'state': 'chunk',
+        'index': index,
+        'offset': offset,
+        'remaining': length,
+        'digest': digest.lower(),
+        'hash': hashlib.sha256(),
+    })
+
+
+def finish_chunk(sock, upload):
+    """Bo'lak xeshini tekshirish va natijani yuborish"""
+    partial = active_partial(upload['partial'])
+    index = upload['index']
+    upload['state'] = 'header'
+    if upload.pop('hash').hexdigest() != upload['digest']:
+        log_message("FILE_ERROR", f"{partial['name']}: {index}-bo'lak xeshi mos emas", partial['client_addr'])
+        send_reply(sock, f"BAD|{index}")
+        return
+    
+    chunk_done(partial, index)
+    send_reply(sock, f"OK|{index}")
+
+
+def commit_partial(sock, upload, upload_id):
+    """Barcha bo'laklar kelgan bo'lsa to'liq fayl xeshini fon threadda hisoblashni boshlash"""
+    if upload.get('partial') != upload_id:
+        raise ValueError("Avval INIT yuborilishi kerak")
+    partial = active_partial(upload_id)
+    
+    missing = missing_chunks(partial)
+    if missing:
+        send_reply(sock, "MISSING|" + ",".join(map(str, missing)))
+        return
+    
+    close_partial(upload_id)
+    # Ulanishning havolasi xeshlash ishiga o'tadi: mijoz uzilsa ham fd
+    # finish_commit() dagi release_partial() gacha ochiq qoladi
+    upload['partial'] = None
+    # Javob xesh tayyor bo'lganda finish_commit() da yuboriladi
+    upload['state'] = 'commit'
+    future = hash_pool.submit(hash_partial, partial)
+    future.add_done_callback(lambda f: hash_finished((sock, upload, partial, f)))
+
+
+def hash_finished(item):
+    """Fon threadda: natijani navbatga qo'yib, event loop'ni uyg'otish"""
+    hash_done.put(item)
     try:
-        conn, addr = sock.accept()
-        conn.setblocking(False)
-        
-        # Nickname so'rash
-        conn.sendall(b"[SERVER] Ismingizni kiriting: ")
-        
-        # Mijozni ro'yxatga qo'shish
-        clients[conn] = {'addr': addr, 'nickname': None}
-        stats['active_clients'] = len(clients)
-        
-        sel.register(conn, selectors.EVENT_READ, read_client)
-        log_message("CONNECT", f"Yangi mijoz ulanmoqda: {addr[0]}:{addr[1]}", addr)
-        
-        # Boshqa mijozlarga xabar berish
-        broadcast_message(conn, f"[SERVER] Yangi mijoz chatga qo'shildi.\n", exclude_sender=False)
-        
-    except (OSError, ConnectionError) as e:
-        log_message("ERROR", f"Yangi mijozni qabul qilishda xato: {e}")
+        wakeup_send.send(b"\0")
+    except OSError:
+        pass  # bufer to'la - loop baribir uyg'onadi
 
 
-def handle_file_upload(sock):
-    """Fayl yuborishni qabul qilish"""
+def handle_hash_done(sock, mask):
+    """Xeshi tayyor bo'lgan bo'laklab yuklashlarni yakunlash"""
     try:
-        # Fayl nomi va hajmini olish
-        header = sock.recv(1024).decode('utf-8', errors='ignore')
-        if not header:
-            file_sel.unregister(sock)
-            sock.close()
+        while sock.recv(4096):
+            pass
+    except BlockingIOError:
+        pass
+    while True:
+        try:
+            upload_sock, upload, partial, future = hash_done.get_nowait()
+        except queue.Empty:
             return
-        
-        parts = header.split('|')
-        if len(parts) != 3:
-            sock.sendall(b"ERROR: Invalid file header")
-            file_sel.unregister(sock)
-            sock.close()
+        finish_commit(upload_sock, upload, partial, future)
+
+
+def finish_commit(upload_sock, upload, partial, future):
+    """Bo'laklab yuklangan faylni tekshirib, blob omboriga o'tkazish"""
+    # Mijoz kutmasdan uzilgan bo'lsa ham fayl saqlanadi
+    sock = upload_sock if uploads.get(upload_sock) is upload else None
+    journal_path = partial['journal'].name
+    release_partial(partial['id'])
+    try:
+        digest = future.result()
+    except OSError as e:
+        log_message("FILE_ERROR", f"{partial['name']}: xeshlashda xato: {e}", partial['client_addr'])
+        if sock is not None:
+            close_upload(sock, f"ERROR: {e}\n")
+        return
+    
+    if partial['sha256'] and digest != partial['sha256']:
+        os.remove(partial['path'])
+        os.remove(journal_path)
+        log_message("FILE_ERROR", f"{partial['name']}: fayl xeshi mos emas", partial['client_addr'])
+        if sock is not None:
+            close_upload(sock, "ERROR: Fayl xeshi mos emas\n")
+        return
+    save_blob(sock, partial['path'], digest, partial['name'], partial['size'], partial['client_addr'], partial['started'])
+    os.remove(journal_path)
+
+
+def handle_upload_command(sock, upload, line):
+    """Sarlavha qatorini bajarish.
+    
+    Oddiy rejim:     filename|size|addr           (bitta fayl, so'ng ulanish yopiladi)
+    Dedup rejim:     PUT|filename|size|addr|sha256[|kodek:daraja]
+                                                   -> HAVE|sha256 (yopiladi) yoki READY,
+                     so'ng butun fayl (kodek bo'lsa siqilgan oqim) -> SUCCESS: ...
+    Bo'laklab rejim: INIT|id|filename|size|chunk_size|addr[|sha256]
+                                                   -> OK|tayyor bo'laklar yoki HAVE|sha256
+                     CHUNK|id|index|length|sha256 + ma'lumot -> OK|index yoki BAD|index
+                     COMMIT|id                     -> SUCCESS: ... yoki MISSING|bo'laklar
+    """
+    text = line.decode('utf-8', errors='ignore').strip()
+    fields = text.split('|')
+    command = fields[0]
+    
+    if command == "CHUNK" and len(fields) == 5:
+        start_chunk(sock, upload, fields[1:])
+    elif command == "PUT" and len(fields) >= 5:
+        put_fields, digest, codec = parse_put(text)
+        if upload.get('partial'):
+            raise ValueError("Invalid file header")
+        filename, size, client_addr = put_fields
+        if store.has(digest):
+            reply_have(sock, filename, int(size), digest, client_addr)
+        else:
+            start_upload(sock, upload, put_fields, digest, codec)
+            send_reply(sock, "READY")
+    elif command == "INIT" and len(fields) in (6, 7):
+        if upload.get('partial'):
+            raise ValueError("INIT allaqachon yuborilgan")
+        upload_id, filename, size, chunk_size, client_addr, digest = parse_init(fields)
+        if digest is not None and store.has(digest):
+            reply_have(sock, filename, size, digest, client_addr)
             return
+        partial = open_partial(upload_id, filename, size, chunk_size, client_addr, digest)
+        upload['partial'] = upload_id
+        upload['client_addr'] = client_addr
+        send_reply(sock, "OK|" + ",".join(map(str, sorted(partial['done']))))
+    elif command == "COMMIT" and len(fields) == 2:
+        commit_partial(sock, upload, fields[1])
+    else:
+        # Oddiy rejim (fayl nomida '|' bo'lishi mumkin)
+        fields = line.decode('utf-8', errors='ignore').strip().rsplit('|', 2)
+        if len(fields) != 3 or upload.get('partial'):
+            raise ValueError("Invalid file header")
+        start_upload(sock, upload, fields)
+
+
+def feed_upload(sock, upload, data):
+    """O'qilgan baytlarni state machine orqali o'tkazish.
+    
+    Ulanish ochiq qolsa True, yopilgan bo'lsa False qaytaradi.
+    """
+    while True:
+        state = upload['state']
+        if state == 'header':
+            if not data:
+                return True
+            header = upload['header']
+            start = len(header)
+            header += data
+            end = header.find(b"\n", start)
+            if end == -1:
+                if len(header) >= MAX_HEADER:
+                    raise ValueError("Invalid file header")
+                return True
+            # Sarlavhadan keyin kelgan baytlar - keyingi qism boshlanishi
+            data = data[len(data) - (len(header) - end - 1):]
+            line = bytes(header[:end])
+            header.clear()
+            handle_upload_command(sock, upload, line)
+            if sock not in uploads:
+                return False
         
-        filename, file_size_str, client_addr = parts
-        file_size = int(file_size_str)
-        
-        # Xavfsizlik: faqat fayl nomini olish
-        filename = os.path.basename(filename)
-        filepath = os.path.join(UPLOADS_DIR, f"{int(time.time())}_{filename}")
-        
-        log_message("FILE_UPLOAD", f"Fayl qabul qilinmoqda: {filename} ({file_size} bytes)", client_addr)
-        
-        # Faylni qabul qilish
-        received = 0
-        with open(filepath, 'wb') as f:
-            while received < file_size:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                f.write(chunk)
-                received += len(chunk)
+        elif state == 'body':
+            n = min(len(data), upload['size'] - upload['received'])
+            if n:
+                chunk = data[:n]
+                write_all(upload['file'], chunk)
+                upload['hash'].update(chunk)
+                upload['received'] += n
+            if upload['received'] == upload['size']:
+                finish_upload(sock, upload)
+                return False
+            return True
         
-        if received == file_size:
-            sock.sendall(f"SUCCESS: Fayl saqlandi: {filepath}".encode('utf-8'))
-            log_message("FILE_SUCCESS", f"Fayl saqlandi: {filepath} ({file_size} bytes)", client_addr)
-            stats['total_files'] += 1
-        else:
-            sock.sendall(f"ERROR: Fayl to'liq yuklanmadi".encode('utf-8'))
-            os.remove(filepath)
-            log_message("FILE_ERROR", f"Fayl to'liq yuklanmadi: {filename}", client_addr)
+        elif state == 'zbody':
+            upload['wire'] += len(data)
+            decoder = upload['decoder']
+            for chunk in decompress(decoder, data, upload):
+                if upload['received'] + len(chunk) > upload['size']:
+                    raise ValueError("Ochilgan fayl e'lon qilingan hajmdan katta")
+                write_all(upload['file'], memoryview(chunk))
+                upload['hash'].update(chunk)
+                upload['received'] += len(chunk)
+            if decoder.eof:
+                finish_upload(sock, upload)
+                return False
+            return True
         
-        file_sel.unregister(sock)
-        sock.close()
+        elif state == 'commit':
+            if data:
+                raise ValueError("COMMIT javobi kutilmoqda")
+            return True
         
-    except (OSError, ValueError, ConnectionError) as e:
-        log_message("FILE_ERROR", f"Fayl yuklashda xato: {e}")
-        try:
-            file_sel.unregister(sock)
-            sock.close()
-        except:
-            pass
+        else:  # chunk
+            n = min(len(data), upload['remaining'])
+            if n:
+                chunk = data[:n]
+                pwrite_all(active_partial(upload['partial'])['fd'], chunk, upload['offset'])
+                upload['hash'].update(chunk)
+                upload['offset'] += n
+                upload['remaining'] -= n
+                data = data[n:]
+            if upload['remaining']:
+                return True
+            finish_chunk(sock, upload)
 
 
-def accept_file_client(sock):
-    """Fayl yuborish uchun yangi mijozni qabul qilish"""
+def handle_file_upload(sock, mask):
+    """Fayl yuborishni qabul qilish.
+    
+    Har bir ulanish kichik state machine (qarang: handle_upload_command).
+    Socket o'qishga tayyor bo'lganda ko'pi bilan UPLOAD_READS_PER_EVENT
+    marta recv_into qilinadi, qolgani keyingi tayyorlikda davom etadi.
+    """
+    upload = uploads[sock]
     try:
-        conn, addr = sock.accept()
-        conn.setblocking(False)
-        file_sel.register(conn, selectors.EVENT_READ, handle_file_upload)
-        log_message("FILE_CONNECT", f"Fayl yuborish ulanishi: {addr[0]}:{addr[1]}", addr)
+        for _ in range(UPLOAD_READS_PER_EVENT):
+            state = upload['state']
+            if state == 'body':
+                size = min(UPLOAD_CHUNK, upload['size'] - upload['received'])
+            elif state == 'chunk':
+                size = min(UPLOAD_CHUNK, upload['remaining'])
+            elif state == 'zbody':
+                size = UPLOAD_CHUNK
+            else:
+                size = MAX_HEADER
+            n = sock.recv_into(upload_buffer, size)
+            
+            if n == 0:
+                if upload['state'] in ('body', 'zbody'):
+                    finish_upload(sock, upload)
+                else:
+                    abort_upload(sock, upload)
+                return
+            
+            upload_bytes.inc(n)
+            if not feed_upload(sock, upload, upload_view[:n]):
+                return
+    
+    except BlockingIOError:
+        return
+    except ValueError as e:
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: {e}", upload.get('client_addr'))
+        abort_upload(sock, upload, f"ERROR: {e}\n")
+    except KeyError as e:
+        # Ulanish holati buzilgan - faqat shu ulanish yopiladi, loop ishlashda davom etadi
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: noma'lum holat {e}", upload.get('client_addr'))
+        abort_upload(sock, upload, "ERROR: Upload holati topilmadi\n")
     except (OSError, ConnectionError) as e:
-        log_message("ERROR", f"Fayl mijozini qabul qilishda xato: {e}")
+        log_message("FILE_ERROR", f"Fayl yuklashda xato: {e}", upload.get('client_addr'))
+        abort_upload(sock, upload)
+
+
+def accept_file_client(sock, mask):
+    """Fayl yuborish uchun yangi mijozlarni qabul qilish"""
+    for _ in range(ACCEPT_BATCH):
+        try:
+            conn, addr = sock.accept()
+            conn.setblocking(False)
+            uploads[conn] = {'addr': addr, 'state': 'header', 'header': bytearray(), 'file': None}
+            sel.register(conn, selectors.EVENT_READ, handle_file_upload)
+            log_message("FILE_CONNECT", f"Fayl yuborish ulanishi: {addr[0]}:{addr[1]}", addr)
+        except BlockingIOError:
+            return
+        except (OSError, ConnectionError) as e:
+            log_message("ERROR", f"Fayl mijozini qabul qilishda xato: {e}")
+            return
+
+
+def client_announcement(client_info):
+    """Boshqa workerlarga yuboriladigan 'join' hodisasi"""
+    addr = client_info['addr']
+    return {
+        't': 'join',
+        'id': client_info['id'],
+        'nickname': client_info['nickname'],
+        'addr': f"{addr[0]}:{addr[1]}",
+        'rooms': sorted(client_info['rooms']),
+    }
+
+
+def handle_bus(bus_obj, mask):
+    """Boshqa workerlardan kelgan hodisalarni bajarish"""
+    for event in bus_obj.receive():
+        kind = event.get('t')
+        sender = event.get('w')
+        key = (sender, event.get('id'))
+        if kind == 'broadcast':
+            deliver_local(None, event['text'], exclude_sender=False, room=event.get('room'), record=event.get('record', False))
+        elif kind == 'direct':
+            target_sock = nicknames.get(event['nickname'])
+            if target_sock is not None and not queue_send(target_sock, event['text'].encode('utf-8')):
+                handle_client_disconnect(target_sock)
+        elif kind == 'join':
+            info = {'nickname': event['nickname'], 'addr': event['addr'], 'rooms': set(event['rooms'])}
+            remote_clients[key] = info
+            remote_nicknames[info['nickname']] = key
+            for room in info['rooms']:
+                remote_room_counts[room] += 1
+        elif kind == 'leave':
+            forget_remote(key)
+        elif kind == 'room_join':
+            info = remote_clients.get(key)
+            if info is not None and event['room'] not in info['rooms']:
+                info['rooms'].add(event['room'])
+                remote_room_counts[event['room']] += 1
+        elif kind == 'room_leave':
+            info = remote_clients.get(key)
+            if info is not None and event['room'] in info['rooms']:
+                info['rooms'].discard(event['room'])
+                remote_room_counts[event['room']] -= 1
+        elif kind == 'bye':
+            forget_worker(sender)
+        elif kind == 'hello':
+            # Qayta ishga tushgan workerning eski mijozlari endi yo'q;
+            # yangi ishga tushgan workerga o'z mijozlarimizni e'lon qilish
+            forget_worker(sender)
+            for info in clients.values():
+                if info['nickname'] is not None:
+                    bus_obj.send_to(sender, client_announcement(info))
+
+
+def forget_remote(key):
+    """Boshqa workerdagi mijozni ro'yxatlardan o'chirish"""
+    info = remote_clients.pop(key, None)
+    if info is not None:
+        remote_nicknames.pop(info['nickname'], None)
+        for room in info['rooms']:
+            remote_room_counts[room] -= 1
+
+
+def forget_worker(worker):
+    """O'lgan, to'xtagan yoki qayta ishga tushgan workerning barcha mijozlarini unutish"""
+    keys = [key for key in remote_clients if key[0] == worker]
+    for key in keys:
+        forget_remote(key)
+    if keys:
+        log_message("BUS", f"[worker {worker_id}] worker {worker} ning {len(keys)} ta mijozi ro'yxatdan o'chirildi")
+
+
+def fanout_summary():
+    """Encode-once va coalescing hisoblagichlari"""
+    return (
+        f"Fan-out: {broadcast_encodes.value} encode -> {broadcast_deliveries.value} yetkazish, "
+        f"{sent_buffers.value} bufer -> {send_calls.value} sendmsg, "
+        f"{bytes_sent.value} bayt, tashlangan: {dropped_messages.value}"
+    )
 
 
 def print_stats():
-    """Statistikalarni chiqarish"""
-    uptime = int(time.time() - stats['start_time'])
+    """Yakuniy statistikalarni chiqarish (server to'xtaganda).
+    
+    Ish paytidagi qiymatlar /metrics endpointidan olinadi.
+    """
+    uptime = int(time.time() - start_time)
     uptime_str = f"{uptime // 60}min {uptime % 60}sec"
     
+    bus_line = f"Bus: {bus.sent} yuborilgan, {bus.dropped} tashlangan\n" if bus else ""
     stats_msg = (
-        f"\n=== STATISTIKALAR ===\n"
-        f"Faol mijozlar: {stats['active_clients']}\n"
-        f"Jami xabarlar: {stats['total_messages']}\n"
-        f"Jami fayllar: {stats['total_files']}\n"
+        f"\n=== STATISTIKALAR (worker {worker_id}) ===\n"
+        f"Faol mijozlar: {len(clients)}\n"
+        f"Boshqa workerlardagi mijozlar: {len(remote_clients)}\n"
+        f"{bus_line}"
+        f"Jami xabarlar: {total_messages.value}\n"
+        f"Jami fayllar: {total_files.value}\n"
+        f"{fanout_summary()}\n"
+        f"{compression_summary()}"
         f"Server vaqti: {uptime_str}\n"
+        f"Log navbati: {log_writer.depth()} (tashlangan: {log_writer.dropped})\n"
         f"====================\n"
     )
     print(stats_msg)
     log_message("STATS", stats_msg.strip())
 
 
-def stats_thread():
-    """Statistikalarni har 10 soniyada chiqarish"""
-    while True:
-        time.sleep(STATS_INTERVAL)
-        print_stats()
+def parse_args():
+    """Buyruq qatori parametrlari"""
+    parser = argparse.ArgumentParser(description="Multi-client chat server")
+    parser.add_argument("--high-watermark", type=int, default=server_core.HIGH_WATERMARK,
+                        help="mijoz navbati shu baytdan oshsa broadcast to'xtatiladi")
+    parser.add_argument("--low-watermark", type=int, default=server_core.LOW_WATERMARK,
+                        help="navbat shu baytgacha bo'shagach broadcast tiklanadi")
+    parser.add_argument("--slow-policy", choices=SLOW_POLICIES, default=server_core.SLOW_POLICY,
+                        help="navbat --high-watermark dan oshganda: drop_newest, drop_oldest yoki disconnect")
+    parser.add_argument("--slow-timeout", type=float, default=server_core.SLOW_TIMEOUT,
+                        help="disconnect siyosatida navbat shuncha soniya bo'shamasa mijoz uziladi")
+    parser.add_argument("--max-queue", type=int, default=server_core.MAX_QUEUE,
+                        help="mijoz navbatining qat'iy chegarasi (bayt), oshsa mijoz uziladi")
+    parser.add_argument("--idle-timeout", type=float, default=server_core.IDLE_TIMEOUT,
+                        help="shuncha soniya faolsiz mijoz uziladi (0 - o'chirilgan)")
+    parser.add_argument("--history-replay", type=int, default=server_core.HISTORY_REPLAY,
+                        help="xonaga qo'shilganda yuboriladigan oxirgi xabarlar soni (0 - o'chirilgan)")
+    parser.add_argument("--history-dir", default=HISTORY_DIR,
+                        help="tarix segment fayllari papkasi (berilmasa tarix faqat xotirada)")
+    parser.add_argument("--log-queue", type=int, default=LOG_QUEUE_SIZE,
+                        help="log navbatining maksimal hajmi (yozuvlar)")
+    parser.add_argument("--log-policy", choices=POLICIES, default=LOG_POLICY,
+                        help="log navbati to'lganda: drop - tashlash, block - kutish")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="SO_REUSEPORT bilan bitta portni bo'lishadigan worker jarayonlar soni")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="metrikalar HTTP porti (worker N uchun +N, 0 - o'chirilgan)")
+    parser.add_argument("--backend", choices=("selectors", "asyncio", "uvloop"), default="selectors",
+                        help="event loop: selectors (shu fayl), asyncio yoki uvloop (aio_server.py)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers kamida 1 bo'lishi kerak")
+    if args.backend != "selectors" and args.workers > 1:
+        parser.error("--workers faqat selectors backendida ishlaydi")
+    if args.low_watermark >= args.high_watermark:
+        parser.error("--low-watermark --high-watermark dan kichik bo'lishi kerak")
+    if args.max_queue <= args.high_watermark:
+        parser.error("--max-queue --high-watermark dan katta bo'lishi kerak")
+    return args
 
 
-def main():
-    """Asosiy server funksiyasi"""
+def create_listener(port, reuse_port=False):
+    """Non-blocking tinglovchi socket yaratish"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listener.bind((HOST, port))
+    listener.listen()
+    listener.setblocking(False)
+    return listener
+
+
+def raise_keyboard_interrupt(signum, frame):
+    """SIGTERM ni KeyboardInterrupt kabi to'xtatish uchun"""
+    raise KeyboardInterrupt
+
+
+def serve(args, bus_dir=None):
+    """Bitta jarayondagi server (yoki ko'p jarayonli rejimdagi bitta worker).
+    
+    Ko'p jarayonli rejimda chat porti barcha workerlarda SO_REUSEPORT bilan
+    ochiladi va kernel yangi ulanishlarni ular orasida taqsimlaydi. Fayl
+    porti faqat 0-workerda ochiladi, chunki bo'laklab yuklash holati
+    (partials) jarayon xotirasida saqlanadi.
+    """
+    global log_writer, bus, history, store, wakeup_send
+    configure(args, disconnect_slow, close_idle)
+    register_gauges()
+    log_writer = start_log(args.log_queue, args.log_policy)
+    multi = bus_dir is not None
+    
+    # Xonalar tarixi: barcha workerlar segmentni o'qiydi, faqat 0-worker yozadi
+    history = HistoryStore(args.history_dir, writable=worker_id == 0)
+    if history.file is not None:
+        timers.schedule(HISTORY_FLUSH, flush_history)
+    
     # Chat server
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server.bind((HOST, PORT))
-    server.listen()
-    server.setblocking(False)
+    server = create_listener(PORT, reuse_port=multi)
     sel.register(server, selectors.EVENT_READ, accept_client)
     
     # Fayl server
-    file_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    file_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    file_server.bind((HOST, FILE_PORT))
-    file_server.listen()
-    file_server.setblocking(False)
-    file_sel.register(file_server, selectors.EVENT_READ, accept_file_client)
-    
-    log_message("START", f"Chat server {HOST}:{PORT} da ishga tushdi")
-    log_message("START", f"Fayl server {HOST}:{FILE_PORT} da ishga tushdi")
-    print(f"Chat server {HOST}:{PORT} da ishlayapti...")
-    print(f"Fayl server {HOST}:{FILE_PORT} da ishlayapti...")
-    print("Statistikalar har 10 soniyada chiqadi.\n")
-    
-    # Statistikalar threadini ishga tushirish
-    stats_thread_obj = threading.Thread(target=stats_thread, daemon=True)
-    stats_thread_obj.start()
-    
-    # Asosiy loop
+    file_server = None
+    if worker_id == 0:
+        file_server = create_listener(FILE_PORT)
+        sel.register(file_server, selectors.EVENT_READ, accept_file_client)
+        store = BlobStore(UPLOADS_DIR)
+        wakeup_recv, wakeup_send = socket.socketpair()
+        wakeup_recv.setblocking(False)
+        wakeup_send.setblocking(False)
+        sel.register(wakeup_recv, selectors.EVENT_READ, handle_hash_done)
+    
+    # Workerlar orasidagi bus
+    if multi:
+        bus = Bus(bus_dir, worker_id, args.workers)
+        sel.register(bus, selectors.EVENT_READ, handle_bus)
+        bus.publish({'t': 'hello'})
+        signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+    
+    prefix = f"[worker {worker_id}] " if multi else ""
+    log_message("START", f"{prefix}Chat server {HOST}:{PORT} da ishga tushdi")
+    print(f"{prefix}Chat server {HOST}:{PORT} da ishlayapti...")
+    if file_server:
+        log_message("START", f"{prefix}Fayl server {HOST}:{FILE_PORT} da ishga tushdi")
+        print(f"{prefix}Fayl server {HOST}:{FILE_PORT} da ishlayapti...")
+    if history.loaded:
+        log_message("START", f"{prefix}Tarix tiklandi: {history.loaded} ta xabar ({args.history_dir})")
+    
+    # Metrikalar endpointi (alohida threadda, event loop'ni kutdirmaydi)
+    metrics_server = None
+    if args.metrics_port:
+        registry.labels['worker'] = worker_id
+        metrics_port = args.metrics_port + worker_id
+        try:
+            metrics_server = start_http_server(registry, HOST, metrics_port)
+            print(f"{prefix}Metrikalar: http://{HOST}:{metrics_port}/metrics\n")
+        except OSError as e:
+            log_message("ERROR", f"{prefix}Metrikalar porti {metrics_port} band: {e}")
+    
+    # Asosiy loop: chat listener, chat mijozlar, fayl listener, upload
+    # ulanishlari va bus bitta selector orqali kuzatiladi. Har bir tick'da
+    # tayyor bo'lgan har bir socket bittadan callback oladi, shuning uchun
+    # hech bir port ikkinchisini kutib qolmaydi.
     try:
         while True:
-            # Chat server
-            events = sel.select(timeout=5)
-            if events:
-                for key, mask in events:
-                    callback = key.data
-                    callback(key.fileobj)
-            else:
-                # Timeout - hech narsa bo'lmadi
-                pass  # Statistikalar alohida threadda chiqadi
-            
-            # Fayl server
-            file_events = file_sel.select(timeout=0.1)
-            for key, mask in file_events:
+            events = sel.select(timeout=SELECT_TIMEOUT)
+            tick_start = time.perf_counter()
+            for key, mask in events:
+                # Shu tick ichida oldinroq yopilgan socketlarni o'tkazib yuborish
+                if key.fileobj.fileno() == -1:
+                    continue
                 callback = key.data
-                callback(key.fileobj)
+                callback(key.fileobj, mask)
+            
+            # Muddati o'tgan idle va sekin mijoz taymerlari
+            timers.advance()
+            
+            # Bus: navbatdagi boshqaruv hodisalarini qayta yuborish
+            if bus is not None:
+                for worker in bus.flush():
+                    forget_worker(worker)
+            
+            # Shu tick'da to'plangan barcha chiquvchi xabarlarni yuborish
+            flush_pending()
+            if events:
+                loop_lag.observe(time.perf_counter() - tick_start)
                 
     except KeyboardInterrupt:
-        log_message("SHUTDOWN", "Server to'xtatilmoqda...")
-        print("\nServer to'xtatilmoqda...")
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        log_message("SHUTDOWN", f"{prefix}Server to'xtatilmoqda...")
+        print(f"\n{prefix}Server to'xtatilmoqda...")
         
         # Barcha mijozlarni yopish
         for sock in list(clients.keys()):
@@ -316,11 +1251,85 @@ def main():
             except:
                 pass
         
+        # Tugallanmagan uploadlarni bekor qilish
+        for sock, upload in list(uploads.items()):
+            abort_upload(sock, upload)
+        
         server.close()
-        file_server.close()
+        if file_server:
+            file_server.close()
+            hash_pool.shutdown(cancel_futures=True)
+            store.close()
+        if bus:
+            bus.publish({'t': 'bye'})
+            bus.flush()
+            bus.close()
+        history.close()
+        if metrics_server:
+            metrics_server.shutdown()
         sel.close()
-        file_sel.close()
-        log_message("SHUTDOWN", "Server to'xtatildi")
+        print_stats()
+        log_message("SHUTDOWN", f"{prefix}Server to'xtatildi")
+        log_writer.close()
+
+
+def run_workers(args):
+    """N ta worker jarayonni fork qilish va ularni kuzatish"""
+    global worker_id, sel
+    bus_dir = tempfile.mkdtemp(prefix="chat-bus-")
+    children = []
+    for i in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            # Bola jarayon: ota jarayonning epoll obyektini bo'lishmaslik uchun
+            # yangi selector yaratiladi
+            worker_id = i
+            sel.close()
+            sel = selectors.DefaultSelector()
+            try:
+                serve(args, bus_dir)
+            finally:
+                # os._exit stdout buferini yozmaydi
+                sys.stdout.flush()
+                os._exit(0)
+        children.append(pid)
+    
+    print(f"{args.workers} ta worker ishga tushirildi: {', '.join(map(str, children))}")
+    
+    def stop_children(signum=None, frame=None):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop_children)
+    try:
+        for pid in children:
+            while True:
+                try:
+                    os.waitpid(pid, 0)
+                    break
+                except InterruptedError:
+                    continue
+                except KeyboardInterrupt:
+                    signal.signal(signal.SIGINT, signal.SIG_IGN)
+                    stop_children()
+    finally:
+        shutil.rmtree(bus_dir, ignore_errors=True)
+
+
+def main():
+    """Asosiy server funksiyasi"""
+    args = parse_args()
+    
+    if args.backend != "selectors":
+        import aio_server
+        aio_server.serve(args)
+    elif args.workers > 1:
+        run_workers(args)
+    else:
+        serve(args)
 
 
 if __name__ == "__main__":
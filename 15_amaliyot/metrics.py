@@ -0,0 +1,192 @@
+"""
+Metrikalar registri va scrape endpoint
+Counter, Gauge va qat'iy bucketli Histogram. Event loop threadi metrikani
+yangilaydi, scrape threadi o'qiydi - har bir metrikada kichik lock bor,
+shuning uchun o'qilgan qiymatlar hech qachon yarim yangilangan bo'lmaydi.
+
+Endpoint Prometheus text formatida javob beradi:
+    curl http://127.0.0.1:5002/metrics
+"""
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Standart bucketlar
+SIZE_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)  # bayt
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)  # soniya
+QUEUE_BUCKETS = (0, 1024, 4096, 16384, 65536, 262144, 1048576)  # bayt
+THROUGHPUT_BUCKETS = tuple(mb * 1024 * 1024 for mb in (1, 10, 50, 100, 250, 500, 1000, 2000))  # bayt/s
+RATIO_BUCKETS = (1, 1.25, 1.5, 2, 3, 5, 10, 20)  # siqilmagan / siqilgan
+
+
+class Counter:
+    """Faqat o'suvchi hisoblagich"""
+
+    kind = "counter"
+
+    def __init__(self, name, doc):
+        self.name = name
+        self.doc = doc
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class LabeledCounter:
+    """Yorliq qiymatlari bo'yicha alohida hisoblagichlar (masalan fayl turi, kodek)"""
+
+    kind = "counter"
+
+    def __init__(self, name, doc, labelnames):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # {yorliq qiymatlari (tuple): son}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+    def samples(self):
+        result = []
+        for labels, value in sorted(self.snapshot().items()):
+            text = ",".join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+            result.append((f"{self.name}{{{text}}}", value))
+        return result
+
+
+class Gauge:
+    """Joriy qiymat; `func` berilsa qiymat scrape paytida hisoblanadi"""
+
+    kind = "gauge"
+
+    def __init__(self, name, doc, func=None):
+        self.name = name
+        self.doc = doc
+        self.func = func
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.func() if self.func else self.value
+
+    def samples(self):
+        return [(self.name, self.get())]
+
+
+class Histogram:
+    """Qat'iy bucketli histogram (Prometheus `le` semantikasi)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, doc, buckets):
+        self.name = name
+        self.doc = doc
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # oxirgisi +Inf
+        self.sum = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def samples(self):
+        counts, total, count = self.snapshot()
+        result = []
+        cumulative = 0
+        for bound, n in zip(self.bounds, counts):
+            cumulative += n
+            result.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        result.append((f'{self.name}_bucket{{le="+Inf"}}', count))
+        result.append((f"{self.name}_sum", total))
+        result.append((f"{self.name}_count", count))
+        return result
+
+
+class Registry:
+    """Metrikalar to'plami"""
+
+    def __init__(self, labels=None):
+        self.metrics = []
+        self.labels = labels or {}
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc):
+        return self._add(Counter(name, doc))
+
+    def labeled_counter(self, name, doc, labelnames):
+        return self._add(LabeledCounter(name, doc, labelnames))
+
+    def gauge(self, name, doc, func=None):
+        return self._add(Gauge(name, doc, func))
+
+    def histogram(self, name, doc, buckets):
+        return self._add(Histogram(name, doc, buckets))
+
+    def render(self):
+        """Prometheus text formati"""
+        label_text = ",".join(f'{k}="{v}"' for k, v in self.labels.items())
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                if label_text:
+                    if name.endswith("}"):
+                        name = f"{name[:-1]},{label_text}}}"
+                    else:
+                        name = f"{name}{{{label_text}}}"
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(registry, host, port):
+    """Fon threadda GET /metrics endpointini ishga tushirish"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # har bir scrape'ni stderr ga chiqarmaslik
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
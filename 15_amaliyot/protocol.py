@@ -0,0 +1,66 @@
+"""
+Chat protokoli: newline-delimited framing
+Har bir xabar UTF-8 matn va bitta "\n" bilan tugaydi. TCP bir nechta xabarni
+bitta recv() ga birlashtirishi yoki bitta xabarni bo'lib yuborishi mumkin,
+shuning uchun har bir ulanish o'z LineReader buferiga ega.
+Server ham (main.py), mijoz ham (client.py) shu moduldan foydalanadi.
+"""
+
+ENCODING = "utf-8"
+RECV_SIZE = 64 * 1024  # bitta recv_into uchun maksimal hajm
+MAX_LINE = 64 * 1024  # bitta xabarning maksimal uzunligi (bayt)
+
+
+def encode_line(text):
+    """Matnni bitta protokol xabariga aylantirish"""
+    return (text.replace("\r", "").replace("\n", " ") + "\n").encode(ENCODING)
+
+
+def decode_line(line):
+    """Protokol xabarini matnga aylantirish (yakunlovchi \\r olib tashlanadi)"""
+    return line.decode(ENCODING, errors="replace").rstrip("\r")
+
+
+class LineReader:
+    """Bitta ulanish uchun qayta yig'ish buferi.
+
+    Ma'lumot qayta ishlatiladigan `scratch` bytearray ga recv_into orqali
+    o'qiladi, shuning uchun har bir recv uchun yangi bytes yaratilmaydi.
+    Bir nechta LineReader bitta scratch ni bo'lishishi mumkin (masalan,
+    bitta threadli server barcha mijozlar uchun).
+    """
+
+    def __init__(self, scratch=None, max_line=MAX_LINE):
+        self.scratch = scratch if scratch is not None else bytearray(RECV_SIZE)
+        self.view = memoryview(self.scratch)
+        self.max_line = max_line
+        self.pending = bytearray()
+
+    def feed(self, data):
+        """Yangi baytlarni qo'shib, to'liq xabarlar ro'yxatini qaytarish"""
+        pending = self.pending
+        start = len(pending)
+        pending += data
+        end = pending.find(b"\n", start)
+        if end == -1:
+            if len(pending) > self.max_line:
+                raise ValueError(f"Xabar juda uzun: {len(pending)} bayt")
+            return []
+
+        end = pending.rfind(b"\n")
+        lines = bytes(pending[:end]).split(b"\n")
+        del pending[:end + 1]
+        if len(pending) > self.max_line:
+            raise ValueError(f"Xabar juda uzun: {len(pending)} bayt")
+        return lines
+
+    def read_from(self, sock):
+        """Socketdan bir marta o'qish.
+
+        To'liq xabarlar ro'yxatini qaytaradi; ulanish yopilgan bo'lsa None.
+        Non-blocking socketda BlockingIOError yuqoriga uzatiladi.
+        """
+        n = sock.recv_into(self.scratch)
+        if n == 0:
+            return None
+        return self.feed(self.view[:n])
@@ -0,0 +1,601 @@
+"""
+Chat va fayl serverining umumiy qismi
+main.py (selectors) va aio_server.py (asyncio/uvloop) backendlari faqat
+transport bilan farq qiladi. Qolgani shu yerda: manzillar va chegaralar,
+metrikalar registri, log, sekin/faolsiz mijoz siyosati, nomlar va !list
+sahifasi, upload sarlavhalari, bo'laklab yuklash jurnali va blob omboriga
+yozish.
+
+Sozlanadigan qiymatlar (HIGH_WATERMARK, SLOW_POLICY, ...) modul
+o'zgaruvchilari: backend serve() boshida configure(args) ni chaqiradi va
+ular faqat shu moduldagi funksiyalar ichida o'qiladi.
+"""
+
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+from blob_store import hash_file, valid_digest
+from compression import file_type, parse_codec
+from log_writer import LogWriter
+from metrics import (
+    LATENCY_BUCKETS, QUEUE_BUCKETS, RATIO_BUCKETS, SIZE_BUCKETS, THROUGHPUT_BUCKETS,
+    Registry,
+)
+from protocol import encode_line
+from timer_wheel import TimerWheel
+
+HOST = "127.0.0.1"
+PORT = 5000
+FILE_PORT = 5001
+LOG_FILE = "server.log"
+UPLOADS_DIR = "uploads"
+# Xonalar: yangi mijozlar avtomatik DEFAULT_ROOM ga qo'shiladi
+DEFAULT_ROOM = "general"
+MAX_NAME = 32
+LIST_PAGE_SIZE = 50  # !list bitta sahifasidagi mijozlar
+# Fayl yuklash: bitta o'qish hajmi va sarlavha qatorining chegarasi
+UPLOAD_CHUNK = 1024 * 1024
+MAX_HEADER = 1024
+# Bo'laklab (chunked) yuklash: tugallanmagan fayllar shu papkada turadi
+PARTIAL_DIR = os.path.join(UPLOADS_DIR, ".partial")
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+TIMER_RESOLUTION = 0.5  # timer wheel bitta slotining davomiyligi (soniya)
+HISTORY_FLUSH = 1.0  # tarix segment fayli shuncha soniyada diskka tushiriladi
+
+# Quyidagilar buyruq qatoridan o'rnatiladi (configure).
+# Har bir mijozning chiquvchi navbati uchun chegaralar (bayt).
+# Navbat HIGH_WATERMARK dan oshsa, mijoz "sekin" deb belgilanadi va unga
+# broadcast xabarlar tashlab yuboriladi; LOW_WATERMARK gacha bo'shagach
+# yana qabul qila boshlaydi. Shu tufayli bitta sekin o'quvchi qolganlarni
+# to'xtatib qo'ymaydi.
+HIGH_WATERMARK = 256 * 1024
+LOW_WATERMARK = 64 * 1024
+# Sekin mijoz siyosati (navbat HIGH_WATERMARK dan oshganda):
+#   drop_newest - yangi broadcastlar tashlanadi (LOW_WATERMARK gacha)
+#   drop_oldest - navbatdagi eng eski broadcastlar tashlanib, yangisi qo'shiladi
+#   disconnect  - drop_newest kabi, lekin SLOW_TIMEOUT soniyadan ortiq
+#                 HIGH_WATERMARK dan yuqori tursa mijoz uziladi
+SLOW_POLICIES = ("drop_newest", "drop_oldest", "disconnect")
+SLOW_POLICY = "drop_newest"
+SLOW_TIMEOUT = 10.0
+# Navbatning qat'iy chegarasi: shaxsiy javoblar ham sig'masa mijoz uziladi
+MAX_QUEUE = 1024 * 1024
+# Shuncha soniya hech narsa yubormagan mijoz uziladi (0 - o'chirilgan)
+IDLE_TIMEOUT = 600.0
+# Xonaga qo'shilganda oxirgi HISTORY_REPLAY ta xabar yuboriladi (qarang: history.py)
+HISTORY_REPLAY = 20
+
+# Backend amallari (configure): sekin mijozni uzish va faolsiz mijozni
+# xabar bilan yopish - ular transportga bog'liq
+on_slow_timeout = None
+on_idle_timeout = None
+
+# Idle-timeout va sekin mijoz taymerlari (backend loop'i aylantiradi)
+timers = TimerWheel(TIMER_RESOLUTION)
+
+# Bo'laklab yuklanayotgan fayllar (bir nechta ulanish bo'lishadi):
+# {upload_id: {'fd': int, 'path': str, 'journal': file, 'name': str, 'size': int,
+#              'chunk_size': int, 'chunks': int, 'done': set, 'refs': int, 'client_addr': str,
+#              'started': float, 'sha256': mijoz aytgan xesh yoki None}}
+partials = {}
+
+# Fon log yozuvchisi (start_log)
+log_writer = None
+
+# Metrikalar (qarang: metrics.py). Event loop yangilaydi, scrape threadi o'qiydi.
+# Fan-out hisoblagichlari: broadcast_encodes << broadcast_deliveries va
+# send_calls << sent_buffers bo'lsa, encode-once va coalescing ishlayapti.
+# Backend o'z holatiga bog'liq gauge'larni serve() da qo'shadi
+registry = Registry()
+start_time = time.time()
+total_messages = registry.counter("chat_messages_total", "Qayta ishlangan chat xabarlari")
+total_files = registry.counter("chat_files_total", "Saqlangan fayllar")
+dropped_messages = registry.counter("chat_dropped_messages_total", "Sekin mijozlarga tashlangan broadcastlar")
+broadcast_encodes = registry.counter("chat_broadcast_encodes_total", "Kodlangan broadcast xabarlar")
+broadcast_deliveries = registry.counter("chat_broadcast_deliveries_total", "Navbatga qo'yilgan broadcast nusxalari")
+sent_buffers = registry.counter("chat_sent_buffers_total", "To'liq yuborilgan buferlar")
+send_calls = registry.counter("chat_send_calls_total", "Yozish chaqiruvlari (sendmsg yoki write)")
+bytes_sent = registry.counter("chat_bytes_sent_total", "Mijozlarga yuborilgan baytlar")
+upload_bytes = registry.counter("upload_bytes_total", "FILE_PORT orqali qabul qilingan baytlar")
+slow_disconnects = registry.counter("chat_slow_disconnects_total", "Sekinligi uchun uzilgan mijozlar")
+idle_disconnects = registry.counter("chat_idle_disconnects_total", "Faolsizligi uchun uzilgan mijozlar")
+upload_dedup = registry.counter("upload_dedup_total", "Mazmuni serverda allaqachon bor uploadlar")
+upload_dedup_bytes = registry.counter("upload_dedup_bytes_total", "Dedup tufayli diskka qayta yozilmagan baytlar")
+history_replays = registry.counter("chat_history_replays_total", "Xonaga qo'shilganda yuborilgan tarixlar")
+message_size = registry.histogram("chat_message_size_bytes", "Kelgan chat xabari hajmi", SIZE_BUCKETS)
+fanout_seconds = registry.histogram("chat_broadcast_fanout_seconds", "Bitta broadcastni navbatlarga tarqatish vaqti", LATENCY_BUCKETS)
+upload_throughput = registry.histogram("upload_throughput_bytes_per_second", "Tugallangan upload tezligi", THROUGHPUT_BUCKETS)
+loop_lag = registry.histogram("loop_lag_seconds", "Event loop kechikishi (selectors: bitta tick'ni qayta ishlash vaqti)", LATENCY_BUCKETS)
+queue_depth = registry.histogram("chat_client_queue_bytes", "Yuborish oldidan mijoz navbatidagi baytlar", QUEUE_BUCKETS)
+# Siqilgan uploadlar (qarang: compression.py) fayl turi va kodek bo'yicha:
+# raw/wire - siqish foydasi, cpu - uning serverdagi narxi
+COMPRESSION_LABELS = ("type", "codec")
+compressed_uploads = registry.labeled_counter("upload_compressed_total", "Siqib yuborilgan uploadlar", COMPRESSION_LABELS)
+compressed_raw = registry.labeled_counter("upload_compressed_raw_bytes_total", "Siqilgan uploadlarning ochilgan hajmi", COMPRESSION_LABELS)
+compressed_wire = registry.labeled_counter("upload_compressed_wire_bytes_total", "Siqilgan holda qabul qilingan baytlar", COMPRESSION_LABELS)
+decompress_cpu = registry.labeled_counter("upload_decompress_cpu_seconds_total", "Ochishga ketgan CPU vaqti", COMPRESSION_LABELS)
+compression_ratio = registry.histogram("upload_compression_ratio", "Bitta upload siqish nisbati (ochilgan / siqilgan)", RATIO_BUCKETS)
+registry.gauge("timers_pending", "Timer wheel dagi taymerlar", lambda: len(timers))
+registry.gauge("log_queue_depth", "Yozilmagan log yozuvlari", lambda: log_writer.depth() if log_writer else 0)
+registry.gauge("log_dropped", "Tashlangan log yozuvlari", lambda: log_writer.dropped if log_writer else 0)
+registry.gauge("uptime_seconds", "Server ishlagan vaqt", lambda: round(time.time() - start_time, 1))
+
+
+def configure(args, on_slow, on_idle):
+    """Buyruq qatori parametrlari va backend amallarini o'rnatish.
+
+    on_slow(info) - disconnect siyosatida sekin mijozni darhol uzish,
+    on_idle(info, data) - faolsiz mijozga `data` ni yuborib ulanishni yopish.
+    """
+    global HIGH_WATERMARK, LOW_WATERMARK, SLOW_POLICY, SLOW_TIMEOUT, MAX_QUEUE, IDLE_TIMEOUT, HISTORY_REPLAY
+    global on_slow_timeout, on_idle_timeout
+    HIGH_WATERMARK = args.high_watermark
+    LOW_WATERMARK = args.low_watermark
+    SLOW_POLICY = args.slow_policy
+    SLOW_TIMEOUT = args.slow_timeout
+    MAX_QUEUE = args.max_queue
+    IDLE_TIMEOUT = args.idle_timeout
+    HISTORY_REPLAY = args.history_replay
+    on_slow_timeout = on_slow
+    on_idle_timeout = on_idle
+
+
+def start_log(max_queue, policy):
+    """server.log uchun fon yozuvchini ochish"""
+    global log_writer
+    log_writer = LogWriter(LOG_FILE, max_queue=max_queue, policy=policy)
+    return log_writer
+
+
+def log_message(message_type, message, client_addr=None):
+    """Xabarlarni server.log fayliga yozish"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    addr_str = f" [{client_addr}]" if client_addr else ""
+    log_entry = f"[{timestamp}]{addr_str} [{message_type}] {message}\n"
+
+    # Fayl fon threadda paketlab yoziladi
+    if log_writer is not None:
+        log_writer.write(log_entry)
+
+    print(f"[{timestamp}]{addr_str} {message}")
+
+
+# ---------------------------------------------------------------- mijoz navbati
+#
+# Mijoz holati (backendlarda umumiy kalitlar):
+# {'addr', 'nickname', 'outq': deque[bytes | memoryview] (memoryview - tashlab
+#  bo'lmaydigan), 'outbytes', 'paused', 'dropped',
+#  'blocked_since': navbat bo'shamay qolgan payt (monotonic) yoki None,
+#  'slow_since': HIGH_WATERMARK dan oshgan payt yoki None,
+#  'last_active': oxirgi o'qish (monotonic), 'idle_timer', 'slow_timer'}
+
+
+def enqueue(info, data, droppable=True):
+    """Mijoz navbatiga tayyor baytlarni qo'shish.
+
+    `data` nusxalanmaydi, shuning uchun bitta broadcast buferi barcha
+    qabul qiluvchilar navbatida bo'lishiladi. Sekin mijozga droppable
+    xabarlar (broadcast) SLOW_POLICY bo'yicha tashlanadi, shaxsiy javoblar
+    esa MAX_QUEUE gacha navbatga qo'shiladi. Qo'shilsa True, tashlansa
+    False; MAX_QUEUE dan oshsa None - backend mijozni uzadi.
+    """
+    size = len(data)
+    # Oddiy holatda faqat bitta taqqoslash; siyosat faqat sekin mijozda tekshiriladi
+    if droppable and (info['paused'] or info['outbytes'] + size > HIGH_WATERMARK):
+        if SLOW_POLICY == "drop_oldest":
+            if not drop_oldest(info, size):
+                return False
+        elif info['paused']:
+            info['dropped'] += 1
+            dropped_messages.inc()
+            return False
+
+    if info['outbytes'] + size > MAX_QUEUE:
+        log_message("SLOW_CLIENT", f"{info['nickname']}: navbat {MAX_QUEUE} baytdan oshdi, uzildi", info['addr'])
+        slow_disconnects.inc()
+        return None
+
+    # Shaxsiy javoblar memoryview sifatida navbatga qo'yiladi: drop_oldest
+    # faqat bytes (broadcast) elementlarni tashlaydi
+    info['outq'].append(data if droppable else memoryview(data))
+    info['outbytes'] += size
+    if info['outbytes'] >= HIGH_WATERMARK and not info['paused']:
+        mark_slow(info)
+    return True
+
+
+def drop_oldest(info, size):
+    """drop_oldest siyosati: `size` baytli broadcast uchun joy ochish.
+
+    Navbat boshidan eng eski broadcastlar (bytes) tashlanadi; shaxsiy
+    javoblar va qisman yuborilgan bufer (memoryview) saqlanadi. Joy
+    ochilmasa yangi xabarning o'zi tashlanadi va False qaytariladi.
+    """
+    outq = info['outq']
+    dropped = 0
+    i = 0
+    while info['outbytes'] + size > HIGH_WATERMARK and i < len(outq):
+        if type(outq[i]) is bytes:
+            info['outbytes'] -= len(outq[i])
+            del outq[i]
+            dropped += 1
+        else:
+            i += 1
+    fits = info['outbytes'] + size <= HIGH_WATERMARK
+    if not fits:
+        dropped += 1
+    info['dropped'] += dropped
+    dropped_messages.inc(dropped)
+    if not info['paused']:
+        mark_slow(info)
+    return fits
+
+
+def mark_slow(info):
+    """Navbat HIGH_WATERMARK dan oshdi: mijozni sekin deb belgilash"""
+    info['paused'] = True
+    info['slow_since'] = time.monotonic()
+    if SLOW_POLICY == "disconnect":
+        log_message("SLOW_CLIENT", f"{info['nickname']}: navbat {info['outbytes']} bayt, {SLOW_TIMEOUT:g}s ichida bo'shamasa uziladi", info['addr'])
+        info['slow_timer'] = timers.schedule(SLOW_TIMEOUT, check_slow, info)
+    else:
+        log_message("SLOW_CLIENT", f"{info['nickname']}: navbat {info['outbytes']} bayt, broadcastlar tashlanadi ({SLOW_POLICY})", info['addr'])
+
+
+def check_slow(info):
+    """disconnect siyosati: SLOW_TIMEOUT o'tgach ham navbat bo'shamagan bo'lsa uzish.
+
+    Navbat bo'shasa (resume) yoki mijoz uzilsa (cancel_timers) taymer
+    bekor qilinadi, shuning uchun bu yerga faqat hali sekin mijoz keladi.
+    """
+    info['slow_timer'] = None
+    log_message("SLOW_CLIENT", f"{info['nickname']}: {SLOW_TIMEOUT:g}s davomida navbat bo'shamadi, uzildi", info['addr'])
+    slow_disconnects.inc()
+    on_slow_timeout(info)
+
+
+def resume(info):
+    """Sekin mijoz navbati LOW_WATERMARK gacha bo'shagan bo'lsa broadcastlarni tiklash"""
+    if info['outbytes'] > LOW_WATERMARK:
+        return
+    info['paused'] = False
+    info['slow_since'] = None
+    if info['slow_timer'] is not None:
+        info['slow_timer'].cancel()
+        info['slow_timer'] = None
+    log_message("SLOW_CLIENT", f"{info['nickname']}: navbat bo'shadi, {info['dropped']} ta xabar tashlab yuborilgan", info['addr'])
+
+
+def start_idle_timer(info):
+    """Yangi mijoz uchun idle taymeri (IDLE_TIMEOUT=0 bo'lsa o'chirilgan)"""
+    if IDLE_TIMEOUT:
+        info['idle_timer'] = timers.schedule(IDLE_TIMEOUT, check_idle, info)
+
+
+def check_idle(info):
+    """Idle taymeri: oxirgi faollikdan IDLE_TIMEOUT o'tgan bo'lsa uzish.
+
+    Har bir o'qishda taymer qayta rejalashtirilmaydi - faqat
+    `last_active` yangilanadi, taymer ishga tushganda qolgan vaqtga
+    qayta qo'yiladi.
+    """
+    idle = time.monotonic() - info['last_active']
+    if idle < IDLE_TIMEOUT:
+        info['idle_timer'] = timers.schedule(IDLE_TIMEOUT - idle, check_idle, info)
+        return
+    info['idle_timer'] = None
+    log_message("IDLE", f"{info['nickname'] or 'Unknown'}: {int(idle)}s faolsiz, uzildi", info['addr'])
+    idle_disconnects.inc()
+    on_idle_timeout(info, encode_line("[SERVER] Faolsizlik sababli uzildingiz."))
+
+
+def cancel_timers(info):
+    """Mijoz uzilganda uning taymerlarini bekor qilish"""
+    for name in ('idle_timer', 'slow_timer'):
+        if info[name] is not None:
+            info[name].cancel()
+            info[name] = None
+
+
+def client_lag(info, now):
+    """Mijoz qancha vaqtdan beri navbatini to'liq bo'shata olmayapti (soniya)"""
+    since = info['blocked_since']
+    return now - since if since is not None else 0.0
+
+
+# ---------------------------------------------------------------- chat
+
+
+def valid_name(name):
+    """Ism va xona nomlari: harf, raqam, '_' va '-'"""
+    return 0 < len(name) <= MAX_NAME and name.replace('_', '').replace('-', '').isalnum()
+
+
+def client_entry(info, now):
+    """!list dagi bitta mijoz qatori: navbatdagi baytlar, eng eski
+    yuborilmagan xabar yoshi va tashlangan xabarlar"""
+    return (
+        f"  - {info['nickname'] or '(ism kiritilmagan)'} ({info['addr'][0]}:{info['addr'][1]})"
+        f" navbat={info['outbytes']}B lag={client_lag(info, now):.1f}s tashlangan={info['dropped']}"
+        f"{' [sekin]' if info['paused'] else ''}"
+    )
+
+
+def list_page(page, total, entries):
+    """!list uchun bitta sahifa.
+
+    `entries` - mijoz qatorlari generatori: butun ro'yxat satrga
+    yig'ilmaydi, faqat sahifagacha bo'lganlari o'qiladi.
+    """
+    pages = max(1, -(-total // LIST_PAGE_SIZE))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * LIST_PAGE_SIZE
+    lines = list(islice(entries, start, start + LIST_PAGE_SIZE))
+    header = f"[SERVER] Ulangan mijozlar ({total} ta, sahifa {page}/{pages}):"
+    if page < pages:
+        lines.append(f"  ... keyingi sahifa: !list {page + 1}")
+    return header + "\n" + "\n".join(lines) + "\n"
+
+
+def history_replay(history, room):
+    """Xonaga qo'shilgan a'zoga oxirgi xabarlar (sarlavha bilan bitta bufer, bo'lmasa b"")"""
+    data = history.replay(room, HISTORY_REPLAY) if HISTORY_REPLAY else b""
+    if not data:
+        return b""
+    return encode_line(f"[SERVER] [#{room}] oxirgi xabarlar:") + data
+
+
+# ---------------------------------------------------------------- fayllar
+
+
+def parse_upload(fields):
+    """`filename|size|addr` -> (fayl nomi, hajm, mijoz manzili).
+
+    Xavfsizlik: yo'ldan faqat fayl nomi olinadi.
+    """
+    filename, size, client_addr = fields
+    size = int(size)
+    if size < 0:
+        raise ValueError("Invalid file size")
+    return os.path.basename(filename), size, client_addr
+
+
+def parse_put(text):
+    """`PUT|filename|size|addr|sha256[|kodek:daraja]` -> ((filename, size, addr), sha256, kodek yoki None).
+
+    Fayl nomida '|' bo'lishi mumkin, shuning uchun maydonlar o'ngdan
+    ajratiladi. Oxirgi maydon xesh bo'lmasa - kodek.
+    """
+    rest, codec = text[4:], None
+    head, _, last = rest.rpartition('|')
+    if not valid_digest(last.lower()):
+        rest, codec = head, parse_codec(last)
+    filename, size, client_addr, digest = rest.rsplit('|', 3)
+    digest = digest.lower()
+    if not valid_digest(digest):
+        raise ValueError("Invalid file header")
+    return (filename, size, client_addr), digest, codec
+
+
+def parse_init(fields):
+    """`INIT|id|filename|size|chunk_size|addr[|sha256]` maydonlari ->
+    (id, fayl nomi, hajm, bo'lak hajmi, mijoz manzili, sha256 yoki None)"""
+    upload_id, filename, size, chunk_size, client_addr = fields[1:6]
+    digest = fields[6].lower() if len(fields) == 7 else None
+    if digest is not None and not valid_digest(digest):
+        raise ValueError("Invalid sha256")
+    return upload_id, filename, int(size), int(chunk_size), client_addr, digest
+
+
+def decompress(decoder, data, stats):
+    """Siqilgan bo'lakdan ochilgan bo'laklar; ochishga ketgan CPU vaqti
+    stats['cpu'] ga qo'shiladi (yozish va xeshlash hisobga kirmaydi)"""
+    chunks = decoder.feed(data)
+    while True:
+        cpu_start = time.thread_time()
+        chunk = next(chunks, None)
+        stats['cpu'] += time.thread_time() - cpu_start
+        if chunk is None:
+            return
+        yield chunk
+
+
+def pwrite_all(fd, view, offset):
+    """Fayldagi berilgan joyga memoryview ni to'liq yozish"""
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+def observe_throughput(size, started):
+    """Tugallangan upload tezligini histogramga yozish"""
+    elapsed = time.perf_counter() - started
+    if elapsed > 0:
+        upload_throughput.observe(size / elapsed)
+
+
+def observe_compression(name, codec, raw, wire, cpu, client_addr):
+    """Siqilgan upload nisbati va ochish CPU vaqtini fayl turi bo'yicha yozish"""
+    labels = (file_type(name), codec)
+    compressed_uploads.inc(labels)
+    compressed_raw.inc(labels, raw)
+    compressed_wire.inc(labels, wire)
+    decompress_cpu.inc(labels, cpu)
+    ratio = raw / wire if wire else 0
+    compression_ratio.observe(ratio)
+    log_message(
+        "FILE_UPLOAD",
+        f"{name}: {codec} {wire} -> {raw} bytes ({ratio:.2f}x), ochish CPU {cpu * 1000:.1f} ms",
+        client_addr,
+    )
+
+
+def compression_summary():
+    """Fayl turi va kodek bo'yicha siqish statistikasi (bo'sh bo'lsa "")"""
+    raw = compressed_raw.snapshot()
+    wire = compressed_wire.snapshot()
+    cpu = decompress_cpu.snapshot()
+    lines = []
+    for labels, count in sorted(compressed_uploads.snapshot().items()):
+        ratio = raw[labels] / wire[labels] if wire[labels] else 0
+        lines.append(
+            f"Siqish {labels[0]} {labels[1]}: {count} upload, "
+            f"{wire[labels]} -> {raw[labels]} bayt ({ratio:.2f}x), CPU {cpu[labels]:.3f}s\n"
+        )
+    return "".join(lines)
+
+
+def commit_blob(store, temp_path, digest, name, size, client_addr, started):
+    """Qabul qilingan faylni blob omboriga o'tkazish. Saqlangan yo'lni qaytaradi"""
+    filepath, duplicate = store.commit(temp_path, digest, name, size, client_addr)
+    if duplicate:
+        upload_dedup.inc()
+        upload_dedup_bytes.inc(size)
+    note = ", takroriy mazmun" if duplicate else ""
+    log_message("FILE_SUCCESS", f"Fayl saqlandi: {name} -> {filepath} ({size} bytes{note})", client_addr)
+    total_files.inc()
+    observe_throughput(size, started)
+    return filepath
+
+
+def link_blob(store, filename, size, digest, client_addr):
+    """Mazmun serverda bor: nomni mavjud blobga bog'lash (HAVE javobidan oldin)"""
+    filename = os.path.basename(filename)
+    # Mijoz aytgan hajmga emas, saqlangan blobga ishonamiz
+    stored = store.size(digest)
+    if stored != size:
+        raise ValueError(f"Fayl hajmi mos emas: {size} != {stored}")
+    store.link(filename, digest, stored, client_addr)
+    upload_dedup.inc()
+    upload_dedup_bytes.inc(stored)
+    total_files.inc()
+    log_message("FILE_SUCCESS", f"Fayl serverda bor: {filename} ({stored} bytes, {digest[:12]}), ma'lumot yuborilmadi", client_addr)
+
+
+def open_partial(upload_id, filename, size, chunk_size, client_addr, digest=None):
+    """Bo'laklab yuklanayotgan faylni ochish yoki davom ettirish.
+
+    Fayl to'liq hajmda oldindan ajratiladi, tasdiqlangan bo'laklar esa
+    `.done` jurnaliga yoziladi - server qayta ishga tushsa ham yuklash
+    oxirgi tasdiqlangan bo'lakdan davom etadi.
+    """
+    if not upload_id.isalnum() or len(upload_id) > 64:
+        raise ValueError("Invalid upload id")
+    if size < 0 or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("Invalid chunk size")
+
+    partial = partials.get(upload_id)
+    if partial:
+        if partial['committed']:
+            raise ValueError("Upload yakunlangan")
+        if partial['size'] != size or partial['chunk_size'] != chunk_size:
+            raise ValueError("Upload parametrlari mos emas")
+        partial['refs'] += 1
+        partial['sha256'] = partial['sha256'] or digest
+        return partial
+
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    path = os.path.join(PARTIAL_DIR, f"{upload_id}.part")
+    journal_path = os.path.join(PARTIAL_DIR, f"{upload_id}.done")
+    chunks = max(1, -(-size // chunk_size))
+
+    done = set()
+    if os.path.exists(journal_path) and os.path.exists(path):
+        with open(journal_path, encoding="utf-8") as f:
+            header = f.readline().strip()
+            if header == f"{size}|{chunk_size}":
+                done = {int(line) for line in f if line.strip()}
+    if not done:
+        with open(journal_path, "w", encoding="utf-8") as f:
+            f.write(f"{size}|{chunk_size}\n")
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if os.fstat(fd).st_size != size:
+        if hasattr(os, "posix_fallocate") and size > 0:
+            os.posix_fallocate(fd, 0, size)
+        os.ftruncate(fd, size)
+
+    partial = {
+        'id': upload_id,
+        'fd': fd,
+        'path': path,
+        'journal': open(journal_path, "a", encoding="utf-8"),
+        'name': os.path.basename(filename),
+        'size': size,
+        'chunk_size': chunk_size,
+        'chunks': chunks,
+        'done': done,
+        'refs': 1,
+        'committed': False,
+        'client_addr': client_addr,
+        'started': time.perf_counter(),
+        'sha256': digest,
+    }
+    partials[upload_id] = partial
+    log_message("FILE_UPLOAD", f"Bo'laklab yuklash: {partial['name']} ({size} bytes, {len(done)}/{chunks} tayyor)", client_addr)
+    return partial
+
+
+def release_partial(upload_id):
+    """Ulanish yopilganda ochiq fayl deskriptorini bo'shatish"""
+    partial = partials.get(upload_id)
+    if partial is None:
+        return
+    partial['refs'] -= 1
+    if partial['refs'] <= 0:
+        os.close(partial['fd'])
+        partial['journal'].close()
+        del partials[upload_id]
+
+
+def active_partial(upload_id):
+    """CHUNK/COMMIT uchun hali ochiq qism (COMMIT qilingan yoki yo'q bo'lsa xato)"""
+    partial = partials.get(upload_id)
+    if partial is None or partial['committed']:
+        raise ValueError("Upload yakunlangan")
+    return partial
+
+
+def chunk_offset(partial, index, length):
+    """CHUNK sarlavhasini tekshirish: bo'lakning fayldagi joyi (bayt)"""
+    if not 0 <= index < partial['chunks']:
+        raise ValueError("Invalid chunk index")
+    offset = index * partial['chunk_size']
+    if length != min(partial['chunk_size'], partial['size'] - offset):
+        raise ValueError("Invalid chunk length")
+    return offset
+
+
+def chunk_done(partial, index):
+    """Xeshi tekshirilgan bo'lakni jurnalga yozish"""
+    if index not in partial['done']:
+        partial['done'].add(index)
+        partial['journal'].write(f"{index}\n")
+        partial['journal'].flush()
+
+
+def missing_chunks(partial):
+    """COMMIT paytida hali kelmagan bo'laklar"""
+    return [i for i in range(partial['chunks']) if i not in partial['done']]
+
+
+def close_partial(upload_id):
+    """COMMIT: qismga boshqa bo'lak qabul qilinmaydi.
+
+    Qism `partials` dan o'chirilmaydi - parallel oqimlar hali unga
+    havola qilib turgan bo'lishi mumkin. Fayl deskriptori refs 0 ga
+    tushganda release_partial() da yopiladi, shuning uchun COMMIT qilgan
+    oqim o'z havolasini xeshlash tugaguncha ushlab turadi.
+    """
+    partial = active_partial(upload_id)
+    partial['committed'] = True
+    return partial
+
+
+def hash_partial(partial):
+    """Fon threadda: faylni diskka tushirib (fsync) to'liq xeshini hisoblash"""
+    os.fsync(partial['fd'])
+    return hash_file(partial['path'])
@@ -0,0 +1,78 @@
+"""
+Hashed timer wheel: ko'p sonli taymerlar uchun O(1) schedule va cancel
+Har bir mijozning idle-timeout va sekin mijoz taymerlari shu yerda turadi.
+Event loop har tick'da advance() ni chaqiradi va faqat o'tgan slotlar
+ko'rib chiqiladi - barcha mijozlarni skanerlash shart emas.
+
+Taymer hech qachon muddatidan oldin ishga tushmaydi, lekin `resolution`
+gacha kechikishi mumkin.
+"""
+
+import math
+import time
+
+
+class Timer:
+    """Bitta rejalashtirilgan chaqiruv"""
+
+    __slots__ = ("tick", "callback", "args", "slot")
+
+    def __init__(self, tick, callback, args):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    def cancel(self):
+        """Taymerni bekor qilish (ishga tushgan bo'lsa hech narsa qilmaydi)"""
+        if self.slot is not None:
+            self.slot.discard(self)
+            self.slot = None
+
+
+class TimerWheel:
+    """`size` ta slotli g'ildirak; har bir slot `resolution` soniya.
+
+    Bir aylanishdan uzoqroq taymerlar o'z slotida qoladi va keyingi
+    aylanishlarda tekshiriladi.
+    """
+
+    def __init__(self, resolution=0.5, size=512, clock=time.monotonic):
+        self.resolution = resolution
+        self.slots = [set() for _ in range(size)]
+        self.clock = clock
+        self.current = int(clock() / resolution)
+
+    def __len__(self):
+        return sum(len(slot) for slot in self.slots)
+
+    def schedule(self, delay, callback, *args):
+        """`delay` soniyadan keyin callback(*args) ni chaqirish"""
+        tick = max(self.current + 1, math.ceil((self.clock() + delay) / self.resolution))
+        timer = Timer(tick, callback, args)
+        slot = self.slots[tick % len(self.slots)]
+        slot.add(timer)
+        timer.slot = slot
+        return timer
+
+    def advance(self):
+        """Muddati o'tgan taymerlarni ishga tushirish. Ishga tushganlar sonini qaytaradi"""
+        target = int(self.clock() / self.resolution)
+        if target <= self.current:
+            return 0
+        size = len(self.slots)
+        due = []
+        # Loop uzoq band bo'lgan bo'lsa ham har bir slot ko'pi bilan bir marta
+        for tick in range(self.current + 1, min(target, self.current + size) + 1):
+            due.extend(timer for timer in self.slots[tick % size] if timer.tick <= target)
+        self.current = target
+
+        fired = 0
+        for timer in due:
+            # Oldingi callback bu taymerni bekor qilgan bo'lishi mumkin
+            if timer.slot is None:
+                continue
+            timer.cancel()
+            timer.callback(*timer.args)
+            fired += 1
+        return fired
@@ -0,0 +1,117 @@
+"""
+Benchmark: rate limit middleware narxi
+
+1) acquire() - bitta limiter chaqiruvi (memory va shared backend), --keys ta
+   turli IP aylanib keladi
+2) middleware qo'shimchasi - eng oddiy ASGI ilovani middleware bilan va
+   middlewaresiz chaqirib, farq/so'rov (tarmoq va FastAPI yo'q, faqat
+   middleware o'zi)
+3) 10k so'rov/s - so'rovlar --rate tezlikda (har millisekundda bir guruh)
+   yuboriladi, middleware qo'shgan CPU vaqti soniyasiga va bitta yadro
+   ulushi sifatida
+
+Ishlatish:
+    python bench_rate_limit.py
+    python bench_rate_limit.py --keys 100000 --rate 10000 --duration 5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from rate_limit import RateLimitMiddleware, SharedTokenBuckets, TokenBuckets
+
+# Benchmark so'rovlari rad etilmasin: limit juda katta
+UNLIMITED = (10 ** 9, 10 ** 9)
+
+
+def make_scopes(keys):
+    return [{"type": "http", "path": "/", "headers": [(b"host", b"localhost")],
+             "client": (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 40000)} for i in range(keys)]
+
+
+async def plain_app(scope, receive, send):
+    pass  # javob yubormaydi: faqat middleware narxi o'lchanadi
+
+
+async def drop(message):
+    pass
+
+
+def bench_acquire(limiter, keys, n):
+    names = [scope["client"][0] for scope in make_scopes(keys)]
+    acquire = limiter.acquire
+    now = time.monotonic()
+    started = time.perf_counter()
+    for i in range(n):
+        acquire(names[i % keys], now)
+    return (time.perf_counter() - started) / n
+
+
+async def drive(app, scopes, n):
+    count = len(scopes)
+    started = time.perf_counter()
+    for i in range(n):
+        await app(scopes[i % count], None, drop)
+    return (time.perf_counter() - started) / n
+
+
+async def paced(app, scopes, rate, duration):
+    """`rate` so'rov/s, har millisekundda rate/1000 ta; sarflangan CPU soniyasi"""
+    per_tick = max(1, rate // 1000)
+    count = len(scopes)
+    cpu = time.process_time()
+    started = time.monotonic()
+    sent = 0
+    while (elapsed := time.monotonic() - started) < duration:
+        due = int(elapsed * rate)
+        while sent < due:
+            for _ in range(per_tick):
+                await app(scopes[sent % count], None, drop)
+            sent += per_tick
+        await asyncio.sleep(0.001)
+    return time.process_time() - cpu, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limit middleware overhead")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--n", type=int, default=300000)
+    parser.add_argument("--rate", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"bench-rate-limit-{os.getpid()}")
+    limiters = {
+        "memory": TokenBuckets(*UNLIMITED),
+        "shared": SharedTokenBuckets(*UNLIMITED, path=path),
+    }
+    try:
+        print(f"acquire() ({args.keys} kalit):")
+        for name, limiter in limiters.items():
+            print(f"  {name:<7} {bench_acquire(limiter, args.keys, args.n) * 1e9:7.0f} ns")
+
+        scopes = make_scopes(args.keys)
+        baseline = asyncio.run(drive(plain_app, scopes, args.n))
+        print(f"\nmiddleware qo'shimchasi (ilova o'zi {baseline * 1e9:.0f} ns):")
+        for name, limiter in limiters.items():
+            wrapped = RateLimitMiddleware(plain_app, limiter)
+            cost = asyncio.run(drive(wrapped, scopes, args.n)) - baseline
+            print(f"  {name:<7} {cost * 1e9:7.0f} ns/so'rov")
+
+        print(f"\n{args.rate} so'rov/s, {args.duration:.0f}s:")
+        base_cpu, sent = asyncio.run(paced(plain_app, scopes, args.rate, args.duration))
+        for name, limiter in limiters.items():
+            wrapped = RateLimitMiddleware(plain_app, limiter)
+            cpu, sent = asyncio.run(paced(wrapped, scopes, args.rate, args.duration))
+            extra = max(0.0, cpu - base_cpu) / args.duration
+            print(f"  {name:<7} {sent / args.duration:,.0f} so'rov/s, middleware CPU "
+                  f"{extra * 1000:.1f} ms/s ({extra:.1%} yadro)")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
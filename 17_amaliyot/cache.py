@@ -0,0 +1,265 @@
+"""
+Javob keshi: Settings.cache_enabled va cache_ttl ni ta'minlash.
+
+ResponseCacheMiddleware belgilangan GET yo'llarining javobini tayyor baytlar
+holida saqlaydi: keyingi so'rovlarda endpoint, dict qurish va JSON
+serializatsiya umuman ishlamaydi. Har javobga ETag (body xeshi) qo'shiladi;
+If-None-Match mos kelsa body siz 304 qaytadi.
+
+Backendlar:
+    MemoryCache - jarayon ichida, TTL + LRU (max_entries dan oshsa eng eski
+                  ishlatilgani chiqariladi). Har worker o'z keshi.
+    RedisCache  - Redis protokolidagi istalgan server (Redis, KeyDB, lokal
+                  stand-in), Settings.redis_config bilan. `redis` paketi
+                  kerak (pip install redis), faqat shu backend tanlanganda
+                  import qilinadi. Server ishlamasa so'rovlar keshsiz o'tadi.
+
+Hit/miss statistikasi: CacheStats, /cache/stats endpointida.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+MAX_BODY = 1024 * 1024  # bundan katta javoblar keshlanmaydi
+BACKEND_COOLDOWN = 5.0  # redis xatosidan keyin shuncha soniya unga murojaat qilinmaydi
+
+
+class CacheStats:
+    """Kesh hisoblagichlari (bitta worker uchun)"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0  # 304 javoblar (hit yoki miss ichida)
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0  # backend xatolari, so'rov keshsiz o'tgan
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class CachedResponse:
+    """Tayyor javob: status, sarlavhalar (ETag bilan), body baytlari"""
+
+    __slots__ = ("status", "headers", "body", "etag")
+
+    def __init__(self, status: int, headers: list, body: bytes, etag: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+
+    def dumps(self) -> bytes:
+        """Redis uchun: bir qator JSON meta + body"""
+        meta = {
+            "status": self.status,
+            "etag": self.etag.decode("latin-1"),
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers],
+        }
+        return json.dumps(meta, separators=(",", ":")).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        meta, body = data.split(b"\n", 1)
+        meta = json.loads(meta)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in meta["headers"]]
+        return cls(meta["status"], headers, body, meta["etag"].encode("latin-1"))
+
+
+class MemoryCache:
+    """Jarayon ichidagi TTL + LRU kesh"""
+
+    def __init__(self, stats: CacheStats, max_entries: int = 1024):
+        self.stats = stats
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {kalit: (muddati, CachedResponse)}, oxirida eng yangi
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, response: CachedResponse, ttl: int):
+        self.entries[key] = (time.monotonic() + ttl, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def size(self) -> Optional[int]:
+        return len(self.entries)
+
+    async def close(self):
+        self.entries.clear()
+
+
+class RedisCache:
+    """Redis protokoli orqali umumiy kesh; TTL ni server boshqaradi (SET PX)"""
+
+    def __init__(self, stats: CacheStats, redis_config: dict, prefix: str = "response-cache:"):
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis uchun redis paketi kerak: pip install redis") from e
+        self.stats = stats
+        self.prefix = prefix
+        # retry=None: standart qayta urinishlar ishlamayotgan serverda har
+        # so'rovni soniyalab ushlab turadi; kesh bo'lmasa ham javob qaytsin
+        self.client = redis.asyncio.Redis(
+            host=redis_config["host"],
+            port=redis_config["port"],
+            password=redis_config["password"],
+            db=redis_config["db"],
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+            retry=None,
+        )
+        self.down_until = 0.0
+
+    async def call(self, method, *args, **kwargs):
+        if time.monotonic() < self.down_until:
+            raise ConnectionError("redis cache vaqtincha o'chirilgan")
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            self.down_until = time.monotonic() + BACKEND_COOLDOWN
+            raise
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        data = await self.call(self.client.get, self.prefix + key)
+        return CachedResponse.loads(data) if data is not None else None
+
+    async def set(self, key: str, response: CachedResponse, ttl: int):
+        await self.call(self.client.set, self.prefix + key, response.dumps(), px=ttl * 1000)
+
+    async def size(self) -> Optional[int]:
+        return None  # prefiks bo'yicha sanash SCAN talab qiladi, statistikaga arzimaydi
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_cache(backend: str, stats: CacheStats, max_entries: int = 1024, redis_config: Optional[dict] = None):
+    """Settings dagi backend nomi bo'yicha kesh"""
+    if backend == "memory":
+        return MemoryCache(stats, max_entries)
+    if backend == "redis":
+        return RedisCache(stats, redis_config or {})
+    raise ValueError(f"Noma'lum cache backend: {backend} (memory yoki redis)")
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """If-None-Match: "*", bitta yoki vergul bilan bir nechta (W/ zaif teglar ham)"""
+    if if_none_match.strip() == b"*":
+        return True
+    return any(tag.strip().removeprefix(b"W/") == etag for tag in if_none_match.split(b","))
+
+
+class ResponseCacheMiddleware:
+    """Sof ASGI middleware: `paths` dagi GET javoblarini keshlash.
+
+    paths - {yo'l: ttl soniya | None (default_ttl)}; ttl <= 0 bo'lgan yo'l
+    keshlanmaydi. Kalit - faqat yo'l: keshlanadigan endpointlar query
+    parametr o'qimaydi, /?a=1, /?a=2 ... alohida yozuv yaratib LRU yoki
+    Redis ni to'ldirmasin. Faqat 200 va Set-Cookie siz javoblar saqlanadi.
+    Sarlavhaga x-cache: hit | miss qo'shiladi.
+    """
+
+    def __init__(self, app, cache, stats: CacheStats, paths: Dict[str, Optional[int]], default_ttl: int):
+        self.app = app
+        self.cache = cache
+        self.stats = stats
+        self.ttls = {}
+        for path, ttl in paths.items():
+            ttl = default_ttl if ttl is None else ttl
+            if ttl > 0:
+                self.ttls[path] = ttl
+
+    async def __call__(self, scope, receive, send):
+        ttl = self.ttls.get(scope["path"]) if scope["type"] == "http" else None
+        if ttl is None or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        key = scope["path"]
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value
+                break
+
+        try:
+            cached = await self.cache.get(key)
+        except Exception:
+            self.stats.errors += 1
+            cached = None
+        if cached is not None:
+            self.stats.hits += 1
+            return await self.respond(send, cached, if_none_match, b"hit")
+        self.stats.misses += 1
+
+        # Miss: javobni to'liq yig'ib olamiz (keshlanadigan yo'llar kichik JSON)
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = list(start.get("headers", []))
+        if start["status"] != 200 or len(body) > MAX_BODY or any(name == b"set-cookie" for name, _ in headers):
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = make_etag(body)
+        cached = CachedResponse(200, headers + [(b"etag", etag)], body, etag)
+        try:
+            await self.cache.set(key, cached, ttl)
+            self.stats.stores += 1
+        except Exception:
+            self.stats.errors += 1
+        await self.respond(send, cached, if_none_match, b"miss")
+
+    async def respond(self, send, cached: CachedResponse, if_none_match: Optional[bytes], status: bytes):
+        if if_none_match is not None and etag_matches(if_none_match, cached.etag):
+            self.stats.not_modified += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", cached.etag), (b"x-cache", status)],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": cached.status,
+            "headers": cached.headers + [(b"x-cache", status)],
+        })
+        await send({"type": "http.response.body", "body": cached.body})
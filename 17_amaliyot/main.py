@@ -10,23 +10,23 @@ Bajarilgan topshiriqlar:
 """
 
 import os
-import asyncio
 from typing import List, Optional
 from functools import lru_cache
 from environs import Env
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from rate_limit import RateLimitMiddleware, create_limiter
+from cache import CacheStats, ResponseCacheMiddleware, create_cache
 from contextlib import asynccontextmanager
-import uvicorn
-import uvloop
+
+# uvicorn va uvloop faqat main() da import qilinadi: bu modulni har bir
+# worker va reloader import qiladi, ularga server kodi kerak emas
+# (import narxi: python startup_profile.py 17_amaliyot)
 
 # Env instance yaratish va .env faylni yuklash
 env = Env()
 env.read_env()
 
-# uvloop event loop policy
-asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-
 
 class Settings:
     """Application Settings - .env fayldan environs orqali o'qiladi"""
@@ -101,10 +101,21 @@ class Settings:
         # Rate Limiting
         self.rate_limit_per_minute: int = env.int("RATE_LIMIT_PER_MINUTE", default=60)
         self.rate_limit_per_hour: int = env.int("RATE_LIMIT_PER_HOUR", default=1000)
+        self.rate_limit_enabled: bool = env.bool("RATE_LIMIT_ENABLED", default=True)
+        # ip yoki api_key (IP limiti + X-API-Key uchun alohida limit)
+        self.rate_limit_key: str = env.str("RATE_LIMIT_KEY", default="ip")
+        # memory - har worker alohida, shared - bitta hostdagi workerlar uchun umumiy
+        self.rate_limit_backend: str = env.str("RATE_LIMIT_BACKEND", default="memory")
+        self.rate_limit_shm_path: Optional[str] = env.str("RATE_LIMIT_SHM_PATH", default=None)
+        # memory backend xotirasi chegarasi (ko'pi bilan 2 * shuncha kalit)
+        self.rate_limit_max_keys: int = env.int("RATE_LIMIT_MAX_KEYS", default=100000)
         
         # Cache
         self.cache_ttl: int = env.int("CACHE_TTL", default=3600)
         self.cache_enabled: bool = env.bool("CACHE_ENABLED", default=True)
+        # memory - har worker alohida (TTL + LRU), redis - redis_config dagi server
+        self.cache_backend: str = env.str("CACHE_BACKEND", default="memory")
+        self.cache_max_entries: int = env.int("CACHE_MAX_ENTRIES", default=1024)
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -192,12 +203,51 @@ async def lifespan(app: FastAPI):
     print("🛑 Server to'xtatilmoqda...")
     if hasattr(app.state, "db_connection"):
         app.state.db_connection = None
+    if response_cache is not None:
+        await response_cache.close()
     print("✅ Server to'xtatildi")
 
 
 app.router.lifespan_context = lifespan
 
 
+# Javob keshi - rate limit dan oldin qo'shiladi (eng ichkarida): kesh hitlari
+# ham limitlanadi, CORS sarlavhalari esa keshga tushmaydi. /config va
+# /env-example har so'rovda dict qurib serializatsiya qilmaydi.
+cache_stats = CacheStats()
+response_cache = None
+if settings.cache_enabled:
+    response_cache = create_cache(
+        settings.cache_backend,
+        cache_stats,
+        settings.cache_max_entries,
+        settings.redis_config,
+    )
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=response_cache,
+        stats=cache_stats,
+        paths={"/": None, "/config": None, "/env-example": None},
+        default_ttl=settings.cache_ttl,
+    )
+
+
+# Rate limiting - CORS dan oldin qo'shiladi, shunda 429 javoblar ham CORS
+# sarlavhalari bilan chiqadi (oxirgi qo'shilgan middleware eng tashqarida)
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=create_limiter(
+            settings.rate_limit_per_minute,
+            settings.rate_limit_per_hour,
+            settings.rate_limit_backend,
+            settings.rate_limit_shm_path,
+            settings.rate_limit_max_keys,
+        ),
+        key=settings.rate_limit_key,
+    )
+
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -269,12 +319,18 @@ async def get_config(current_settings: Settings = Depends(get_settings)):
             "allowed_extensions": current_settings.allowed_extensions_list
         },
         "rate_limiting": {
+            "enabled": current_settings.rate_limit_enabled,
             "per_minute": current_settings.rate_limit_per_minute,
-            "per_hour": current_settings.rate_limit_per_hour
+            "per_hour": current_settings.rate_limit_per_hour,
+            "key": current_settings.rate_limit_key,
+            "backend": current_settings.rate_limit_backend,
+            "max_keys": current_settings.rate_limit_max_keys
         },
         "cache": {
             "enabled": current_settings.cache_enabled,
-            "ttl": current_settings.cache_ttl
+            "ttl": current_settings.cache_ttl,
+            "backend": current_settings.cache_backend,
+            "max_entries": current_settings.cache_max_entries
         }
     }
 
@@ -295,14 +351,31 @@ async def env_example():
             "SMTP_HOST": "smtp.gmail.com",
             "REDIS_HOST": "localhost",
             "REDIS_PORT": "6379",
-            "ALLOWED_EXTENSIONS": "jpg,jpeg,png,pdf"
+            "ALLOWED_EXTENSIONS": "jpg,jpeg,png,pdf",
+            "RATE_LIMIT_PER_MINUTE": "60",
+            "RATE_LIMIT_BACKEND": "memory",
+            "CACHE_TTL": "3600",
+            "CACHE_BACKEND": "memory"
         },
         "note": "environs kutubxonasi env.str(), env.list(), env.int(), env.bool() metodlaridan foydalanadi"
     }
 
 
+@app.get("/cache/stats")
+async def cache_statistics():
+    """Javob keshi statistikasi (shu worker uchun)"""
+    return {
+        "enabled": settings.cache_enabled,
+        "backend": settings.cache_backend,
+        "entries": await response_cache.size() if response_cache is not None else 0,
+        **cache_stats.snapshot(),
+    }
+
+
 def main():
     """Asosiy funksiya - uvicorn serverni ishga tushiradi"""
+    import uvicorn
+
     print("\n" + "="*50)
     print(f"  {settings.app_name} v{settings.app_version}")
     print("="*50 + "\n")
@@ -312,6 +385,7 @@ def main():
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
+        loop="uvloop",
         log_level=settings.log_level.lower()
     )
 
@@ -0,0 +1,219 @@
+"""
+Rate limiting: Settings.rate_limit_per_minute va rate_limit_per_hour ni
+har bir kalit (mijoz IP si yoki X-API-Key) uchun token bucket bilan
+ta'minlash.
+
+- Har kalitda ikkita bucket (daqiqa va soat). Tokenlar fon vazifasisiz,
+  so'rov kelganda o'tgan vaqtga qarab to'ldiriladi (lazy refill).
+- Jim turgan kalitlar ikki avlodli lug'at bilan tashlanadi: har
+  `idle_after` soniyada (bo'sh bucket to'lishiga ketadigan vaqt) eski avlod
+  butunlay o'chiriladi. Shuncha vaqt so'rov yubormagan kalitning bucketi
+  baribir to'la bo'lardi, demak o'chirish natijani o'zgartirmaydi. Skan
+  yo'q, o'chirish O(1). Joriy avlod `max_keys` ga yetsa aylantirish
+  muddatidan oldin bajariladi: xotirada ko'pi bilan 2 * max_keys kalit.
+- TokenBuckets - bitta jarayon xotirasida (tez, har worker o'z limiti).
+  SharedTokenBuckets - mmap qilingan fayl (/dev/shm), bitta hostdagi
+  hamma uvicorn workerlari uchun umumiy limit; har so'rovda fcntl lock,
+  shuning uchun bir necha mikrosekund qimmatroq.
+
+Benchmark: python bench_rate_limit.py
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+from time import monotonic
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: faqat memory backend
+    fcntl = None
+
+RETRY_BODY = b'{"detail":"Too Many Requests"}'
+EXEMPT_PATHS = ("/health",)  # load balancer tekshiruvlari limitlanmaydi
+MAX_KEYS = 100000  # bitta avloddagi kalitlar chegarasi
+
+
+class TokenBuckets:
+    """Jarayon ichidagi token bucketlar: {kalit: [daqiqa tokenlari, soat tokenlari, oxirgi vaqt]}"""
+
+    def __init__(self, per_minute: int, per_hour: int, max_keys: int = MAX_KEYS):
+        # 0 yoki manfiy limit - shu daraja o'chirilgan (cheksiz bucket)
+        self.minute_capacity = float(per_minute) if per_minute > 0 else math.inf
+        self.minute_rate = per_minute / 60.0 if per_minute > 0 else 0.0
+        self.hour_capacity = float(per_hour) if per_hour > 0 else math.inf
+        self.hour_rate = per_hour / 3600.0 if per_hour > 0 else 0.0
+        refill = [capacity / rate for capacity, rate in
+                  ((self.minute_capacity, self.minute_rate), (self.hour_capacity, self.hour_rate)) if rate]
+        self.idle_after = max(refill, default=3600.0)
+        self.max_keys = max_keys
+        self.current = {}
+        self.previous = {}
+        self.rotate_at = monotonic() + self.idle_after
+
+    def take(self, minute: float, hour: float, elapsed: float):
+        """Bucketlarni to'ldirib bitta token olish. (daqiqa, soat, kutish soniyasi | 0)"""
+        # min() o'rniga shart: builtin chaqiruvi bu yerda butun hisobdan qimmat
+        minute += elapsed * self.minute_rate
+        if minute > self.minute_capacity:
+            minute = self.minute_capacity
+        hour += elapsed * self.hour_rate
+        if hour > self.hour_capacity:
+            hour = self.hour_capacity
+        if minute >= 1.0 and hour >= 1.0:
+            return minute - 1.0, hour - 1.0, 0.0
+        wait = 0.0
+        if minute < 1.0:
+            wait = (1.0 - minute) / self.minute_rate
+        if hour < 1.0:
+            wait = max(wait, (1.0 - hour) / self.hour_rate)
+        return minute, hour, wait
+
+    def acquire(self, key, now: float) -> float:
+        """0 - ruxsat, aks holda necha soniyadan keyin qayta urinish mumkin"""
+        if now >= self.rotate_at:
+            self.previous = self.current
+            self.current = {}
+            self.rotate_at = now + self.idle_after
+        state = self.current.get(key)
+        if state is None:
+            if len(self.current) >= self.max_keys:
+                # ko'p yangi kalit (masalan, har so'rovda boshqa X-API-Key):
+                # xotira cheklangan qolsin, eng eski avlod tashlanadi
+                self.previous = self.current
+                self.current = {}
+                self.rotate_at = now + self.idle_after
+            state = self.previous.pop(key, None) or [self.minute_capacity, self.hour_capacity, now]
+            self.current[key] = state
+        # take() ning o'zi, metod chaqiruvisiz: bu har so'rovdagi issiq yo'l
+        elapsed = now - state[2]
+        state[2] = now
+        minute = state[0] + elapsed * self.minute_rate
+        if minute > self.minute_capacity:
+            minute = self.minute_capacity
+        hour = state[1] + elapsed * self.hour_rate
+        if hour > self.hour_capacity:
+            hour = self.hour_capacity
+        if minute >= 1.0 and hour >= 1.0:
+            state[0] = minute - 1.0
+            state[1] = hour - 1.0
+            return 0.0
+        state[0], state[1], wait = self.take(minute, hour, 0.0)
+        return wait
+
+    def __len__(self):
+        return len(self.current) + len(self.previous)
+
+
+class SharedTokenBuckets(TokenBuckets):
+    """Workerlar orasida umumiy bucketlar: mmap qilingan fayldagi jadval.
+
+    Jadval GROUP ta slotli guruhlardan iborat; kalit barqaror xesh
+    (blake2b, Python hash() har jarayonda boshqacha) bo'yicha bitta guruhga
+    tushadi va guruh fcntl bilan qulflanadi. Guruh to'la bo'lsa eng uzoq
+    jim turgan slot qayta ishlatiladi: bu kalit uchun limit yangidan
+    boshlanadi (jadval yetarlicha katta bo'lsa kam uchraydi).
+    """
+
+    SLOT = struct.Struct("<Qddd")  # xesh, daqiqa tokenlari, soat tokenlari, oxirgi vaqt
+    GROUP = 4
+
+    def __init__(self, per_minute: int, per_hour: int, path: str, slots: int = 65536):
+        if fcntl is None:
+            raise RuntimeError("shared rate limit backend fcntl talab qiladi (Linux/macOS)")
+        super().__init__(per_minute, per_hour)
+        self.groups = max(1, slots // self.GROUP)
+        self.group_size = self.GROUP * self.SLOT.size
+        size = self.groups * self.group_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.table = mmap.mmap(self.fd, size)
+
+    def acquire(self, key, now: float) -> float:
+        # IP (str) va API kalit (bytes) faylda ham to'qnashmasin
+        key = b"ip:" + key.encode() if isinstance(key, str) else b"key:" + key
+        digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") | 1
+        base = (digest >> 1) % self.groups * self.group_size
+        slot = self.SLOT
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, base)
+        try:
+            victim = None
+            for offset in range(base, base + self.group_size, slot.size):
+                stored, minute, hour, last = slot.unpack_from(self.table, offset)
+                if stored == digest:
+                    break
+                # monotonic vaqt hostda umumiy; bo'sh slotning last = 0
+                if victim is None or last < victim[1]:
+                    victim = (offset, last)
+            else:
+                offset = victim[0]
+                minute, hour, last = self.minute_capacity, self.hour_capacity, now
+            minute, hour, wait = self.take(minute, hour, now - last)
+            slot.pack_into(self.table, offset, digest, minute, hour, now)
+            return wait
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, base)
+
+    def __len__(self):
+        return sum(1 for offset in range(0, len(self.table), self.SLOT.size)
+                   if self.SLOT.unpack_from(self.table, offset)[0])
+
+
+class RateLimitMiddleware:
+    """Sof ASGI middleware: limitdan oshgan so'rovga 429 + Retry-After.
+
+    BaseHTTPMiddleware emas - u har so'rovga task va oqimlar qo'shadi.
+    IP bucketi har doim tekshiriladi. key="api_key" bo'lsa X-API-Key
+    sarlavhasi uchun ham alohida bucket olinadi: kalit bir necha IP dan
+    ishlatilsa ham limitlanadi, kalitni almashtirib esa IP limitini
+    chetlab o'tib bo'lmaydi.
+    """
+
+    def __init__(self, app, limiter: TokenBuckets, key: str = "ip", exempt=EXEMPT_PATHS):
+        self.app = app
+        self.limiter = limiter
+        self.by_api_key = key == "api_key"
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            return await self.app(scope, receive, send)
+        client = scope.get("client")
+        now = monotonic()
+        wait = self.limiter.acquire(client[0] if client else "", now)
+        if not wait and self.by_api_key:
+            for name, value in scope["headers"]:
+                if name == b"x-api-key":
+                    # bytes - IP satrlari bilan to'qnashmaydi
+                    wait = self.limiter.acquire(value, now)
+                    break
+        if not wait:
+            return await self.app(scope, receive, send)
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(RETRY_BODY)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": RETRY_BODY})
+
+
+def create_limiter(per_minute: int, per_hour: int, backend: str = "memory",
+                   shm_path: Optional[str] = None, max_keys: int = MAX_KEYS) -> TokenBuckets:
+    """Settings dagi backend nomi bo'yicha limiter (shared jadvali o'zi cheklangan)"""
+    if backend == "memory":
+        return TokenBuckets(per_minute, per_hour, max_keys)
+    if backend == "shared":
+        if not shm_path:
+            shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            shm_path = os.path.join(shm_dir, "fastapi-rate-limit")
+        return SharedTokenBuckets(per_minute, per_hour, shm_path)
+    raise ValueError(f"Noma'lum rate limit backend: {backend} (memory yoki shared)")
@@ -0,0 +1,172 @@
+"""
+FastAPI servislarining sovuq start (cold start) profili: 14_amaliyot, 17_amaliyot
+
+1) Import narxi: ilova papkasida `python -X importtime -c "import main"`.
+   Faqat `main` ostidagi importlar hisoblanadi (interpreter va .pth fayllar
+   emas): paketlar bo'yicha (self vaqt yig'indisi) va eng qimmat modullar.
+2) Birinchi so'rovgacha vaqt (time-to-first-request): `uvicorn main:app`
+   jarayoni yaratilganidan --path birinchi 200 javob bergunicha. Har bir
+   worker va reload aynan shu yo'lni bosib o'tadi. --runs marta, mediana.
+3) Byudjet: mediana --budget-ms dan (yoki COLD_START_BUDGET_MS), import
+   --import-budget-ms dan (yoki IMPORT_BUDGET_MS) oshsa exit code 1 -
+   CI da regressiya tekshiruvi.
+
+Ishlatish:
+    python startup_profile.py 14_amaliyot
+    python startup_profile.py 17_amaliyot --runs 5 --budget-ms 1500
+    COLD_START_BUDGET_MS=1200 python startup_profile.py 14_amaliyot --top 0
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+READY_TIMEOUT = 30.0
+POLL_INTERVAL = 0.005
+
+
+def parse_importtime(text):
+    """-X importtime chiqishi -> [(modul, chuqurlik, self_us, cumulative_us)]"""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def subtree(rows, target):
+    """`target` importi va uning ichidagi importlar (chiqish post-order: bolalar oldin)"""
+    end = max(i for i, row in enumerate(rows) if row[0] == target)
+    depth = rows[end][1]
+    start = end
+    while start > 0 and rows[start - 1][1] > depth:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def import_profile(app_dir, runs):
+    """`import main` ni `runs` marta o'lchab, umumiy vaqti mediana bo'lgan natija"""
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=app_dir, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise RuntimeError(f"import main xato berdi:\n{proc.stderr[-2000:]}")
+        rows = subtree(parse_importtime(proc.stderr), "main")
+        results.append((rows[-1][3], rows))
+    results.sort(key=lambda result: result[0])
+    return results[len(results) // 2][1]
+
+
+def print_import_profile(rows, top):
+    total = rows[-1][3]
+    print(f"import main: {total / 1000:.1f} ms")
+    if not top:
+        return
+    packages = {}
+    for name, _, self_us, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\n  {'paket':<28} {'ms':>8} {'ulush':>7}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f} {self_us / total:7.1%}")
+    print(f"\n  {'modul (self)':<44} {'self ms':>8} {'cum ms':>8}")
+    for name, _, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:top]:
+        print(f"  {name:<44} {self_us / 1000:8.1f} {cumulative_us / 1000:8.1f}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_request(app_dir, path):
+    """Jarayon yaratilishidan birinchi 200 javobgacha soniya"""
+    port = free_port()
+    # cwd - vaqtinchalik papka: lifespan yaratadigan fayllar (uploads/) repoga tushmaydi
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", os.path.abspath(app_dir),
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        try:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server ishga tushmadi:\n{proc.stderr.read()[-2000:]}")
+                if time.perf_counter() - started > READY_TIMEOUT:
+                    raise RuntimeError(f"server {READY_TIMEOUT:.0f}s ichida javob bermadi")
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                try:
+                    conn.request("GET", path)
+                    if conn.getresponse().status == 200:
+                        return time.perf_counter() - started
+                except OSError:
+                    pass  # hali tinglamayapti
+                finally:
+                    conn.close()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            proc.stderr.close()
+
+
+def env_budget(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start profile of a FastAPI app (main:app)")
+    parser.add_argument("app_dir", help="main.py joylashgan papka, masalan 14_amaliyot")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--path", default="/", help="birinchi so'rov yo'li")
+    parser.add_argument("--top", type=int, default=10, help="jadvaldagi qatorlar (0 - jadvalsiz)")
+    parser.add_argument("--budget-ms", type=float, default=env_budget("COLD_START_BUDGET_MS"),
+                        help="time-to-first-request medianasi chegarasi")
+    parser.add_argument("--import-budget-ms", type=float, default=env_budget("IMPORT_BUDGET_MS"),
+                        help="import main chegarasi")
+    args = parser.parse_args()
+
+    rows = import_profile(args.app_dir, args.runs)
+    print_import_profile(rows, args.top)
+    import_ms = rows[-1][3] / 1000
+
+    samples = [first_request(args.app_dir, args.path) * 1000 for _ in range(args.runs)]
+    ttfr_ms = statistics.median(samples)
+    print(f"\ntime-to-first-request ({args.runs} marta): mediana {ttfr_ms:.0f} ms, "
+          f"min {min(samples):.0f} ms, max {max(samples):.0f} ms")
+
+    failed = []
+    if args.budget_ms is not None and ttfr_ms > args.budget_ms:
+        failed.append(f"time-to-first-request {ttfr_ms:.0f} ms > byudjet {args.budget_ms:.0f} ms")
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        failed.append(f"import main {import_ms:.0f} ms > byudjet {args.import_budget_ms:.0f} ms")
+    for message in failed:
+        print(f"BYUDJETDAN OSHDI: {message}")
+    if failed:
+        sys.exit(1)
+    if args.budget_ms is not None or args.import_budget_ms is not None:
+        print("byudjet ichida")
+
+
+if __name__ == "__main__":
+    main()